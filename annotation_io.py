@@ -0,0 +1,161 @@
+import numpy as np
+import json
+import io
+
+SHAPE_TYPES = {'rect', 'circle', 'line', 'path'}
+
+# plotly stores the position of rectangles, circles and lines in these keys
+COORDINATES = ['x0', 'y0', 'x1', 'y1']
+
+
+def validate_shape(shape):
+    """
+    function checks that a decoded object is a plotly shape
+
+    Raises:
+        ValueError if the object is not a shape
+    """
+    if not isinstance(shape, dict):
+        raise ValueError(f'shape has to be a dictionary, got {type(shape).__name__}')
+    if shape.get('type') not in SHAPE_TYPES:
+        raise ValueError(f'unknown shape type: {shape.get("type")}')
+    for key in COORDINATES:
+        value = shape.get(key)
+        # strings and dates are not converted, the binary format stores the coordinates as floats
+        if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise ValueError(f'coordinate {key} has to be a number, got {value!r}')
+
+
+def load_shapes(data):
+    """
+    function decodes and validates exported annotations in json format.
+    The json is decoded at once by the C decoder of the json module and the shapes are
+    validated afterwards, not incrementally in chunks: decoding element by element
+    (JSONDecoder.raw_decode) is slower and the uploaded bytes are in memory anyway
+
+    Args:
+        data: json as bytes or string
+    Returns:
+        annotations: list of shapes, {} for an exported empty dcc.Store
+    Raises:
+        ValueError if the json is not an array of valid shapes
+    """
+    annotations = json.loads(data)
+    if isinstance(annotations, list):
+        for i, shape in enumerate(annotations):
+            try:
+                validate_shape(shape)
+            except ValueError as error:
+                raise ValueError(f'invalid shape {i}: {error}') from None
+    elif annotations != {}:
+        raise ValueError('expected a json array of shapes')
+    return annotations
+
+
+# binary format: magic, version byte, numpy .npz archive with typed columns
+BINARY_MAGIC = b'DASHANN'
+BINARY_VERSION = 1
+BINARY_SHAPE_TYPES = ['rect', 'circle', 'line', 'path']
+
+
+def dump_shapes_binary(shapes):
+    """
+    function stores shapes in the compact binary format. Coordinates are stored as float64
+    columns, the remaining properties (line, fillcolor, ...) are stored once per distinct style
+
+    Args:
+        shapes: list of shapes
+    Returns:
+        bytes
+    """
+    shapes = shapes or []
+    n = len(shapes)
+    kinds = np.empty(n, dtype=np.uint8)
+    coords = np.full((n, 4), np.nan)
+    style_ids = np.empty(n, dtype=np.uint32)
+    name_ids = np.full(n, -1, dtype=np.int32)
+    path_ids = np.full(n, -1, dtype=np.int32)
+    styles, style_index, names, paths = [], {}, [], []
+
+    for i, shape in enumerate(shapes):
+        validate_shape(shape)
+        kinds[i] = BINARY_SHAPE_TYPES.index(shape['type'])
+        style = {}
+        for key, value in shape.items():
+            if key in COORDINATES and value is not None:
+                coords[i, COORDINATES.index(key)] = value
+            elif key == 'name':
+                name_ids[i] = len(names)
+                names.append(value)
+            elif key == 'path':
+                path_ids[i] = len(paths)
+                paths.append(value)
+            elif key != 'type':
+                style[key] = value
+
+        # identical styles are stored only once
+        style_key = json.dumps(style, sort_keys=True)
+        if style_key not in style_index:
+            style_index[style_key] = len(styles)
+            styles.append(style)
+        style_ids[i] = style_index[style_key]
+
+    meta = json.dumps({'styles': styles, 'names': names, 'paths': paths}).encode('utf-8')
+    buffer = io.BytesIO()
+    buffer.write(BINARY_MAGIC + bytes([BINARY_VERSION]))
+    np.savez_compressed(
+        buffer, kinds=kinds, coords=coords, style_ids=style_ids, name_ids=name_ids,
+        path_ids=path_ids, meta=np.frombuffer(meta, dtype=np.uint8)
+    )
+    return buffer.getvalue()
+
+
+def load_shapes_binary(data):
+    """
+    function restores the shapes stored by dump_shapes_binary
+
+    Args:
+        data: bytes
+    Returns:
+        list of shapes
+    """
+    if not is_binary(data):
+        raise ValueError('data is not in the binary annotation format')
+    version = data[len(BINARY_MAGIC)]
+    if version != BINARY_VERSION:
+        raise ValueError(f'unsupported version of the binary annotation format: {version}')
+
+    with np.load(io.BytesIO(data[len(BINARY_MAGIC) + 1:]), allow_pickle=False) as archive:
+        columns = {key: archive[key] for key in archive.files}
+    meta = json.loads(columns['meta'].tobytes())
+    styles, names, paths = meta['styles'], meta['names'], meta['paths']
+
+    shapes = []
+    coord_lists = columns['coords'].tolist()
+    for kind, coords, style_id, name_id, path_id in zip(
+            columns['kinds'].tolist(), coord_lists, columns['style_ids'].tolist(),
+            columns['name_ids'].tolist(), columns['path_ids'].tolist()):
+        shape = dict(styles[style_id])
+        shape['type'] = BINARY_SHAPE_TYPES[kind]
+        for key, value in zip(COORDINATES, coords):
+            if value == value:
+                shape[key] = value
+        if name_id >= 0:
+            shape['name'] = names[name_id]
+        if path_id >= 0:
+            shape['path'] = paths[path_id]
+        shapes.append(shape)
+    return shapes
+
+
+def is_binary(data):
+    return isinstance(data, (bytes, bytearray)) and data[:len(BINARY_MAGIC)] == BINARY_MAGIC
+
+
+def load_annotations(data):
+    """
+    function decodes exported annotations, binary or json
+    """
+    if is_binary(data):
+        return load_shapes_binary(data)
+    return load_shapes(data)
@@ -0,0 +1,193 @@
+from annotation_store import COORDINATES, PATH_NUMBERS
+import threading
+import sqlite3
+import json
+import time
+import os
+
+# location of the database, shared by all workers of the app
+DB_PATH = os.environ.get('ANNOTATION_DB', './annotations.sqlite')
+
+# number of shapes written per executemany call
+BATCH_SIZE = 1000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS images (
+    session_id TEXT NOT NULL REFERENCES sessions(id) ON DELETE CASCADE,
+    image_id TEXT NOT NULL,
+    source TEXT,
+    shape_count INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (session_id, image_id)
+);
+CREATE TABLE IF NOT EXISTS shapes (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    image_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    x_min REAL,
+    y_min REAL,
+    x_max REAL,
+    y_max REAL,
+    data TEXT NOT NULL,
+    FOREIGN KEY (session_id, image_id) REFERENCES images(session_id, image_id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS shapes_by_image ON shapes (session_id, image_id, position);
+CREATE INDEX IF NOT EXISTS shapes_by_bbox ON shapes (image_id, session_id, x_min, x_max, y_min, y_max);
+'''
+
+
+def shape_bounds(shape):
+    """
+    function computes the bounding box of a shape, the points of a path are taken from the svg path
+
+    Returns:
+        (x_min, y_min, x_max, y_max), None for missing coordinates
+    """
+    if shape.get('path') is not None:
+        numbers = [float(n) for n in PATH_NUMBERS.findall(shape['path'])]
+        xs, ys = numbers[0::2], numbers[1::2]
+    else:
+        x0, y0, x1, y1 = (shape.get(c) for c in COORDINATES)
+        xs, ys = [x for x in (x0, x1) if x is not None], [y for y in (y0, y1) if y is not None]
+    if not xs or not ys:
+        return None, None, None, None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class AnnotationRepository:
+    """
+    annotations stored in a SQLite database in WAL mode, so that several users and worker
+    processes can read and write at the same time. Shapes belong to an image of a session,
+    the shapes of one image are written in a single transaction and loaded lazily, image
+    by image. Every thread of every process gets its own connection, opened on first use:
+    the repository can be created at import by a preloading server, a sqlite connection must
+    not be used by a forked worker.
+    """
+
+    def __init__(self, path=DB_PATH, batch_size=BATCH_SIZE):
+        self.path = path
+        self.batch_size = batch_size
+        self._local = threading.local()
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # the schema is created with a connection of its own which is closed again
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connection(self):
+        # a forked process inherits the thread local of the forking thread, the pid tells them apart
+        if getattr(self._local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30)
+            # readers do not block writers (and vice versa), a busy database is retried for 30 s
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.execute('PRAGMA foreign_keys=ON')
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return self._local.connection
+
+    def save_shapes(self, session_id, image_id, shapes, source=None):
+        """
+        function replaces the shapes of an image in one transaction, the rows are inserted in batches
+
+        Args:
+            session_id: id of the session
+            image_id: id of the image, i.e. the content hash
+            shapes: list of shapes, None or {} deletes the shapes of the image
+            source: optional url/path of the image
+        Returns:
+            number of stored shapes
+        """
+        shapes = shapes or []
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT INTO sessions (id, created, updated) VALUES (?, ?, ?) '
+                'ON CONFLICT(id) DO UPDATE SET updated = excluded.updated',
+                (session_id, now, now)
+            )
+            connection.execute(
+                'INSERT INTO images (session_id, image_id, source, shape_count, updated) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(session_id, image_id) DO UPDATE SET '
+                'source = coalesce(excluded.source, source), shape_count = excluded.shape_count, updated = excluded.updated',
+                (session_id, image_id, source, len(shapes), now)
+            )
+            connection.execute('DELETE FROM shapes WHERE session_id = ? AND image_id = ?', (session_id, image_id))
+            for start in range(0, len(shapes), self.batch_size):
+                connection.executemany(
+                    'INSERT INTO shapes (session_id, image_id, position, type, x_min, y_min, x_max, y_max, data) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [
+                        (session_id, image_id, position, shape.get('type', 'rect'), *shape_bounds(shape),
+                         json.dumps(shape))
+                        for position, shape in enumerate(shapes[start:start + self.batch_size], start)
+                    ]
+                )
+        return len(shapes)
+
+    def iter_shapes(self, session_id, image_id):
+        """
+        function yields the shapes of one image in their original order, the rows are fetched
+        in batches via the index on session and image
+        """
+        cursor = self._connection().execute(
+            'SELECT data FROM shapes WHERE session_id = ? AND image_id = ? ORDER BY position',
+            (session_id, image_id)
+        )
+        while True:
+            rows = cursor.fetchmany(self.batch_size)
+            if not rows:
+                return
+            for (data,) in rows:
+                yield json.loads(data)
+
+    def load_shapes(self, session_id, image_id):
+        return list(self.iter_shapes(session_id, image_id))
+
+    def query(self, session_id, image_id, x0, y0, x1, y1):
+        """
+        function returns the shapes of an image whose bounding box intersects a rectangle
+        """
+        rows = self._connection().execute(
+            'SELECT data FROM shapes WHERE image_id = ? AND session_id = ? '
+            'AND x_min <= ? AND x_max >= ? AND y_min <= ? AND y_max >= ? ORDER BY position',
+            (image_id, session_id, max(x0, x1), min(x0, x1), max(y0, y1), min(y0, y1))
+        )
+        return [json.loads(data) for (data,) in rows]
+
+    def images(self, session_id):
+        """
+        function lists the annotated images of a session
+
+        Returns:
+            list of (image_id, source, shape_count)
+        """
+        return self._connection().execute(
+            'SELECT image_id, source, shape_count FROM images WHERE session_id = ? ORDER BY updated DESC',
+            (session_id,)
+        ).fetchall()
+
+    def delete(self, session_id, image_id=None):
+        """
+        function deletes the shapes of an image or, without image_id, the complete session
+        """
+        connection = self._connection()
+        with connection:
+            if image_id is None:
+                connection.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            else:
+                connection.execute(
+                    'DELETE FROM images WHERE session_id = ? AND image_id = ?', (session_id, image_id)
+                )
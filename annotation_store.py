@@ -0,0 +1,579 @@
+from bisect import bisect_left
+from shape_utils import SHAPE_KEY
+from fnmatch import fnmatchcase
+import numpy as np
+import json
+import math
+import re
+
+SHAPE_TYPES = ['rect', 'circle', 'line', 'path']
+COORDINATES = ['x0', 'y0', 'x1', 'y1']
+NON_STYLE_KEYS = set(COORDINATES + ['type', 'name', 'path'])
+
+# numbers of an svg path, i.e. 'M10,20L30.5,40Z'
+PATH_NUMBERS = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+# more name changes than this rebuild the sorted name index instead of updating it
+MAX_NAME_UPDATES = 64
+
+# shapes spanning more grid cells are kept in a separate list instead of the grid
+MAX_CELLS_PER_SHAPE = 64
+
+# queries covering more grid cells scan the coordinate columns instead of the grid
+MAX_CELLS_PER_QUERY = 256
+
+
+class AnnotationStore:
+    """
+    server side storage of plotly shapes. The shapes are stored column wise in numpy arrays
+    (type, coordinates, bounding box, style id), properties like line and fillcolor are
+    stored once per distinct style. A hash index on the names and a uniform grid on the
+    bounding boxes allow fast lookups, hit tests and region queries.
+
+    Every shape gets an id which is never reused, the order of the ids is the order of the
+    shapes in figure['layout']['shapes'].
+    """
+
+    def __init__(self, shapes=None, cell_size=50.0, capacity=1024):
+        self.cell_size = cell_size
+        self.kinds = np.zeros(capacity, dtype=np.uint8)
+        self.coords = np.full((capacity, 4), np.nan)
+        self.bounds = np.full((capacity, 4), np.nan)
+        self.style_ids = np.zeros(capacity, dtype=np.uint32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.names = []
+        self.paths = {}
+        self.styles = []
+        self._style_index = {}
+        self._by_name = {}
+        self._names_sorted = []
+        self._added_names = set()
+        self._removed_names = set()
+        self._grid = {}
+        self._large = set()
+        self._size = 0
+        self._count = 0
+        if shapes:
+            self.extend(shapes)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def nbytes(self):
+        return self.coords.nbytes + self.bounds.nbytes + self.kinds.nbytes + self.style_ids.nbytes
+
+    def _grow(self, needed):
+        capacity = len(self.kinds)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for attr in ('kinds', 'coords', 'bounds', 'style_ids', 'alive'):
+            old = getattr(self, attr)
+            fill = np.nan if old.dtype.kind == 'f' else 0
+            new = np.full((capacity,) + old.shape[1:], fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, attr, new)
+
+    def _style_id(self, style):
+        # repr is much faster than json, identical styles with a different key order only cost a duplicate
+        key = repr(style)
+        if key not in self._style_index:
+            self._style_index[key] = len(self.styles)
+            self.styles.append(style)
+        return self._style_index[key]
+
+    @staticmethod
+    def _path_bounds(path):
+        numbers = [float(n) for n in PATH_NUMBERS.findall(path)]
+        xs, ys = numbers[0::2], numbers[1::2]
+        if not xs or not ys:
+            return [np.nan] * 4
+        return [min(xs), min(ys), max(xs), max(ys)]
+
+    def _cells(self, bounds):
+        x_min, y_min, x_max, y_max = bounds
+        if not all(math.isfinite(v) for v in bounds):
+            return None
+        cx = range(math.floor(x_min / self.cell_size), math.floor(x_max / self.cell_size) + 1)
+        cy = range(math.floor(y_min / self.cell_size), math.floor(y_max / self.cell_size) + 1)
+        if len(cx) * len(cy) > MAX_CELLS_PER_SHAPE:
+            return None
+        return [(x, y) for x in cx for y in cy]
+
+    def _index(self, shape_id):
+        cells = self._cells(self.bounds[shape_id])
+        if cells is None:
+            self._large.add(shape_id)
+            return
+        for cell in cells:
+            self._grid.setdefault(cell, set()).add(shape_id)
+
+    def _unindex(self, shape_id):
+        self._large.discard(shape_id)
+        for cell in self._cells(self.bounds[shape_id]) or []:
+            ids = self._grid.get(cell)
+            if ids is not None:
+                ids.discard(shape_id)
+                if not ids:
+                    del self._grid[cell]
+
+    def _set_geometry(self, shape_id, coords, path):
+        self.coords[shape_id] = coords
+        if path is not None:
+            self.paths[shape_id] = path
+            self.bounds[shape_id] = self._path_bounds(path)
+        else:
+            x0, y0, x1, y1 = coords
+            self.bounds[shape_id] = [min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)]
+
+    def add(self, shape):
+        """
+        function adds a shape to the store
+
+        Returns:
+            id of the shape
+        """
+        return self.extend([shape])[0]
+
+    def extend(self, shapes):
+        """
+        function adds several shapes to the store, coordinates and grid cells are computed vectorized
+
+        Returns:
+            array of ids
+        """
+        n = len(shapes)
+        ids = np.arange(self._size, self._size + n)
+        self._grow(self._size + n)
+        self._size += n
+        self._count += n
+
+        coords = np.array([[shape.get(c) for c in COORDINATES] for shape in shapes], dtype=np.float64).reshape(n, 4)
+        self.coords[ids] = coords
+        self.bounds[ids] = np.column_stack(
+            (np.fmin(coords[:, 0], coords[:, 2]), np.fmin(coords[:, 1], coords[:, 3]),
+             np.fmax(coords[:, 0], coords[:, 2]), np.fmax(coords[:, 1], coords[:, 3]))
+        )
+        self.kinds[ids] = [SHAPE_TYPES.index(shape.get('type', 'rect')) for shape in shapes]
+        self.style_ids[ids] = [
+            self._style_id({k: v for k, v in shape.items() if k not in NON_STYLE_KEYS}) for shape in shapes
+        ]
+        self.alive[ids] = True
+
+        for shape_id, shape in zip(ids.tolist(), shapes):
+            name = shape.get('name')
+            self.names.append(name)
+            self._add_name(name, shape_id)
+            if shape.get('path') is not None:
+                self._set_geometry(shape_id, self.coords[shape_id], shape['path'])
+
+        self._index_many(ids)
+        return ids
+
+    def _index_many(self, ids):
+        b = self.bounds[ids]
+        finite = np.isfinite(b).all(axis=1)
+        cells = np.zeros((len(ids), 4), dtype=np.int64)
+        cells[finite] = np.floor(b[finite] / self.cell_size)
+        n_cells = (cells[:, 2] - cells[:, 0] + 1) * (cells[:, 3] - cells[:, 1] + 1)
+        gridded = finite & (n_cells <= MAX_CELLS_PER_SHAPE)
+        self._large.update(ids[~gridded].tolist())
+
+        # shapes inside a single cell are the common case, group them by cell
+        single = gridded & (n_cells == 1)
+        keys = list(zip(cells[single, 0].tolist(), cells[single, 1].tolist()))
+        for cell, shape_id in zip(keys, ids[single].tolist()):
+            self._grid.setdefault(cell, set()).add(shape_id)
+        for shape_id in ids[gridded & ~single].tolist():
+            self._index(shape_id)
+
+    def remove(self, ids):
+        """
+        function deletes shapes from the store. The grid is cleaned lazily,
+        queries skip the removed shapes
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        ids = ids[self.alive[ids]]
+        for shape_id in ids.tolist():
+            self._remove_name(self.names[shape_id], shape_id)
+            self.paths.pop(shape_id, None)
+        self.alive[ids] = False
+        self._count -= len(ids)
+
+    def clear(self):
+        self.__init__(cell_size=self.cell_size)
+
+    def ids(self):
+        """
+        function returns the ids of all shapes, in the order of figure['layout']['shapes']
+        """
+        return np.flatnonzero(self.alive[:self._size])
+
+    def positions(self, ids):
+        """
+        function returns the positions of the shapes in figure['layout']['shapes']
+        """
+        return np.searchsorted(self.ids(), ids)
+
+    def get(self, shape_id):
+        """
+        function returns a shape as dictionary
+        """
+        shape = dict(self.styles[self.style_ids[shape_id]])
+        shape['type'] = SHAPE_TYPES[self.kinds[shape_id]]
+        for key, value in zip(COORDINATES, self.coords[shape_id].tolist()):
+            if value == value:
+                shape[key] = value
+        if shape_id in self.paths:
+            shape['path'] = self.paths[shape_id]
+        if self.names[shape_id] is not None:
+            shape['name'] = self.names[shape_id]
+        return shape
+
+    def to_shapes(self, ids=None):
+        """
+        function returns the shapes as list of dictionaries, i.e. for figure['layout']['shapes']
+        """
+        return [self.get(shape_id) for shape_id in (self.ids() if ids is None else ids)]
+
+    def _add_name(self, name, shape_id):
+        if name is None:
+            return
+        if name not in self._by_name:
+            self._by_name[name] = set()
+            self._added_names.add(name)
+        self._by_name[name].add(shape_id)
+
+    def _remove_name(self, name, shape_id):
+        if name is None:
+            return
+        self._by_name[name].discard(shape_id)
+        if not self._by_name[name]:
+            del self._by_name[name]
+            self._removed_names.add(name)
+
+    def sorted_names(self):
+        """
+        function returns the distinct names in sorted order. The sorted index is updated
+        lazily, few changes are inserted/deleted via bisection, many changes rebuild it
+        """
+        if len(self._added_names) + len(self._removed_names) > MAX_NAME_UPDATES:
+            self._names_sorted = sorted(self._by_name)
+        else:
+            names = self._names_sorted
+            for name in self._removed_names:
+                idx = bisect_left(names, name)
+                if idx < len(names) and names[idx] == name and name not in self._by_name:
+                    del names[idx]
+            for name in self._added_names:
+                idx = bisect_left(names, name)
+                if name in self._by_name and (idx == len(names) or names[idx] != name):
+                    names.insert(idx, name)
+        self._added_names.clear()
+        self._removed_names.clear()
+        return self._names_sorted
+
+    def find_names(self, pattern, mode='exact'):
+        """
+        function finds the names matching a pattern
+
+        Args:
+            pattern: name, prefix, glob pattern (shape_1*) or regular expression
+            mode: 'exact', 'prefix', 'glob' or 'regex'
+        Returns:
+            sorted list of names
+        """
+        if mode == 'exact':
+            return [pattern] if pattern in self._by_name else []
+
+        names = self.sorted_names()
+        if mode == 'regex':
+            regex = re.compile(pattern)
+            return [name for name in names if regex.search(name)]
+
+        # the part before the first wildcard narrows the search down to a range of the sorted names
+        prefix = re.split(r'[*?\[]', pattern, maxsplit=1)[0] if mode == 'glob' else pattern
+        candidates = names[bisect_left(names, prefix):bisect_left(names, prefix + chr(0x10FFFF))]
+        if mode == 'prefix':
+            return candidates
+        if mode == 'glob':
+            return [name for name in candidates if fnmatchcase(name, pattern)]
+        raise ValueError(f'unknown mode: {mode}')
+
+    def ids_by_name(self, name):
+        return np.array(sorted(self._by_name.get(name, ())), dtype=np.int64)
+
+    def ids_by_names(self, names):
+        ids = [shape_id for name in names for shape_id in self._by_name.get(name, ())]
+        return np.sort(np.array(ids, dtype=np.int64))
+
+    def _candidates(self, x_min, y_min, x_max, y_max):
+        cells = self._cells((x_min, y_min, x_max, y_max))
+        if cells is None or len(cells) > MAX_CELLS_PER_QUERY:
+            return self.ids()
+        candidates = set(self._large)
+        for cell in cells:
+            candidates.update(self._grid.get(cell, ()))
+        return np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+
+    def query(self, x0, y0, x1, y1, contained=False):
+        """
+        function finds the shapes whose bounding box intersects (or lies inside) a rectangle
+
+        Args:
+            x0, y0, x1, y1: corners of the rectangle
+            contained: only return shapes which lie completely inside the rectangle
+        Returns:
+            sorted array of ids
+        """
+        x_min, x_max = sorted((x0, x1))
+        y_min, y_max = sorted((y0, y1))
+        ids = self._candidates(x_min, y_min, x_max, y_max)
+        ids = ids[self.alive[ids]]
+        b = self.bounds[ids]
+        if contained:
+            mask = (b[:, 0] >= x_min) & (b[:, 2] <= x_max) & (b[:, 1] >= y_min) & (b[:, 3] <= y_max)
+        else:
+            mask = (b[:, 0] <= x_max) & (b[:, 2] >= x_min) & (b[:, 1] <= y_max) & (b[:, 3] >= y_min)
+        return np.sort(ids[mask])
+
+    def query_polygon(self, xs, ys, contained=False):
+        """
+        function finds the shapes which intersect (or lie inside) a polygon, i.e. a lasso selection.
+        Rectangles, lines and circles are tested with their outline, paths with their bounding box
+
+        Args:
+            xs, ys: coordinates of the polygon vertices
+            contained: only return shapes which lie completely inside the polygon
+        Returns:
+            sorted array of ids
+        """
+        xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+        ids = self.query(xs.min(), ys.min(), xs.max(), ys.max(), contained=contained)
+        if not len(ids):
+            return ids
+
+        hits = np.zeros(len(ids), dtype=bool)
+        kinds = self.kinds[ids]
+        lines = kinds == SHAPE_TYPES.index('line')
+        circles = kinds == SHAPE_TYPES.index('circle')
+        boxes = ~(lines | circles)
+
+        # rectangles and paths: corners inside the polygon and edges of the polygon crossing the box.
+        # a box is inside if all corners are inside and no edge of the polygon (a concave part) enters it
+        b = self.bounds[ids[boxes]]
+        corners_x = b[:, [0, 2, 2, 0]]
+        corners_y = b[:, [1, 1, 3, 3]]
+        inside = points_in_polygon(corners_x.ravel(), corners_y.ravel(), xs, ys).reshape(-1, 4)
+        if contained:
+            candidates = inside.all(axis=1)
+            candidates[candidates] = ~segments_hit_boxes(xs, ys, b[candidates])
+        else:
+            # the (more expensive) edge test is only needed for boxes without a corner inside
+            candidates = inside.any(axis=1)
+            candidates[~candidates] = segments_hit_boxes(xs, ys, b[~candidates])
+        hits[boxes] = candidates
+
+        # lines: end points inside the polygon and edges of the polygon crossing the line
+        c = self.coords[ids[lines]]
+        inside = points_in_polygon(np.concatenate((c[:, 0], c[:, 2])), np.concatenate((c[:, 1], c[:, 3])), xs, ys)
+        inside = inside.reshape(2, -1)
+        crossed = segments_cross_polygon(c[:, 0], c[:, 1], c[:, 2], c[:, 3], xs, ys)
+        hits[lines] = (inside.all(axis=0) & ~crossed) if contained else (inside.any(axis=0) | crossed)
+
+        # circles: the ellipse is inside if its center is inside and no edge of the polygon comes closer than the
+        # ellipse, scaling the ellipse to the unit circle keeps the distances comparable
+        b = self.bounds[ids[circles]]
+        cx, cy = (b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2
+        rx, ry = np.maximum((b[:, 2] - b[:, 0]) / 2, 1e-12), np.maximum((b[:, 3] - b[:, 1]) / 2, 1e-12)
+        center_inside = points_in_polygon(cx, cy, xs, ys)
+        distance = polygon_distances(xs, ys, cx, cy, rx, ry)
+        hits[circles] = (center_inside & (distance >= 1)) if contained else (center_inside | (distance <= 1))
+        return ids[hits]
+
+    def hit_test(self, x, y):
+        """
+        function finds the shapes at a point, circles are tested against the ellipse
+
+        Returns:
+            sorted array of ids
+        """
+        ids = self.query(x, y, x, y)
+        circles = ids[self.kinds[ids] == SHAPE_TYPES.index('circle')]
+        if len(circles):
+            b = self.bounds[circles]
+            cx, cy = (b[:, 0] + b[:, 2]) / 2, (b[:, 1] + b[:, 3]) / 2
+            rx, ry = np.maximum((b[:, 2] - b[:, 0]) / 2, 1e-12), np.maximum((b[:, 3] - b[:, 1]) / 2, 1e-12)
+            outside = circles[((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 > 1]
+            ids = np.setdiff1d(ids, outside)
+        return ids
+
+    def update_style(self, ids, **properties):
+        """
+        function changes style properties (line, fillcolor, opacity, ...) of several shapes
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        old_style_ids = self.style_ids[ids]
+        # lookup table old style -> new style, bincount finds the used styles without sorting
+        mapping = np.arange(len(self.styles), dtype=self.style_ids.dtype)
+        for old_style_id in np.flatnonzero(np.bincount(old_style_ids, minlength=len(self.styles))).tolist():
+            style = dict(self.styles[old_style_id])
+            style.update(properties)
+            mapping[old_style_id] = self._style_id(style)
+        self.style_ids[ids] = mapping[old_style_ids]
+
+    def set_property(self, shape_id, prop, value):
+        """
+        function changes a single property of a shape, nested properties like 'line.color' are possible
+        """
+        if prop in COORDINATES or prop == 'path':
+            self._unindex(shape_id)
+            coords = self.coords[shape_id].copy()
+            path = self.paths.get(shape_id)
+            if prop == 'path':
+                path = value
+            else:
+                coords[COORDINATES.index(prop)] = value
+            self._set_geometry(shape_id, coords, path)
+            self._index(shape_id)
+        elif prop == 'name':
+            self._remove_name(self.names[shape_id], shape_id)
+            self.names[shape_id] = value
+            self._add_name(value, shape_id)
+        else:
+            style = json.loads(json.dumps(self.styles[self.style_ids[shape_id]]))
+            *parents, key = prop.split('.')
+            target = style
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[key] = value
+            self.style_ids[shape_id] = self._style_id(style)
+
+    def apply_relayout(self, relayout_data):
+        """
+        function applies the shape related content of the relayoutData of a dcc.Graph,
+        so that the store follows the shapes drawn, edited or erased by the user
+
+        Returns:
+            True if the relayoutData concerned the shapes
+        """
+        if not relayout_data:
+            return False
+        if 'shapes' in relayout_data:
+            self.clear()
+            self.extend(relayout_data['shapes'])
+            return True
+
+        edits = [(SHAPE_KEY.match(key), value) for key, value in relayout_data.items()]
+        edits = [(match, value) for match, value in edits if match]
+        ids = self.ids()
+        for match, value in edits:
+            position = int(match.group(1))
+            if position < len(ids):
+                self.set_property(int(ids[position]), match.group(2), value)
+        return bool(edits)
+
+
+def points_in_polygon(px, py, xs, ys):
+    """
+    function tests which points lie inside a polygon (ray casting, vectorized)
+
+    Args:
+        px, py: coordinates of the points
+        xs, ys: coordinates of the polygon vertices
+    Returns:
+        boolean array, one value per point
+    """
+    x0, y0 = xs[None, :], ys[None, :]
+    x1, y1 = np.roll(xs, -1)[None, :], np.roll(ys, -1)[None, :]
+    px, py = px[:, None], py[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        crosses = ((y0 > py) != (y1 > py)) & (px < (x1 - x0) * (py - y0) / (y1 - y0) + x0)
+    return np.count_nonzero(crosses, axis=1) % 2 == 1
+
+
+def segments_hit_boxes(xs, ys, boxes, chunk_size=2048):
+    """
+    function tests which boxes are crossed by at least one edge of a closed polygon (Liang-Barsky clipping)
+
+    Args:
+        xs, ys: coordinates of the polygon vertices
+        boxes: array of shape (n, 4) with x_min, y_min, x_max, y_max
+        chunk_size: number of boxes tested at once, limits the memory of the (boxes x edges) arrays
+    Returns:
+        boolean array, one value per box
+    """
+    x0, y0 = xs[None, :], ys[None, :]
+    dx, dy = np.roll(xs, -1)[None, :] - x0, np.roll(ys, -1)[None, :] - y0
+    hits = np.zeros(len(boxes), dtype=bool)
+    for start in range(0, len(boxes), chunk_size):
+        b = boxes[start:start + chunk_size]
+        t0 = np.zeros((len(b), len(xs)))
+        t1 = np.ones((len(b), len(xs)))
+        valid = np.ones((len(b), len(xs)), dtype=bool)
+        for p, q in ((-dx, x0 - b[:, [0]]), (dx, b[:, [2]] - x0), (-dy, y0 - b[:, [1]]), (dy, b[:, [3]] - y0)):
+            p = np.broadcast_to(p, q.shape)
+            parallel = p == 0
+            valid &= ~(parallel & (q < 0))
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r = q / p
+            t0 = np.where(~parallel & (p < 0), np.maximum(t0, r), t0)
+            t1 = np.where(~parallel & (p > 0), np.minimum(t1, r), t1)
+        hits[start:start + chunk_size] = (valid & (t0 <= t1)).any(axis=1)
+    return hits
+
+
+def segments_cross_polygon(ax, ay, bx, by, xs, ys, chunk_size=2048):
+    """
+    function tests which line segments touch or cross at least one edge of a closed polygon (orientation test)
+
+    Args:
+        ax, ay, bx, by: coordinates of the end points of the segments
+        xs, ys: coordinates of the polygon vertices
+        chunk_size: number of segments tested at once, limits the memory of the (segments x edges) arrays
+    Returns:
+        boolean array, one value per segment
+    """
+    px, py = xs[None, :], ys[None, :]
+    qx, qy = np.roll(xs, -1)[None, :], np.roll(ys, -1)[None, :]
+    hits = np.zeros(len(ax), dtype=bool)
+    for start in range(0, len(ax), chunk_size):
+        part = slice(start, start + chunk_size)
+        x0, y0, x1, y1 = ax[part, None], ay[part, None], bx[part, None], by[part, None]
+        # sign of the cross products: on which side of one segment the end points of the other one lie
+        side_a = np.sign((qx - px) * (y0 - py) - (qy - py) * (x0 - px))
+        side_b = np.sign((qx - px) * (y1 - py) - (qy - py) * (x1 - px))
+        side_p = np.sign((x1 - x0) * (py - y0) - (y1 - y0) * (px - x0))
+        side_q = np.sign((x1 - x0) * (qy - y0) - (y1 - y0) * (qx - x0))
+        # collinear segments only touch if their bounding boxes overlap
+        overlap = ((np.minimum(x0, x1) <= np.maximum(px, qx)) & (np.minimum(px, qx) <= np.maximum(x0, x1))
+                   & (np.minimum(y0, y1) <= np.maximum(py, qy)) & (np.minimum(py, qy) <= np.maximum(y0, y1)))
+        hits[part] = (overlap & (side_a * side_b <= 0) & (side_p * side_q <= 0)).any(axis=1)
+    return hits
+
+
+def polygon_distances(xs, ys, cx, cy, rx, ry, chunk_size=2048):
+    """
+    function computes the distance of the edges of a closed polygon to the centers of ellipses,
+    measured in radii of the ellipse: a distance below 1 means the polygon enters the ellipse
+
+    Args:
+        xs, ys: coordinates of the polygon vertices
+        cx, cy, rx, ry: centers and radii of the ellipses
+        chunk_size: number of ellipses tested at once, limits the memory of the (ellipses x edges) arrays
+    Returns:
+        array of distances, one value per ellipse
+    """
+    distances = np.full(len(cx), np.inf)
+    for start in range(0, len(cx), chunk_size):
+        part = slice(start, start + chunk_size)
+        # the edges in the coordinates of the unit circle of each ellipse
+        x0 = (xs[None, :] - cx[part, None]) / rx[part, None]
+        y0 = (ys[None, :] - cy[part, None]) / ry[part, None]
+        dx, dy = np.roll(x0, -1, axis=1) - x0, np.roll(y0, -1, axis=1) - y0
+        length = dx ** 2 + dy ** 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = np.clip(np.where(length > 0, -(x0 * dx + y0 * dy) / length, 0), 0, 1)
+        distances[part] = np.sqrt((x0 + t * dx) ** 2 + (y0 + t * dy) ** 2).min(axis=1)
+    return distances
@@ -0,0 +1,404 @@
+from base64 import b64decode
+import numpy as np
+import math
+
+# plotly defaults which determine the length of the axes in pixels
+DEFAULT_WIDTH = 700
+DEFAULT_HEIGHT = 450
+DEFAULT_MARGIN = {'l': 80, 'r': 80, 't': 100, 'b': 80}
+
+# ranges of axes without data
+DEFAULT_RANGE = {'x': [-1, 6], 'y': [-1, 4]}
+
+# scatter traces with fewer points default to lines+markers, otherwise to lines
+LINES_ONLY_POINTS = 20
+
+# values beyond this are ignored by plotly
+FP_SAFE = np.finfo(np.float64).max / 1e4
+
+
+def _as_dict(fig):
+    # the traces of a go.Figure keep their numpy arrays, fig.to_dict() would encode them as base64
+    if hasattr(fig, 'to_plotly_json'):
+        return {
+            'data': [trace.to_plotly_json() for trace in fig.data],
+            'layout': fig.layout.to_plotly_json(),
+        }
+    return fig
+
+
+def _array(values):
+    # plain lists, numpy arrays or typed arrays ({'dtype': ..., 'bdata': ...}) of plotly figures
+    if isinstance(values, dict) and 'bdata' in values:
+        array = np.frombuffer(b64decode(values['bdata']), dtype=values['dtype'])
+        shape = values.get('shape')
+        if shape is not None:
+            shape = [int(n) for n in shape.split(',')] if isinstance(shape, str) else shape
+            array = array.reshape(shape)
+        return array.astype(np.float64)
+    return np.asarray(values, dtype=np.float64)
+
+
+def axis_length(layout, axis):
+    """
+    function computes the length of an axis in pixels from the size and the margins of the figure.
+    Margins pushed by legends, colorbars or tick labels (automargin) are not taken into account:
+    i.e. the colorbar of px.scatter with a continuous color shortens the x axis in the browser,
+    the ranges computed with this length are then slightly too narrow on x
+
+    Args:
+        layout: layout of the figure
+        axis: 'x' or 'y'
+    Returns:
+        length in pixels
+    """
+    template_margin = ((layout.get('template') or {}).get('layout') or {}).get('margin') or {}
+    margin = dict(DEFAULT_MARGIN, **template_margin, **(layout.get('margin') or {}))
+    domain = (layout.get(f'{axis}axis') or {}).get('domain') or [0, 1]
+    if axis == 'x':
+        size = (layout.get('width') or DEFAULT_WIDTH) - margin['l'] - margin['r']
+    else:
+        size = (layout.get('height') or DEFAULT_HEIGHT) - margin['t'] - margin['b']
+    return size * (domain[1] - domain[0])
+
+
+def _add_extreme(extremes, val, pad, extrapad, is_min, tozero=False):
+    # keeps only the points which are not dominated by another point (further out with more padding)
+    better = (lambda a, b: a <= b) if is_min else (lambda a, b: a >= b)
+    idx = 0
+    while idx < len(extremes):
+        point = extremes[idx]
+        if better(point['val'], val) and point['pad'] >= pad and (point['extrapad'] or not extrapad):
+            return
+        if better(val, point['val']) and point['pad'] <= pad and (extrapad or not point['extrapad']):
+            del extremes[idx]
+        else:
+            idx += 1
+    at_zero = tozero and val == 0
+    extremes.append({'val': val, 'pad': 0 if at_zero else pad, 'extrapad': False if at_zero else extrapad})
+
+
+def _pareto(vals, pads, is_min):
+    # points which are not dominated by a point with a smaller (larger) value and more padding
+    order = np.lexsort((-pads, vals if is_min else -vals))
+    vals, pads = vals[order], pads[order]
+    previous_max = np.maximum.accumulate(np.concatenate(([-np.inf], pads[:-1])))
+    keep = pads > previous_max
+    return vals[keep], pads[keep]
+
+
+def find_extremes(values, log=False, ppad=0.0, padded=False, tozero=False):
+    """
+    function computes the candidates for the minimum and maximum of an axis like
+    Axes.findExtremes of plotly.js
+
+    Args:
+        values: data values of a trace
+        log: True for log axes, the values are linearized with log10
+        ppad: padding in pixels, scalar or one value per data value (marker size)
+        padded: add 5% of the axis length to the extreme values
+        tozero: include zero (linear axes only)
+    Returns:
+        {'min': [...], 'max': [...]}, points with val, pad and extrapad
+    """
+    values = np.asarray(values, dtype=np.float64).ravel()
+    tozero = tozero and not log
+    pads = np.maximum(np.nan_to_num(np.asarray(ppad, dtype=np.float64)), 0)
+    valid = np.isfinite(values) & (np.abs(values) < FP_SAFE)
+    if log:
+        valid &= values > 0
+
+    if pads.ndim:
+        vals, pads = values[valid], pads.ravel()[valid]
+    else:
+        # with a single padding only the smallest and the largest value matter
+        vals = values[valid]
+        vals = np.array([vals.min(), vals.max()]) if len(vals) else vals
+        pads = np.full(len(vals), float(pads))
+    if log:
+        vals = np.log10(vals)
+
+    extremes = {'min': [], 'max': []}
+    for key, is_min in (('min', True), ('max', False)):
+        candidates = np.minimum(vals, 0) if tozero and is_min else np.maximum(vals, 0) if tozero else vals
+        for val, pad in zip(*_pareto(candidates, pads, is_min)):
+            _add_extreme(extremes[key], float(val), float(pad), padded, is_min, tozero)
+    return extremes
+
+
+def _marker_pad(trace, count):
+    # marker radius in pixels as used by plotly for the padding, at least 3 pixels
+    marker = trace.get('marker') or {}
+    size = marker.get('size', 6)
+    sizeref = 1.6 * (marker.get('sizeref') or 1)
+    size = np.nan_to_num(_array(size))
+    if marker.get('sizemode') == 'area':
+        pad = np.maximum(np.sqrt(np.maximum(size, 0) / sizeref), 3)
+    else:
+        pad = np.maximum(size / sizeref, 3)
+    return np.broadcast_to(pad, (count,)) if pad.ndim else pad
+
+
+def _positions(trace, axis, count):
+    # data of an axis, missing x/y are generated from x0/dx (y0/dy)
+    values = trace.get(axis)
+    if values is not None:
+        return _array(values)
+    return trace.get(f'{axis}0', 0) + trace.get(f'd{axis}', 1) * np.arange(count)
+
+
+def _brick_edges(centers):
+    # edges of heatmap cells around their centers
+    if len(centers) == 1:
+        return np.array([centers[0] - 0.5, centers[0] + 0.5])
+    middles = (centers[1:] + centers[:-1]) / 2
+    return np.concatenate(([2 * centers[0] - middles[0]], middles, [2 * centers[-1] - middles[-1]]))
+
+
+def error_values(trace, axis, values):
+    """
+    function computes the ends of the visible error bars of a trace along an axis, like the
+    errorbars component of plotly.js (types data, percent, constant and sqrt)
+
+    Args:
+        trace: trace as dictionary
+        axis: 'x' or 'y'
+        values: data values of the trace along the axis
+    Returns:
+        array of the lower and upper ends, empty without visible error bars
+    """
+    error = trace.get(f'error_{axis}') or {}
+    kind = error.get('type', 'data' if 'array' in error else 'percent')
+    if not error.get('visible', 'array' in error or 'value' in error or kind == 'sqrt'):
+        return np.empty(0)
+
+    minus_key = 'arrayminus' if kind == 'data' else 'valueminus'
+    symmetric = kind == 'sqrt' or error.get('symmetric', minus_key not in error)
+    if kind == 'data':
+        def data(key):
+            array = _array(error.get(key) if error.get(key) is not None else [])
+            return np.concatenate((array, np.full(max(len(values) - len(array), 0), np.nan)))[:len(values)]
+
+        plus = data('array')
+        if symmetric:
+            minus = plus
+        else:
+            # a missing side is drawn with length 0 as long as the other side exists
+            minus = data('arrayminus')
+            missing = np.isnan(plus) & np.isnan(minus)
+            plus, minus = np.nan_to_num(plus), np.nan_to_num(minus)
+            plus[missing], minus[missing] = np.nan, np.nan
+    else:
+        def computed(key):
+            if kind == 'sqrt':
+                return np.sqrt(np.abs(values))
+            value = error.get(key, 10)
+            return np.abs(values * value / 100) if kind == 'percent' else np.full(len(values), abs(value))
+
+        plus = computed('value')
+        minus = plus if symmetric else computed('valueminus')
+
+    valid = np.isfinite(values) & np.isfinite(plus) & np.isfinite(minus)
+    return np.concatenate((values[valid] - minus[valid], values[valid] + plus[valid]))
+
+
+def trace_extremes(trace, axis, log=False):
+    """
+    function computes the extremes of a trace for one axis, supported are scatter, scattergl,
+    bar (not stacked) and heatmap traces with numeric data, including their error bars
+
+    Args:
+        trace: trace as dictionary
+        axis: 'x' or 'y'
+        log: True for log axes
+    Returns:
+        {'min': [...], 'max': [...]}
+    """
+    kind = trace.get('type', 'scatter')
+    other = 'y' if axis == 'x' else 'x'
+
+    if kind in ('scatter', 'scattergl'):
+        count = len(_array(trace.get('y') if trace.get('y') is not None else trace.get('x')))
+        values, other_values = _positions(trace, axis, count), _positions(trace, other, count)
+        mode = trace.get('mode') or ('lines+markers' if count < LINES_ONLY_POINTS else 'lines')
+        markers, text = 'markers' in mode, 'text' in mode
+        fill = trace.get('fill', 'none')
+        ppad = _marker_pad(trace, count) if markers else 0.0
+
+        # fills to zero include zero, traces without markers and text are not padded on x
+        x_values, y_values = (values, other_values) if axis == 'x' else (other_values, values)
+        open_ended = count < 2 or x_values[0] != x_values[-1] or y_values[0] != y_values[-1]
+        error_visible = len(error_values(trace, other, other_values)) > 0
+        tozero = open_ended and fill == f'tozero{axis}'
+        if tozero:
+            extremes = find_extremes(values, log, ppad, padded=True, tozero=True)
+        elif axis == 'x' and not error_visible and (fill in ('tonexty', 'tozeroy') or not (markers or text)):
+            extremes = find_extremes(values, log, 0.0, padded=False)
+        elif axis == 'y' and fill in ('tonextx', 'tozerox'):
+            extremes = find_extremes(values, log, ppad, padded=False)
+        else:
+            extremes = find_extremes(values, log, ppad, padded=True)
+
+    elif kind == 'bar':
+        position_axis = 'y' if trace.get('orientation') == 'h' else 'x'
+        count = len(_array(trace.get('x' if position_axis == 'y' else 'y')))
+        values = _positions(trace, axis, count)
+        tozero = False
+        if axis == position_axis:
+            # every bar occupies the space up to the next position
+            positions = np.unique(values)
+            half = np.diff(positions).min() / 2 if len(positions) > 1 else 0.5
+            extremes = find_extremes(np.concatenate((positions - half, positions + half)), log, padded=False)
+        elif trace.get('base') is not None:
+            base = np.broadcast_to(_array(trace['base']), values.shape)
+            values = values + base
+            extremes = find_extremes(np.concatenate((values, base)), log, padded=True)
+        else:
+            tozero = True
+            extremes = find_extremes(values, log, padded=True, tozero=True)
+
+    elif kind == 'heatmap':
+        z = _array(trace.get('z'))
+        count = z.shape[1] if axis == 'x' else z.shape[0]
+        centers = _positions(trace, axis, count)
+        if len(centers) == count + 1:
+            # edges given instead of centers
+            return find_extremes(centers, log)
+        return find_extremes(_brick_edges(centers), log)
+
+    else:
+        raise ValueError(f'autorange of {kind} traces is not supported')
+
+    # the ends of the error bars are further candidates, padded like the data
+    errors = error_values(trace, axis, values)
+    if len(errors):
+        error_extremes = find_extremes(errors, log, padded=True, tozero=tozero)
+        extremes = {key: extremes[key] + error_extremes[key] for key in ('min', 'max')}
+    return extremes
+
+
+def auto_range(extremes, length, rangemode='normal', reverse=False):
+    """
+    function computes the range of an axis from the extremes of all traces like getAutoRange of plotly.js
+
+    Args:
+        extremes: list of {'min': [...], 'max': [...]}, one per trace
+        length: length of the axis in pixels
+        rangemode: 'normal', 'tozero' or 'nonnegative'
+        reverse: reversed axis
+    Returns:
+        [start, end] in linearized units (log10 for log axes) or None without data
+    """
+    mins, maxs = [], []
+    for extreme in extremes:
+        for point in extreme['min']:
+            _add_extreme(mins, point['val'], point['pad'], point['extrapad'], True)
+        for point in extreme['max']:
+            _add_extreme(maxs, point['val'], point['pad'], point['extrapad'], False)
+    if not mins or not maxs:
+        return None
+
+    extrappad = 0.05 * length
+
+    def get_pad(point):
+        if point.get('nopad'):
+            return 0
+        return point['pad'] + (extrappad if point['extrapad'] else 0)
+
+    minmin, maxmax = mins[0]['val'], maxs[0]['val']
+    for point in mins[1:]:
+        if minmin != maxmax:
+            break
+        minmin = min(minmin, point['val'])
+    for point in maxs[1:]:
+        if minmin != maxmax:
+            break
+        maxmax = max(maxmax, point['val'])
+
+    to_zero, non_negative = rangemode == 'tozero', rangemode == 'nonnegative'
+    min_span = length / 10
+    best, min_best, max_best = 0, None, None
+    for min_point in mins:
+        for max_point in maxs:
+            dv = max_point['val'] - min_point['val']
+            if dv <= 0:
+                continue
+            dp = length - get_pad(min_point) - get_pad(max_point)
+            if dp > min_span:
+                if dv / dp > best:
+                    min_best, max_best, best = min_point, max_point, dv / dp
+            elif dv / length > best:
+                # padding longer than the axis, at least include the unpadded data
+                min_best = {'val': min_point['val'], 'nopad': 1}
+                max_best = {'val': max_point['val'], 'nopad': 1}
+                best = dv / length
+
+    if minmin == maxmax:
+        lower, upper = minmin - 1, minmin + 1
+        if to_zero:
+            if minmin == 0:
+                new_range = [0, 1]
+            else:
+                max_pad = max(get_pad(point) for point in (maxs if minmin > 0 else mins))
+                end = minmin / (1 - min(0.5, max_pad / length))
+                new_range = [0, end] if minmin > 0 else [end, 0]
+        elif non_negative:
+            new_range = [max(0, lower), max(1, upper)]
+        else:
+            new_range = [lower, upper]
+    else:
+        if to_zero:
+            if min_best['val'] >= 0:
+                min_best = {'val': 0, 'nopad': 1}
+            if max_best['val'] <= 0:
+                max_best = {'val': 0, 'nopad': 1}
+        elif non_negative:
+            if min_best['val'] - best * get_pad(min_best) < 0:
+                min_best = {'val': 0, 'nopad': 1}
+            if max_best['val'] <= 0:
+                max_best = {'val': 1, 'nopad': 1}
+
+        best = (max_best['val'] - min_best['val']) / (length - get_pad(min_best) - get_pad(max_best))
+        new_range = [min_best['val'] - best * get_pad(min_best), max_best['val'] + best * get_pad(max_best)]
+
+    if reverse:
+        new_range.reverse()
+    return new_range
+
+
+def figure_ranges(fig):
+    """
+    function computes the autoranges of the x and y axis of a figure without rendering it,
+    replaces fig.full_figure_for_development().layout.xaxis.range (and yaxis).
+    Only the traces supported by trace_extremes are possible, i.e. no image traces
+
+    Args:
+        fig: plotly figure or figure dictionary
+    Returns:
+        {'x': [start, end], 'y': [start, end]}, log axes in log10 units like plotly
+    """
+    fig = _as_dict(fig)
+    layout = fig.get('layout') or {}
+    traces = [
+        trace for trace in fig.get('data') or []
+        if trace.get('visible', True) is True
+    ]
+
+    ranges = {}
+    for axis in ('x', 'y'):
+        settings = layout.get(f'{axis}axis') or {}
+        axis_traces = [trace for trace in traces if trace.get(f'{axis}axis', axis) == axis]
+        if settings.get('autorange') is False and settings.get('range') is not None:
+            ranges[axis] = list(settings['range'])
+            continue
+
+        log = settings.get('type') == 'log'
+        extremes = [trace_extremes(trace, axis, log) for trace in axis_traces]
+        reverse = settings.get('autorange') == 'reversed'
+        new_range = auto_range(
+            extremes, axis_length(layout, axis), settings.get('rangemode', 'normal'), reverse
+        )
+        ranges[axis] = new_range if new_range is not None else list(DEFAULT_RANGE[axis])
+        if not all(math.isfinite(v) for v in ranges[axis]):
+            ranges[axis] = list(DEFAULT_RANGE[axis])
+    return ranges
@@ -0,0 +1,136 @@
+# headless version of plotlyDash_rotate_crop.py, rotates and crops all images of a directory
+#
+# the manifest is a json file which maps file names to the shapes drawn on the image, i.e. the
+# content of the exported annotations. Optionally alignment and invert can be given per image:
+#
+#     {
+#         "bridge.jpg": [{"type": "line", "x0": 10, "y0": 20, "x1": 400, "y1": 50}],
+#         "other.jpg": {"shapes": [{"type": "rect", ...}], "alignment": "vertical", "invert": true}
+#     }
+#
+# usage:
+#     python batch_rotate_crop.py images/ manifest.json output/ --workers 4
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from image_processing import first_shape, line_angle, rect_bounds
+from scipy.ndimage import rotate
+from PIL import Image
+import numpy as np
+import argparse
+import json
+import time
+import os
+
+
+def output_names(file_names):
+    """
+    function derives unique names for the results from the file names of the manifest. The extension
+    and sub directories are kept in the name (a.jpg -> a_jpg, sub/a.jpg -> sub_a_jpg), remaining
+    collisions get a counter
+
+    Returns:
+        dictionary file name -> output name
+    """
+    names, used = {}, set()
+    for file_name in file_names:
+        base = file_name.replace('\\', '/').strip('/').replace('/', '_').replace('.', '_')
+        name, counter = base, 1
+        while name in used:
+            counter += 1
+            name = f'{base}_{counter}'
+        used.add(name)
+        names[file_name] = name
+    return names
+
+
+def process_image(image_path, entry, output_dir, order=3, name=None):
+    """
+    function rotates and/or crops one image like the dash app and writes the results to disk.
+    a line rotates the image, a rectangle crops the original image, clipped at the image borders
+
+    Args:
+        image_path: path of the image
+        entry: list of shapes or dictionary with keys shapes, alignment, invert
+        output_dir: directory for the results
+        order: order of the spline interpolation
+        name: name of the results, by default derived from the file name
+    Returns:
+        list of written files
+    """
+    if isinstance(entry, list):
+        entry = {'shapes': entry}
+    shapes = entry.get('shapes', [])
+    name = name or os.path.basename(image_path).replace('.', '_')
+    img_arr = np.asarray(Image.open(image_path))
+    written = []
+
+    line = first_shape(shapes, 'line')
+    if line is not None:
+        angle = line_angle(line, entry.get('alignment', 'horizontal'), entry.get('invert', False))
+        path = os.path.join(output_dir, f'{name}_rotated.png')
+        Image.fromarray(rotate(img_arr, angle, order=order)).save(path)
+        written.append(path)
+
+    rect = first_shape(shapes, 'rect')
+    if rect is not None:
+        # rectangles drawn partly outside of the image are clipped like WindowedImage.read does
+        y_min, y_max, x_min, x_max = rect_bounds(rect)
+        y_min, y_max = max(0, y_min), min(img_arr.shape[0], y_max)
+        x_min, x_max = max(0, x_min), min(img_arr.shape[1], x_max)
+        if y_min >= y_max or x_min >= x_max:
+            raise ValueError(f'rectangle {rect_bounds(rect)} lies outside of the image')
+        path = os.path.join(output_dir, f'{name}_cropped.png')
+        Image.fromarray(img_arr[y_min:y_max, x_min:x_max]).save(path)
+        written.append(path)
+    return written
+
+
+def run(image_dir, manifest_path, output_dir, workers=None, order=3):
+    """
+    function processes all images of the manifest on a process pool, the results are written
+    as soon as an image is finished. Prints the progress and the throughput in images per second
+
+    Returns:
+        (processed, failed): number of successfully processed and of failed images
+    """
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_names(manifest)
+
+    start = time.perf_counter()
+    processed, failed = 0, 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                process_image, os.path.join(image_dir, file_name), entry, output_dir, order, names[file_name]
+            ): file_name
+            for file_name, entry in manifest.items()
+        }
+        for future in as_completed(futures):
+            try:
+                written = ', '.join(future.result()) or 'no line/rect shapes'
+                processed += 1
+            except Exception as error:
+                written = f'failed: {error}'
+                failed += 1
+            done = processed + failed
+            elapsed = time.perf_counter() - start
+            print(f'[{done}/{len(futures)}] {futures[future]}: {written} ({done / elapsed:.2f} images/s)')
+
+    elapsed = time.perf_counter() - start
+    print(f'processed {processed} images, {failed} failed, in {elapsed:.2f} s, '
+          f'{(processed + failed) / max(elapsed, 1e-9):.2f} images/s')
+    return processed, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='rotate and crop images with the shapes of a manifest')
+    parser.add_argument('image_dir', help='directory containing the images')
+    parser.add_argument('manifest', help='json file, maps file names to shapes')
+    parser.add_argument('output_dir', help='directory for the rotated/cropped images')
+    parser.add_argument('--workers', type=int, default=None, help='number of processes, default: cpu count')
+    parser.add_argument('--order', type=int, default=3, help='order of the spline interpolation')
+    args = parser.parse_args()
+    _, failed = run(args.image_dir, args.manifest, args.output_dir, workers=args.workers, order=args.order)
+    raise SystemExit(1 if failed else 0)
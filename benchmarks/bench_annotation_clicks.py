@@ -0,0 +1,36 @@
+"""
+response of a click in plotlyDash_annotations.py: a Patch which appends the new shape against
+the complete figure with all shapes (which was also sent as State before)
+
+run from the root of the repository: python -m benchmarks.bench_annotation_clicks
+"""
+from plotlyDash_annotations import create_shape, fig
+from dash import Patch
+import plotly.graph_objects as go
+import plotly.io as pio
+import time
+
+COUNTS = (1, 100, 1000, 5000)
+
+
+def patch_response(shapes, new_shape):
+    patched_figure = Patch()
+    patched_figure['layout']['shapes'].extend(new_shape)
+    return pio.json.to_json_plotly(patched_figure.to_plotly_json())
+
+
+def figure_response(shapes, new_shape):
+    figure = go.Figure(fig)
+    figure.update_layout(shapes=shapes + new_shape)
+    return pio.json.to_json_plotly(figure.to_plotly_json())
+
+
+if __name__ == '__main__':
+    for count in COUNTS:
+        shapes = [create_shape(x=i % 160, y=i % 90, size=5)[0] for i in range(count)]
+        new_shape = create_shape(x=1, y=2, size=5)
+        for fn in (patch_response, figure_response):
+            start = time.perf_counter()
+            size = len(fn(shapes, new_shape))
+            print(f'{count:>5} shapes, {fn.__name__:>15}: {size / 1024:9.1f} kB, '
+                  f'{(time.perf_counter() - start) * 1e3:8.2f} ms')
@@ -0,0 +1,37 @@
+"""
+import of exported annotations: json.loads plus validation against the binary format,
+time and file size for growing numbers of shapes
+
+run from the root of the repository: python -m benchmarks.bench_annotation_io
+"""
+from annotation_io import dump_shapes_binary, load_annotations
+import numpy as np
+import json
+import time
+
+COUNTS = (10_000, 100_000, 1_000_000)
+
+
+def example_shapes(n):
+    rng = np.random.default_rng(0)
+    coords = rng.uniform(0, 4000, (n, 4)).round(2).tolist()
+    style = {'line': {'color': '#E2F714', 'width': 2}, 'fillcolor': 'rgba(1.0, 1.0, 1.0, 0.2)', 'opacity': 1.0}
+    return [dict(style, type='rect', x0=x0, y0=y0, x1=x1, y1=y1) for x0, y0, x1, y1 in coords]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    for n in COUNTS:
+        shapes = example_shapes(n)
+        text = json.dumps(shapes).encode()
+        binary = dump_shapes_binary(shapes)
+        loaded_json, json_time = timed(load_annotations, text)
+        loaded_binary, binary_time = timed(load_annotations, binary)
+        assert loaded_json == shapes and loaded_binary == shapes
+        print(f'{n:>9} shapes: json {len(text) / 2 ** 20:7.1f} MB {json_time:6.2f} s, '
+              f'binary {len(binary) / 2 ** 20:6.1f} MB {binary_time:6.2f} s')
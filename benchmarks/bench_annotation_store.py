@@ -0,0 +1,83 @@
+"""
+operations of the AnnotationStore at 100k shapes against a linear scan of the list of shape
+dictionaries, as the apps did before. Times are per call, the glob after a bulk rename includes
+the update of the sorted name index.
+
+Hit tests, region queries, name lookups and single edits stay well below a millisecond.
+Bulk edits of all 100k shapes (update_style) take about 1-2 ms, and the first search after
+more than MAX_NAME_UPDATES renames re-sorts all names, about 10 ms at 100k names
+
+run from the root of the repository: python -m benchmarks.bench_annotation_store
+"""
+from annotation_store import AnnotationStore
+from fnmatch import fnmatchcase
+import numpy as np
+import time
+
+COUNT = 100_000
+REPEAT = 20
+
+
+def random_shapes(rng, count, extent=10_000):
+    x0, y0 = rng.uniform(0, extent, count), rng.uniform(0, extent, count)
+    w, h = rng.uniform(1, 40, count), rng.uniform(1, 40, count)
+    kinds = rng.choice(['rect', 'circle', 'line'], count)
+    colors = rng.choice(['red', 'green', 'blue', 'black'], count)
+    return [
+        {'type': kind, 'x0': a, 'y0': b, 'x1': a + c, 'y1': b + d, 'name': f'shape_{i}', 'line': {'color': color}}
+        for i, (kind, a, b, c, d, color) in enumerate(zip(kinds.tolist(), x0.tolist(), y0.tolist(),
+                                                          w.tolist(), h.tolist(), colors.tolist()))
+    ]
+
+
+def timed(fn, repeat=REPEAT):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def scan_query(shapes, x0, y0, x1, y1):
+    return [i for i, s in enumerate(shapes) if min(s['x0'], s['x1']) <= x1 and max(s['x0'], s['x1']) >= x0
+            and min(s['y0'], s['y1']) <= y1 and max(s['y0'], s['y1']) >= y0]
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    shapes = random_shapes(rng, COUNT)
+
+    start = time.perf_counter()
+    store = AnnotationStore(shapes)
+    print(f'{COUNT} shapes, building the store: {(time.perf_counter() - start) * 1e3:8.1f} ms')
+
+    rows = [
+        ('hit test', lambda: store.hit_test(5000, 5000), lambda: scan_query(shapes, 5000, 5000, 5000, 5000)),
+        ('query 200x200', lambda: store.query(4000, 4000, 4200, 4200),
+         lambda: scan_query(shapes, 4000, 4000, 4200, 4200)),
+        ('lasso 200x200', lambda: store.query_polygon([4000, 4200, 4100], [4000, 4000, 4200]), None),
+        ('exact name', lambda: store.ids_by_name('shape_500'),
+         lambda: [i for i, s in enumerate(shapes) if s['name'] == 'shape_500']),
+        ('glob shape_123*', lambda: store.find_names('shape_123*', 'glob'),
+         lambda: [s['name'] for s in shapes if fnmatchcase(s['name'], 'shape_123*')]),
+        ('set_property x0', lambda: store.set_property(7, 'x0', 123.0), None),
+        ('update_style 1k', lambda: store.update_style(np.arange(1000), opacity=0.5), None),
+        ('update_style 100k', lambda: store.update_style(np.arange(COUNT), opacity=0.5), None),
+    ]
+    for label, fn, scan in rows:
+        seconds, _ = timed(fn)
+        line = f'{label:>22}: store {seconds * 1e3:8.3f} ms'
+        if scan is not None:
+            scan_seconds, _ = timed(scan, repeat=3)
+            line += f', list scan {scan_seconds * 1e3:8.2f} ms'
+        print(line)
+
+    # the sorted name index is updated by the first search after the names changed
+    for renamed in (10, 1000):
+        times = []
+        for repeat in range(REPEAT):
+            for i in range(renamed):
+                store.set_property(i, 'name', f'renamed_{repeat}_{i}')
+            start = time.perf_counter()
+            store.find_names('shape_123*', 'glob')
+            times.append(time.perf_counter() - start)
+        print(f'{"glob after " + str(renamed) + " renames":>22}: store {np.mean(times) * 1e3:8.3f} ms')
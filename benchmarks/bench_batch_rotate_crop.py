@@ -0,0 +1,44 @@
+"""
+throughput of batch_rotate_crop.py in images per second for 1, 2, 4, ... processes
+
+run from the root of the repository: python -m benchmarks.bench_batch_rotate_crop [images] [max processes]
+"""
+from batch_rotate_crop import run
+from PIL import Image
+import numpy as np
+import contextlib
+import tempfile
+import json
+import time
+import sys
+import io
+import os
+
+SHAPE = (768, 1024, 3)
+SHAPES = [
+    {'type': 'line', 'x0': 10, 'y0': 20, 'x1': 900, 'y1': 120},
+    {'type': 'rect', 'x0': 100, 'y0': 100, 'x1': 600, 'y1': 500},
+]
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(count):
+            Image.fromarray(rng.integers(0, 255, SHAPE, dtype=np.uint8)).save(os.path.join(directory, f'{i}.png'))
+        manifest_path = os.path.join(directory, 'manifest.json')
+        with open(manifest_path, 'w') as f:
+            json.dump({f'{i}.png': SHAPES for i in range(count)}, f)
+
+        print(f'{count} images of {SHAPE[1]}x{SHAPE[0]}, rotate (cubic) and crop, {os.cpu_count()} cpu cores')
+        workers = 1
+        while workers <= max_workers:
+            start = time.perf_counter()
+            # the progress lines are not part of the benchmark output
+            with contextlib.redirect_stdout(io.StringIO()):
+                processed, failed = run(directory, manifest_path, os.path.join(directory, f'out{workers}'), workers)
+            seconds = time.perf_counter() - start
+            print(f'{workers:>2} processes: {processed / seconds:6.2f} images/s ({failed} failed)')
+            workers *= 2
@@ -0,0 +1,31 @@
+"""
+rendering of point annotations: one svg circle shape per point against one WebGL scatter trace,
+size of the response and time to build it for growing numbers of points
+
+run from the root of the repository: python -m benchmarks.bench_point_overlay
+"""
+from point_overlay import render_patch
+import plotly.io as pio
+import numpy as np
+import time
+
+COUNTS = (100, 1_000, 10_000, 100_000)
+
+
+def circles(n):
+    rng = np.random.default_rng(0)
+    return [
+        {'type': 'circle', 'xref': 'x', 'yref': 'y', 'x0': x - 2.5, 'y0': y - 2.5, 'x1': x + 2.5, 'y1': y + 2.5,
+         'line': {'color': 'rgba(39,43,48,255)', 'width': 1}, 'fillcolor': 'rgba(39,43,48,255)'}
+        for x, y in rng.uniform(0, 4000, (n, 2)).tolist()
+    ]
+
+
+if __name__ == '__main__':
+    for count in COUNTS:
+        shapes = circles(count)
+        for mode, threshold in (('shapes', count), ('scattergl', 0)):
+            start = time.perf_counter()
+            size = len(pio.json.to_json_plotly(render_patch(shapes, 1, threshold=threshold).to_plotly_json()))
+            print(f'{count:>7} points as {mode:>9}: {size / 1024:9.1f} kB, '
+                  f'{(time.perf_counter() - start) * 1e3:8.1f} ms')
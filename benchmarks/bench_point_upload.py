@@ -0,0 +1,36 @@
+"""
+upload of point annotations: parsing csv (np.loadtxt) and npy files, and building the
+trace (scatter or density heatmap) for growing numbers of points
+
+run from the root of the repository: python -m benchmarks.bench_point_upload
+"""
+from point_overlay import load_points, uploaded_points_trace
+import numpy as np
+import time
+import io
+
+HEIGHT, WIDTH = 2160, 3840
+COUNTS = (10_000, 100_000, 1_000_000)
+
+
+def files(points):
+    csv = io.StringIO()
+    csv.write('x,y\n')
+    np.savetxt(csv, points, delimiter=',', fmt='%.2f')
+    npy = io.BytesIO()
+    np.save(npy, points)
+    return {'points.csv': csv.getvalue().encode(), 'points.npy': npy.getvalue()}
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    for count in COUNTS:
+        points = rng.uniform(0, [WIDTH, HEIGHT], (count, 2))
+        for file_name, data in files(points).items():
+            start = time.perf_counter()
+            xs, ys = load_points(data, file_name)
+            parsed = time.perf_counter() - start
+            trace = uploaded_points_trace(xs, ys, HEIGHT, WIDTH)
+            total = time.perf_counter() - start
+            print(f'{count:>9} points, {file_name}: {len(data) / 2 ** 20:6.1f} MB, parse {parsed:6.2f} s, '
+                  f'{count / parsed / 1e6:5.2f} M points/s, with {trace["type"]} {total:6.2f} s')
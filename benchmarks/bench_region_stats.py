@@ -0,0 +1,42 @@
+"""
+statistics of drawn rectangles: summed area tables (O(1) per rectangle) against numpy slicing
+of the rectangle (O(pixels of the rectangle)) on a large image
+
+run from the root of the repository: python -m benchmarks.bench_region_stats
+"""
+from region_stats import RegionStats
+import numpy as np
+import time
+
+SHAPE = (3000, 4000, 3)
+RECTANGLES = 200
+
+
+def naive(img, y0, y1, x0, x1):
+    region = img[y0:y1, x0:x1].reshape(-1, img.shape[2]).astype(np.float64)
+    return region.sum(axis=0), region.mean(axis=0), region.var(axis=0)
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, SHAPE, dtype=np.uint8)
+
+    start = time.perf_counter()
+    stats = RegionStats(img)
+    print(f'{SHAPE[1]}x{SHAPE[0]}x{SHAPE[2]}, building the tables: {time.perf_counter() - start:.2f} s')
+
+    for size in (100, 500, 2000):
+        windows = [
+            (y, y + size, x, x + size)
+            for y, x in zip(rng.integers(0, SHAPE[0] - size, RECTANGLES), rng.integers(0, SHAPE[1] - size, RECTANGLES))
+        ]
+        start = time.perf_counter()
+        for window in windows:
+            stats.region(*window)
+        tables = (time.perf_counter() - start) / RECTANGLES
+        start = time.perf_counter()
+        for window in windows:
+            naive(img, *window)
+        slicing = (time.perf_counter() - start) / RECTANGLES
+        print(f'{size:>5} px rectangles: tables {tables * 1e6:8.1f} us, slicing {slicing * 1e6:10.1f} us, '
+              f'speedup {slicing / tables:8.0f}')
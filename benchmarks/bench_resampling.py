@@ -0,0 +1,45 @@
+"""
+zoom example: points sent to the browser per zoom, the visible points reduced to the pixels of
+the x axis (minmax, LTTB) against all visible points. The raw json size is measured on 1M points
+and scaled for larger datasets
+
+run from the root of the repository: python -m benchmarks.bench_resampling
+"""
+from resampling import SortedSeries, resample
+import numpy as np
+import json
+import time
+
+COUNTS = (1_000_000, 10_000_000)
+PIXELS = 640
+
+# full view, a tenth and a thousandth of the x axis
+VIEWS = {'full': None, '10%': [0.45, 0.55], '0.1%': [0.5, 0.501]}
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def payload(series, idx):
+    return len(json.dumps({'x': series.x[idx].tolist(), 'y': series.y[idx].tolist()}))
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+    raw_bytes_per_point = None
+    for count in COUNTS:
+        series, elapsed = timed(SortedSeries, rng.random(count), rng.random(count))
+        print(f'{count:,} points, sorting once: {elapsed:.2f} s')
+        for name, x_range in VIEWS.items():
+            visible = series.visible(x_range)
+            n_visible = visible.stop - visible.start
+            if raw_bytes_per_point is None:
+                raw_bytes_per_point = payload(series, visible) / n_visible
+            line = f'  {name:>5} view, {n_visible:>10,} visible points, raw ~{n_visible * raw_bytes_per_point / 2 ** 20:7.1f} MB'
+            for method in ('minmax', 'lttb'):
+                idx, elapsed = timed(resample, series, x_range, pixels=PIXELS, method=method)
+                line += f' | {method} {len(idx):5} points {payload(series, idx) / 1024:5.0f} kB {elapsed * 1e3:6.1f} ms'
+            print(line)
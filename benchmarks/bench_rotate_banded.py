@@ -0,0 +1,37 @@
+"""
+scaling of image_processing.rotate_banded with the number of threads, compared to scipy.ndimage.rotate.
+The bands only run in parallel if the scipy interpolation releases the GIL, run it on a machine
+with several cores to measure the speedup (a single core shows only the overhead of the bands)
+
+run from the root of the repository: python -m benchmarks.bench_rotate_banded [max threads]
+"""
+from image_processing import rotate_banded
+from scipy.ndimage import rotate
+import numpy as np
+import time
+import sys
+import os
+
+SHAPE = (4000, 6000, 3)
+ANGLE = 17
+ORDER = 3
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    max_workers = int(sys.argv[1]) if len(sys.argv) > 1 else os.cpu_count()
+    img = np.random.default_rng(0).integers(0, 255, SHAPE, dtype=np.uint8)
+
+    reference = timed(rotate, img, ANGLE, order=ORDER)
+    print(f'{SHAPE[1]}x{SHAPE[0]}x{SHAPE[2]}, order {ORDER}, {os.cpu_count()} cpu cores')
+    print(f'scipy.ndimage.rotate: {reference:.2f} s')
+    workers = 1
+    while workers <= max_workers:
+        seconds = timed(rotate_banded, img, ANGLE, order=ORDER, workers=workers)
+        print(f'rotate_banded, {workers:>2} threads: {seconds:.2f} s, speedup vs scipy {reference / seconds:.2f}')
+        workers *= 2
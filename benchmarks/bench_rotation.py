@@ -0,0 +1,36 @@
+"""
+latency of the two stages of a rotation in plotlyDash_rotate_crop.py: the preview (every 4th pixel,
+bilinear) and the full quality rotation (cubic spline), both including the png encoding
+
+run from the root of the repository: python -m benchmarks.bench_rotation
+"""
+from image_figures import image_figure, encoding_cache
+from scipy.ndimage import rotate
+import numpy as np
+import time
+
+SIZES = [(400, 600), (1000, 1500), (2000, 3000), (4000, 6000)]
+ANGLE = 12.3
+PREVIEW_STEP = 4
+PREVIEW_ORDER = 1
+FULL_ORDER = 3
+
+
+def stage(img, step, order):
+    start = time.perf_counter()
+    image_figure(rotate(img[::step, ::step], ANGLE, order=order))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    rng = np.random.default_rng(0)
+
+    # the first call imports and initializes the encoders
+    stage(rng.integers(0, 255, (64, 64, 3), dtype=np.uint8), 1, FULL_ORDER)
+    print(f'{"image":>12} {"preview [s]":>12} {"full [s]":>10} {"ratio":>7}')
+    for height, width in SIZES:
+        img = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+        encoding_cache.clear()
+        preview = stage(img, PREVIEW_STEP, PREVIEW_ORDER)
+        full = stage(img, 1, FULL_ORDER)
+        print(f'{width:>5}x{height:<6} {preview:>12.3f} {full:>10.3f} {full / preview:>7.1f}')
@@ -0,0 +1,51 @@
+"""
+undo history of 10k shapes with 1k edits: versions of a ChunkedVector (only the edited chunk is
+copied) against a copy of the list of shapes per step
+
+run from the root of the repository: python -m benchmarks.bench_shape_history
+"""
+from shape_history import ShapeHistory
+import tracemalloc
+import time
+
+SHAPES = 10_000
+EDITS = 1_000
+RECT = {'type': 'rect', 'x0': 1, 'y0': 2, 'x1': 30, 'y1': 40, 'line': {'color': '#E2F714', 'width': 2}}
+
+
+def edits():
+    return [(i * 7919 % SHAPES, -i) for i in range(EDITS)]
+
+
+def chunked(shapes):
+    history = ShapeHistory(shapes)
+    for idx, value in edits():
+        history.apply_relayout({f'shapes[{idx}].x0': value})
+    return history
+
+
+def list_copies(shapes):
+    steps = [shapes]
+    for idx, value in edits():
+        current = list(steps[-1])
+        current[idx] = dict(current[idx], x0=value)
+        steps.append(current)
+    return steps
+
+
+def measure(fn, shapes):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(shapes)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+if __name__ == '__main__':
+    shapes = [dict(RECT, x0=i) for i in range(SHAPES)]
+    print(f'{SHAPES} shapes, {EDITS} edits')
+    for fn in (chunked, list_copies):
+        _, elapsed, size = measure(fn, shapes)
+        print(f'{fn.__name__:>12}: {elapsed:6.2f} s, history {size / 2 ** 20:8.1f} MB')
@@ -0,0 +1,56 @@
+"""
+label mask export: 10k shapes of 5-60 px on a 4k image, every shape only touches its bounding box.
+The baseline tests every pixel of the image per shape (measured on a few shapes and extrapolated)
+
+run from the root of the repository: python -m benchmarks.bench_shape_masks
+"""
+from shape_masks import encode_mask, rasterize
+import numpy as np
+import time
+
+HEIGHT, WIDTH = 2160, 3840
+SHAPES = 10_000
+BASELINE_SHAPES = 20
+
+
+def example_shapes(n):
+    rng = np.random.default_rng(0)
+    shapes = []
+    for i in range(n):
+        x, y = rng.uniform(0, WIDTH - 60), rng.uniform(0, HEIGHT - 60)
+        w, h = rng.uniform(5, 60, 2)
+        kind = ['rect', 'circle', 'line', 'path'][i % 4]
+        if kind == 'path':
+            shapes.append({'type': 'path', 'path': f'M{x},{y}L{x + w},{y}L{x},{y + h}Z'})
+        else:
+            shapes.append({'type': kind, 'x0': x, 'y0': y, 'x1': x + w, 'y1': y + h})
+    return shapes
+
+
+def full_image(shapes):
+    # i.e. a rectangle tested on every pixel center of the image
+    rows, cols = np.arange(HEIGHT)[:, None], np.arange(WIDTH)[None, :]
+    mask = np.zeros((HEIGHT, WIDTH), dtype=np.uint16)
+    for label, shape in enumerate(shapes, 1):
+        x0, x1 = sorted((shape.get('x0', 0), shape.get('x1', 0)))
+        y0, y1 = sorted((shape.get('y0', 0), shape.get('y1', 0)))
+        mask[(cols >= x0) & (cols <= x1) & (rows >= y0) & (rows <= y1)] = label
+    return mask
+
+
+if __name__ == '__main__':
+    shapes = example_shapes(SHAPES)
+    start = time.perf_counter()
+    mask = rasterize(shapes, HEIGHT, WIDTH)
+    elapsed = time.perf_counter() - start
+    print(f'{SHAPES} shapes on {WIDTH}x{HEIGHT}: {elapsed:.2f} s, {SHAPES / elapsed:,.0f} shapes/s')
+
+    start = time.perf_counter()
+    full_image(shapes[:BASELINE_SHAPES])
+    baseline = (time.perf_counter() - start) / BASELINE_SHAPES
+    print(f'full image test per shape: {baseline * 1e3:.1f} ms, {SHAPES} shapes ~{baseline * SHAPES:.0f} s')
+
+    for file_format in ('png', 'npy'):
+        start = time.perf_counter()
+        size = len(encode_mask(mask, file_format))
+        print(f'{file_format}: {time.perf_counter() - start:.2f} s, {size / 2 ** 20:.1f} MB')
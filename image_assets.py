@@ -0,0 +1,329 @@
+from image_processing import rotation_geometry
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from scipy import ndimage
+from PIL import Image
+import urllib.request
+import numpy as np
+import tempfile
+import hashlib
+import math
+import os
+
+# downloaded files are stored by the sha256 of their content, decoded pixels next to them as .npy
+ASSET_DIR = os.environ.get('ASSET_DIR', './asset_cache')
+
+# edge length of the tiles of the windowed cache in pixels
+TILE_SIZE = 256
+
+# no network access at all, only previously cached assets can be loaded
+OFFLINE = os.environ.get('ASSET_OFFLINE', '0') == '1'
+
+
+def _write_atomic(path, write):
+    """
+    function writes a file via a temporary file, concurrent workers never see half written files
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    try:
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(2 ** 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fetch(source, sha256=None):
+    """
+    function returns the path of a locally cached copy of a file. Urls are downloaded only once,
+    afterwards the file is found via a reference file named by the hash of the url
+
+    Args:
+        source: url or path of a local file
+        sha256: expected hash of the content, optional
+    Returns:
+        path: path of the file, named by the sha256 of its content
+    """
+    # local files are used directly
+    if not urlparse(source).scheme:
+        return source
+
+    ref_path = os.path.join(ASSET_DIR, 'refs', hashlib.sha256(source.encode()).hexdigest())
+    if os.path.exists(ref_path):
+        with open(ref_path) as f:
+            path = f.read()
+        if os.path.exists(path):
+            return path
+
+    if OFFLINE:
+        raise FileNotFoundError(f'{source} is not cached and ASSET_OFFLINE=1')
+
+    # download into a temporary file, move it to its content address afterwards
+    os.makedirs(os.path.join(ASSET_DIR, 'blobs'), exist_ok=True)
+    fd, download_path = tempfile.mkstemp(dir=os.path.join(ASSET_DIR, 'blobs'), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f, urllib.request.urlopen(source) as response:
+            f.write(response.read())
+        digest = _sha256(download_path)
+        if sha256 is not None and digest != sha256:
+            raise ValueError(f'sha256 of {source} is {digest}, expected {sha256}')
+        path = os.path.join(ASSET_DIR, 'blobs', digest + os.path.splitext(urlparse(source).path)[1])
+        os.replace(download_path, path)
+    except BaseException:
+        os.remove(download_path)
+        raise
+
+    _write_atomic(ref_path, lambda f: f.write(path.encode()))
+    return path
+
+
+def _fetch_with_digest(source, sha256):
+    """
+    function returns the path of the cached file and the sha256 of its content
+    """
+    path = fetch(source, sha256=sha256)
+
+    # cached downloads are named by their hash, local files have to be hashed
+    if urlparse(source).scheme:
+        return path, os.path.splitext(os.path.basename(path))[0]
+    return path, _sha256(path)
+
+
+def load_image(source, sha256=None):
+    """
+    function loads the pixels of an image. The image is decoded only once, the pixels are stored
+    as .npy file and memory mapped, so several workers share the same memory pages
+
+    Args:
+        source: url or path of a local image file
+        sha256: expected hash of the file content, optional
+    Returns:
+        read only array of shape (height, width) or (height, width, channels)
+    """
+    path, digest = _fetch_with_digest(source, sha256)
+    npy_path = os.path.join(ASSET_DIR, 'pixels', digest + '.npy')
+    if not os.path.exists(npy_path):
+        pixels = np.asarray(Image.open(path))
+        _write_atomic(npy_path, lambda f: np.save(f, pixels))
+    return np.load(npy_path, mmap_mode='r')
+
+
+def _raw_pixels(pil_img, path):
+    """
+    function memory maps the pixels of uncompressed images (i.e. tiff) directly from the file
+
+    Returns:
+        memory mapped array or None if the pixels are compressed or stored in several parts
+    """
+    if len(pil_img.tile) != 1 or pil_img.mode not in ('L', 'RGB', 'RGBA'):
+        return None
+    codec, extents, offset, args = pil_img.tile[0]
+    if codec != 'raw' or args != (pil_img.mode, 0, 1) or tuple(extents) != (0, 0) + pil_img.size:
+        return None
+    shape = (pil_img.height, pil_img.width) + ((len(pil_img.mode),) if pil_img.mode != 'L' else ())
+    return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=shape)
+
+
+def _build_tiles(path, npy_path, tile_size):
+    """
+    function stores the pixels of an image as memory mapped array of tiles,
+    shape: (tile rows, tile columns, tile_size, tile_size, channels)
+    """
+    # gigapixel images are expected here, switch off the decompression bomb check
+    max_pixels, Image.MAX_IMAGE_PIXELS = Image.MAX_IMAGE_PIXELS, None
+    try:
+        with Image.open(path) as pil_img:
+            # uncompressed pixels are copied strip by strip, everything else has to be decoded once
+            pixels = _raw_pixels(pil_img, path)
+            if pixels is None:
+                pixels = np.asarray(pil_img)
+    finally:
+        Image.MAX_IMAGE_PIXELS = max_pixels
+
+    height, width = pixels.shape[:2]
+    rows, cols = math.ceil(height / tile_size), math.ceil(width / tile_size)
+
+    def write(f):
+        tiles = np.lib.format.open_memmap(
+            f.name, mode='w+', dtype=pixels.dtype,
+            shape=(rows, cols, tile_size, tile_size) + pixels.shape[2:]
+        )
+        for row in range(rows):
+            strip = pixels[row * tile_size:(row + 1) * tile_size]
+            for col in range(cols):
+                part = strip[:, col * tile_size:(col + 1) * tile_size]
+                tiles[row, col, :part.shape[0], :part.shape[1]] = part
+        tiles.flush()
+        del tiles
+
+    _write_atomic(npy_path, write)
+
+    # the size of the image is not part of the tiles
+    _write_atomic(npy_path + '.shape', lambda f: f.write(f'{height},{width}'.encode()))
+
+
+class WindowedImage:
+    """
+    image stored as memory mapped tiles. Reading a window only touches the tiles
+    which intersect the window, so crops and rotations of images which do not fit
+    into memory are possible.
+    """
+
+    def __init__(self, tiles, height, width, path=None):
+        self.tiles = tiles
+        # file of the tiles, derived caches are stored next to it
+        self.path = path
+        self.tile_size = tiles.shape[2]
+        self.height = height
+        self.width = width
+        self.shape = (height, width) + tiles.shape[4:]
+        self.dtype = tiles.dtype
+
+    def read(self, y0, y1, x0, x1, step=1):
+        """
+        function reads the window [y0:y1:step, x0:x1:step] of the image, the window is clipped
+        at the image borders
+
+        Args:
+            y0, y1, x0, x1: bounds of the window
+            step: read only every step-th row and column, i.e. for previews
+        Returns:
+            array of the window
+        """
+        y0, y1 = max(0, y0), min(self.height, y1)
+        x0, x1 = max(0, x0), min(self.width, x1)
+        window = np.zeros(
+            (max(0, -(-(y1 - y0) // step)), max(0, -(-(x1 - x0) // step))) + self.shape[2:], dtype=self.dtype
+        )
+        t = self.tile_size
+        for row in range(y0 // t, math.ceil(y1 / t)):
+            # first row of the tile which lies on the grid of the window
+            ty0 = max(y0, row * t)
+            ty0 += -(ty0 - y0) % step
+            ty1 = min(y1, (row + 1) * t)
+            for col in range(x0 // t, math.ceil(x1 / t)):
+                tx0 = max(x0, col * t)
+                tx0 += -(tx0 - x0) % step
+                tx1 = min(x1, (col + 1) * t)
+                if ty0 >= ty1 or tx0 >= tx1:
+                    continue
+                part = self.tiles[row, col, ty0 - row * t:ty1 - row * t:step, tx0 - col * t:tx1 - col * t:step]
+                wy, wx = (ty0 - y0) // step, (tx0 - x0) // step
+                window[wy:wy + part.shape[0], wx:wx + part.shape[1]] = part
+        return window
+
+    def read_rotated(self, angle, window, order=3, margin=12, output=None):
+        """
+        function computes a window of the rotated image like scipy.ndimage.rotate(image, angle),
+        but only reads the part of the source image which is needed for this window. The source
+        coordinates are computed like scipy does, so orders 0 and 1 give identical results.
+        The spline filter of order > 1 only sees the source part, the margin keeps the deviation
+        from the full rotation small
+
+        Args:
+            angle: rotation angle in degrees
+            window: (y0, y1, x0, x1) in coordinates of the rotated image
+            order: order of the spline interpolation
+            margin: additional source pixels around the needed region
+            output: array for the result, optional
+        Returns:
+            array of the rotated window
+        """
+        rot_matrix, offset, out_shape = rotation_geometry((self.height, self.width), angle)
+        y0, y1, x0, x1 = window
+        y0, y1 = max(0, y0), min(out_shape[0], y1)
+        x0, x1 = max(0, x0), min(out_shape[1], x1)
+        if output is None:
+            output = np.zeros((max(0, y1 - y0), max(0, x1 - x0)) + self.shape[2:], dtype=self.dtype)
+        if not output.size:
+            return output
+
+        # source coordinates of the window in the order of scipy, (offset + m[0] * y) + m[1] * x
+        oy, ox = np.mgrid[y0:y1, x0:x1].astype(np.float64)
+        coordinates = [offset[i] + rot_matrix[i, 0] * oy + rot_matrix[i, 1] * ox for i in range(2)]
+        sy0 = max(0, math.floor(coordinates[0].min()) - margin)
+        sy1 = min(self.height, math.ceil(coordinates[0].max()) + margin + 1)
+        sx0 = max(0, math.floor(coordinates[1].min()) - margin)
+        sx1 = min(self.width, math.ceil(coordinates[1].max()) + margin + 1)
+        if sy0 >= sy1 or sx0 >= sx1:
+            output[...] = 0
+            return output
+
+        # subtracting the integer origin of the source part is exact
+        source = self.read(sy0, sy1, sx0, sx1)
+        coordinates = [coordinates[0] - sy0, coordinates[1] - sx0]
+
+        # pixels outside of the image are 0 like in scipy, the borders of the source part lie
+        # either on the image borders or outside of the needed region
+        planes = source.reshape(source.shape[:2] + (-1,))
+        out_planes = output.reshape(output.shape[:2] + (-1,))
+        for channel in range(planes.shape[2]):
+            ndimage.map_coordinates(
+                planes[:, :, channel], coordinates, output=out_planes[:, :, channel], order=order
+            )
+        return output
+
+    def rotate(self, angle, order=3, window=512, workers=None):
+        """
+        function rotates the complete image like scipy.ndimage.rotate(image, angle), window by window.
+        Every window reads only its part of the source image, the full source raster is never
+        loaded, the memory needed is the rotated image plus a few windows
+
+        Args:
+            angle: rotation angle in degrees
+            order: order of the spline interpolation
+            window: edge length of the output windows
+            workers: number of threads, defaults to the number of cpu cores
+        Returns:
+            rotated image
+        """
+        out_shape = rotation_geometry((self.height, self.width), angle)[2]
+        output = np.empty(out_shape + self.shape[2:], dtype=self.dtype)
+
+        def rotate_window(y0, x0):
+            y1, x1 = min(y0 + window, out_shape[0]), min(x0 + window, out_shape[1])
+            self.read_rotated(angle, (y0, y1, x0, x1), order=order, output=output[y0:y1, x0:x1])
+
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            tasks = [
+                pool.submit(rotate_window, y0, x0)
+                for y0 in range(0, out_shape[0], window)
+                for x0 in range(0, out_shape[1], window)
+            ]
+            for task in tasks:
+                task.result()
+        return output
+
+
+def open_windowed(source, sha256=None, tile_size=TILE_SIZE):
+    """
+    function opens an image for windowed reading. The image is converted once into a tiled,
+    memory mapped cache. Uncompressed images (i.e. tiff) are copied without loading the whole
+    raster, compressed formats without random access (jpeg, compressed tiff) are decoded once.
+
+    Args:
+        source: url or path of a local image file
+        sha256: expected hash of the file content, optional
+        tile_size: edge length of the tiles
+    Returns:
+        WindowedImage
+    """
+    path, digest = _fetch_with_digest(source, sha256)
+    npy_path = os.path.join(ASSET_DIR, 'pixels', f'{digest}.tiles{tile_size}.npy')
+    if not os.path.exists(npy_path + '.shape'):
+        _build_tiles(path, npy_path, tile_size)
+    with open(npy_path + '.shape') as f:
+        height, width = (int(v) for v in f.read().split(','))
+    return WindowedImage(np.load(npy_path, mmap_mode='r'), height, width, npy_path)
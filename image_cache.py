@@ -0,0 +1,85 @@
+from collections import OrderedDict
+import threading
+
+
+def quantize(value, step):
+    """
+    function rounds a value to the nearest multiple of step, used to build cache keys
+    so that nearly identical values (i.e. rotation angles) share one cache entry
+
+    Args:
+        value: float to round
+        step: quantization step, no rounding if step is falsy
+    Returns:
+        quantized value
+    """
+    if not step:
+        return value
+    return round(round(value / step) * step, 10)
+
+
+class LRUCache:
+    """
+    least recently used cache which is bounded by the number of entries and by
+    the memory used by the entries. Thread safe, because dash callbacks might
+    run in several threads.
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        function returns the cached value for key or None, marks the entry as recently used
+        """
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key, value, size):
+        """
+        function stores a value in the cache, least recently used entries are dropped
+        until the cache fits into its bounds again
+
+        Args:
+            key: hashable cache key
+            value: object to cache
+            size: memory used by value in bytes, values larger than max_bytes are not cached
+        """
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, dropped_size) = self._entries.popitem(last=False)
+                self._bytes -= dropped_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """
+        function returns hit/miss counters and the current fill level of the cache
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
@@ -0,0 +1,184 @@
+from collections import namedtuple
+from image_cache import LRUCache
+import plotly.graph_objects as go
+import plotly.colors as pc
+from base64 import b64encode
+from PIL import Image
+import numpy as np
+import hashlib
+import time
+import io
+
+# PIL format names and mime types of the supported codecs
+CODECS = {
+    'png': ('PNG', 'image/png'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'webp': ('WEBP', 'image/webp'),
+}
+
+# codec used by the apps, quality: compression level 0-9 for png, 1-100 for jpeg/webp
+DEFAULT_CODEC = 'png'
+DEFAULT_QUALITY = {'png': 6, 'jpeg': 85, 'webp': 80}
+
+# encodings are cached by content hash, identical pixels are encoded only once
+encoding_cache = LRUCache(max_entries=64, max_bytes=128 * 2 ** 20)
+
+Encoding = namedtuple('Encoding', ['uri', 'size', 'seconds', 'cached'])
+
+
+def content_hash(arr):
+    """
+    function hashes the pixel data, shape and dtype of an array
+    """
+    arr = np.ascontiguousarray(arr)
+    digest = hashlib.blake2b(arr, digest_size=16)
+    digest.update(f'{arr.shape}{arr.dtype}'.encode())
+    return digest.hexdigest()
+
+
+def to_uint8(arr):
+    """
+    function converts the pixels of an image to uint8, which is needed by PIL.
+    uint8 is used as it is, bool becomes 0/255, floats with a maximum <= 1 are scaled from [0, 1]
+    to [0, 255], other floats and integers are expected in [0, 255] and clipped
+
+    Args:
+        arr: array of dtype uint8, bool, any integer or float type
+    Returns:
+        uint8 array
+    """
+    if arr.dtype == np.uint8:
+        return arr
+    if arr.dtype == np.bool_:
+        return arr.astype(np.uint8) * 255
+    if np.issubdtype(arr.dtype, np.floating):
+        arr = np.nan_to_num(arr, nan=0.0, posinf=255.0, neginf=0.0)
+        if arr.size and arr.max() <= 1:
+            arr = arr * 255
+        return np.clip(np.rint(arr), 0, 255).astype(np.uint8)
+    if np.issubdtype(arr.dtype, np.integer):
+        return np.clip(arr, 0, 255).astype(np.uint8)
+    raise ValueError(f'images have to be of an integer, float or bool dtype, got {arr.dtype}')
+
+
+def encode_image(img, codec=DEFAULT_CODEC, quality=None):
+    """
+    function encodes an image as base64 data uri which can be used as source of a go.Image trace
+
+    Args:
+        img: PIL image or array of shape (height, width) or (height, width, channels),
+            see to_uint8() for the accepted dtypes
+        codec: 'png', 'jpeg' or 'webp'
+        quality: compression level 0-9 for png, quality 1-100 for jpeg/webp
+    Returns:
+        Encoding(uri, size, seconds, cached): the data uri, its size in bytes,
+        the time needed for encoding in seconds and whether it came from the cache
+    """
+    if codec not in CODECS:
+        raise ValueError(f'codec has to be one of {list(CODECS)}, got {codec}')
+    if quality is None:
+        quality = DEFAULT_QUALITY[codec]
+
+    arr = np.asarray(img)
+    key = (content_hash(arr), codec, quality)
+    cached = encoding_cache.get(key)
+    if cached is not None:
+        return cached._replace(cached=True)
+
+    start = time.perf_counter()
+
+    # jpeg does not support an alpha channel
+    pil_img = Image.fromarray(to_uint8(arr))
+    if codec == 'jpeg' and pil_img.mode not in ('L', 'RGB'):
+        pil_img = pil_img.convert('RGB')
+
+    pil_format, mime = CODECS[codec]
+    options = {'compress_level': quality} if codec == 'png' else {'quality': quality}
+    buffer = io.BytesIO()
+    pil_img.save(buffer, format=pil_format, **options)
+    uri = f'data:{mime};base64,{b64encode(buffer.getvalue()).decode()}'
+
+    encoding = Encoding(uri, len(uri), time.perf_counter() - start, False)
+    encoding_cache.put(key, encoding, size=len(uri))
+    return encoding
+
+
+def image_figure(img, codec=DEFAULT_CODEC, quality=None, step=1):
+    """
+    function creates a plotly figure showing an image. In contrast to px.imshow(img) the pixels
+    are always sent as compressed image instead of a matrix of numbers
+
+    Args:
+        img: PIL image or array of shape (height, width) or (height, width, channels)
+        codec: 'png', 'jpeg' or 'webp'
+        quality: compression level 0-9 for png, quality 1-100 for jpeg/webp
+        step: img contains every step-th pixel of the original image, the axes keep
+            the coordinates of the original image
+    Returns:
+        plotly figure
+    """
+    encoding = encode_image(img, codec=codec, quality=quality)
+    return go.Figure(
+        go.Image(
+            source=encoding.uri,
+            x0=0, y0=0, dx=step, dy=step,
+            hovertemplate='x: %{x}<br>y: %{y}<br>color: %{color}<extra></extra>'
+        )
+    )
+
+
+# prebuilt placeholder figures, keyed by size, gray value, colorscale, background mode and layout
+placeholder_cache = LRUCache(max_entries=16, max_bytes=64 * 2 ** 20)
+
+
+def placeholder_figure(height, width, value=220, colorscale='gray', mode='image', layout=None):
+    """
+    function creates a figure with a uniform background of the size of an image, i.e. to show
+    annotations without the image. The figure is built only once per size, gray value, colorscale,
+    mode and layout and returned as dictionary, use with_shapes() to add shapes
+
+    Args:
+        height, width: size of the image
+        value: gray value 0-255, mapped to a color with the colorscale
+        colorscale: plotly colorscale name or list
+        mode: 'image': go.Image with a uint8 png of the image size,
+              'layout': a single stretched pixel in layout.images, independent of the image size
+        layout: layout of the figure
+    Returns:
+        figure as dictionary
+    """
+    key = (height, width, value, repr(colorscale), mode, repr(layout))
+    cached = placeholder_cache.get(key)
+    if cached is not None:
+        return cached
+
+    scale = colorscale if isinstance(colorscale, (list, tuple)) else pc.get_colorscale(colorscale)
+    color = np.array(pc.unlabel_rgb(pc.sample_colorscale(scale, value / 255)[0]), dtype=np.uint8)
+
+    if mode == 'image':
+        figure = image_figure(np.broadcast_to(color, (height, width, 3)))
+    elif mode == 'layout':
+        # the browser stretches the pixel, the axes are set up like for an image trace
+        pixel = encode_image(color.reshape(1, 1, 3))
+        figure = go.Figure()
+        figure.add_layout_image(
+            source=pixel.uri, xref='x', yref='y', x=-0.5, y=-0.5, sizex=width, sizey=height,
+            sizing='stretch', xanchor='left', yanchor='top', layer='below'
+        )
+        figure.update_xaxes(range=[-0.5, width - 0.5])
+        figure.update_yaxes(range=[height - 0.5, -0.5], scaleanchor='x')
+    else:
+        raise ValueError(f'mode has to be image or layout, got {mode}')
+
+    if layout:
+        figure.update_layout(layout)
+    figure = figure.to_plotly_json()
+    placeholder_cache.put(key, figure, size=sum(len(str(trace.get('source', ''))) for trace in figure['data']))
+    return figure
+
+
+def with_shapes(figure, shapes):
+    """
+    function returns a shallow copy of a figure dictionary with shapes, the traces (pixels) are shared
+    """
+    return {'data': figure['data'], 'layout': dict(figure['layout'], shapes=shapes or [])}
@@ -0,0 +1,147 @@
+from concurrent.futures import ThreadPoolExecutor
+from scipy import ndimage, special
+import numpy as np
+import math
+import os
+
+
+def line_angle(shape, alignment='horizontal', invert=False):
+    """
+    function calculates the rotation angle which aligns a drawn line horizontally or vertically
+
+    Args:
+        shape: plotly shape dictionary of type 'line'
+        alignment: 'horizontal' or 'vertical'
+        invert: invert the rotation direction, necessary due to selection order of p0, p1
+    Returns:
+        angle: rotation angle in degrees
+    """
+    # get coordinates of points
+    p0 = np.array([shape.get(c) for c in ['x0', 'y0']])
+    p1 = np.array([shape.get(c) for c in ['x1', 'y1']])
+
+    # calculate delta
+    d = abs(p1 - p0)
+
+    # control alignment h/v
+    if alignment == 'horizontal':
+        d = np.flip(d)
+        angle = math.degrees(np.arctan2(*d))
+    else:
+        angle = -math.degrees(np.arctan2(*d))
+
+    # necessary due to selection order of p0, p1
+    if invert:
+        angle = -angle
+    return angle
+
+
+def rect_bounds(shape):
+    """
+    function returns the pixel bounds of a drawn rectangle
+
+    Args:
+        shape: plotly shape dictionary of type 'rect'
+    Returns:
+        (y_min, y_max, x_min, x_max) for slicing an image array
+    """
+    x = [int(shape.get(c)) for c in ['x0', 'x1']]
+    y = [int(shape.get(c)) for c in ['y0', 'y1']]
+    return min(y), max(y), min(x), max(x)
+
+
+def first_shape(shapes, shape_type):
+    """
+    function returns the first shape of the given type or None
+    """
+    for shape in shapes or []:
+        if shape.get('type', '') == shape_type:
+            return shape
+    return None
+
+
+def rotation_geometry(shape, angle):
+    """
+    function calculates the rotation matrix, offset and output shape exactly like
+    scipy.ndimage.rotate with reshape=True
+
+    Args:
+        shape: (height, width) of the input image
+        angle: rotation angle in degrees
+    Returns:
+        rot_matrix, offset, out_shape
+    """
+    c, s = special.cosdg(angle), special.sindg(angle)
+    rot_matrix = np.array([[c, s], [-s, c]])
+
+    # compute the bounds and the shape of the rotated image
+    iy, ix = shape
+    out_bounds = rot_matrix @ [[0, 0, iy, iy], [0, ix, 0, ix]]
+    out_shape = (np.ptp(out_bounds, axis=1) + 0.5).astype(int)
+
+    # rotate around the center of the image
+    out_center = rot_matrix @ ((out_shape - 1) / 2)
+    in_center = (np.asarray(shape) - 1) / 2
+    offset = in_center - out_center
+    return rot_matrix, offset, tuple(out_shape)
+
+
+def rotate_banded(image, angle, order=3, workers=None, band_rows=128, mode='constant', cval=0.0):
+    """
+    function rotates an image like scipy.ndimage.rotate(image, angle, order=order), but splits
+    the output into bands of rows which are interpolated on a thread pool. The spline filter
+    is computed once per channel and shared by the bands, each band then only maps its own
+    output coordinates. The result is identical to scipy.ndimage.rotate (same kernels, same
+    coordinates, tolerance 0 for the orders 0, 1 and 3).
+
+    The bands can only run in parallel if scipy releases the GIL during the interpolation, the
+    speedup has not been measured yet (see benchmarks/bench_rotate_banded.py). On a single cpu
+    core it is about 40% slower than scipy.ndimage.rotate, so use it only with several cores.
+
+    Args:
+        image: array of shape (height, width) or (height, width, channels)
+        angle: rotation angle in degrees
+        order: order of the spline interpolation
+        workers: number of threads, defaults to the number of cpu cores
+        band_rows: number of output rows per task
+        mode, cval: see scipy.ndimage.affine_transform
+    Returns:
+        rotated image, same dtype as the input
+    """
+    image = np.asarray(image)
+    rot_matrix, offset, out_shape = rotation_geometry(image.shape[:2], angle)
+    output = np.empty(out_shape + image.shape[2:], dtype=image.dtype)
+
+    # treat gray images like images with a single channel
+    planes = image.reshape(image.shape[:2] + (-1,))
+    out_planes = output.reshape(out_shape + (-1,))
+
+    def prefilter(channel):
+        plane = planes[:, :, channel]
+        if order > 1:
+            return ndimage.spline_filter(plane, order, output=np.float64, mode=mode)
+        return plane
+
+    def interpolate(channel, row):
+        rows = min(band_rows, out_shape[0] - row)
+
+        # the last bit of the source coordinates decides about rounding (order 0) and about
+        # the uint8 result (order > 0), so they are computed in the same order as scipy does,
+        # (offset + m[0] * y) + m[1] * x, with the rows of the complete image
+        oy, ox = np.mgrid[row:row + rows, 0:out_shape[1]].astype(np.float64)
+        coordinates = [offset[i] + rot_matrix[i, 0] * oy + rot_matrix[i, 1] * ox for i in range(2)]
+        ndimage.map_coordinates(
+            filtered[channel], coordinates, output=out_planes[row:row + rows, :, channel],
+            order=order, mode=mode, cval=cval, prefilter=False
+        )
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        filtered = list(pool.map(prefilter, range(planes.shape[2])))
+        tasks = [
+            pool.submit(interpolate, channel, row)
+            for channel in range(planes.shape[2])
+            for row in range(0, out_shape[0], band_rows)
+        ]
+        for task in tasks:
+            task.result()
+    return output
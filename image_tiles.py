@@ -0,0 +1,138 @@
+from image_figures import content_hash
+from flask import abort, send_file
+from PIL import Image
+import numpy as np
+import math
+import os
+
+# edge length of a tile in pixels
+TILE_SIZE = 256
+
+# tiles are cached by the browser, the ETag allows cheap revalidation afterwards
+TILE_MAX_AGE = 24 * 60 * 60
+
+
+class TilePyramid:
+    """
+    multi resolution tile pyramid of an image, stored on disk. Level 0 is the full
+    resolution, every further level halves width and height until the image fits
+    into a single tile. The pyramid is built only once per image content.
+    """
+
+    def __init__(self, img, cache_dir='./tiles', tile_size=TILE_SIZE):
+        arr = np.asarray(img)
+        self.image_id = content_hash(arr)
+        self.height, self.width = arr.shape[:2]
+        self.tile_size = tile_size
+        self.directory = os.path.join(cache_dir, self.image_id)
+
+        # number of levels until the whole image fits into one tile
+        self.levels = max(1, math.ceil(math.log2(max(self.height, self.width) / tile_size)) + 1)
+
+        # marker file is written last, an interrupted build is repeated
+        if not os.path.exists(os.path.join(self.directory, 'complete')):
+            self._build(Image.fromarray(arr))
+
+    def tile_path(self, level, row, col):
+        return os.path.join(self.directory, str(level), f'{row}_{col}.png')
+
+    def _build(self, pil_img):
+        for level in range(self.levels):
+            if level:
+                pil_img = pil_img.resize(
+                    (max(1, pil_img.width // 2), max(1, pil_img.height // 2)),
+                    Image.Resampling.BOX
+                )
+            os.makedirs(os.path.join(self.directory, str(level)), exist_ok=True)
+            for row in range(math.ceil(pil_img.height / self.tile_size)):
+                for col in range(math.ceil(pil_img.width / self.tile_size)):
+                    box = (
+                        col * self.tile_size,
+                        row * self.tile_size,
+                        min((col + 1) * self.tile_size, pil_img.width),
+                        min((row + 1) * self.tile_size, pil_img.height),
+                    )
+                    pil_img.crop(box).save(self.tile_path(level, row, col))
+        open(os.path.join(self.directory, 'complete'), 'w').close()
+
+    def level_for(self, x_range, plot_width):
+        """
+        function chooses the coarsest level which still has at least one image pixel per screen pixel
+
+        Args:
+            x_range: visible range of the x-axis in full resolution pixels
+            plot_width: width of the plot area in screen pixels
+        Returns:
+            level of the pyramid
+        """
+        image_pixels_per_screen_pixel = abs(x_range[1] - x_range[0]) / max(plot_width, 1)
+        if image_pixels_per_screen_pixel <= 1:
+            return 0
+        return min(int(math.log2(image_pixels_per_screen_pixel)), self.levels - 1)
+
+    def layout_images(self, x_range, y_range, plot_width, url_prefix='/tiles'):
+        """
+        function creates the layout.images of a plotly figure for the visible part of the image.
+        only the tiles of the chosen level which intersect the visible area are included, so the
+        browser only downloads the pixels which are actually shown
+
+        Args:
+            x_range: visible range of the x-axis in full resolution pixels
+            y_range: visible range of the y-axis in full resolution pixels
+            plot_width: width of the plot area in screen pixels
+            url_prefix: url of the tile route
+        Returns:
+            level, list of dictionaries for layout.images
+        """
+        level = self.level_for(x_range, plot_width)
+
+        # size of a tile in full resolution pixels
+        span = self.tile_size * 2 ** level
+        x_min, x_max = sorted(x_range)
+        y_min, y_max = sorted(y_range)
+        rows = range(max(0, int(y_min // span)), min(math.ceil(self.height / span), int(y_max // span) + 1))
+        cols = range(max(0, int(x_min // span)), min(math.ceil(self.width / span), int(x_max // span) + 1))
+
+        images = []
+        for row in rows:
+            for col in cols:
+                images.append(
+                    {
+                        'source': f'{url_prefix}/{self.image_id}/{level}/{row}/{col}.png',
+                        'xref': 'x',
+                        'yref': 'y',
+                        'x': col * span,
+                        'y': row * span,
+                        'sizex': min(span, self.width - col * span),
+                        'sizey': min(span, self.height - row * span),
+                        'xanchor': 'left',
+                        'yanchor': 'top',
+                        'sizing': 'stretch',
+                        'layer': 'below',
+                    }
+                )
+        return level, images
+
+
+def register_tile_route(server, pyramids, url_prefix='/tiles'):
+    """
+    function adds a route to the flask server of a dash app which serves the tiles
+
+    Args:
+        server: flask server, i.e. app.server
+        pyramids: list of TilePyramid objects to serve
+        url_prefix: url of the tile route
+    """
+    by_id = {pyramid.image_id: pyramid for pyramid in pyramids}
+
+    @server.route(f'{url_prefix}/<image_id>/<int:level>/<int:row>/<int:col>.png')
+    def serve_tile(image_id, level, row, col):
+        pyramid = by_id.get(image_id)
+        if pyramid is None:
+            abort(404)
+        path = pyramid.tile_path(level, row, col)
+        if not os.path.exists(path):
+            abort(404)
+
+        # send_file answers If-None-Match requests with 304 Not Modified
+        return send_file(os.path.abspath(path), mimetype='image/png', etag=True, max_age=TILE_MAX_AGE)
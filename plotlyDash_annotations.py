@@ -1,8 +1,14 @@
-from dash import Dash, dcc, html, Input, Output, State
+from dash import Dash, dcc, html, Input, Output, State, Patch, callback_context
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
+from image_cache import LRUCache
+from point_overlay import POINT_TRACE_THRESHOLD, points_trace, render_patch, selected_indices, shape_centers
+from point_overlay import load_points, uploaded_points_trace
+from base64 import b64decode
+from shape_history import ShapeHistory, replace_shapes
 import plotly.express as px
 import numpy as np
+import uuid
 
 # create image and plotly express object
 img = np.random.randint(0, 255, (90, 160))
@@ -20,12 +26,52 @@ fig.update_layout(
         'r': 0,
         't': 20,
         'b': 0,
-    }
+    },
+    # box/lasso selection for deleting annotations
+    dragmode='select',
 )
 
 # hide color bar
 fig.update_coloraxes(showscale=False)
 
+# above this number of annotations the points are drawn as one WebGL scatter trace instead of shapes
+threshold = POINT_TRACE_THRESHOLD
+
+# marker size in screen pixels, roughly the diameter of the circles (5 pixels of the image)
+MARKER_SIZE = 5 * 700 / img.shape[1]
+MARKER_COLOR = 'rgba(39,43,48,255)'
+
+# empty scatter trace, receives the points once there are too many shapes
+fig.add_trace(points_trace(size=MARKER_SIZE, color=MARKER_COLOR))
+POINTS_TRACE = len(fig.data) - 1
+
+# empty trace for uploaded points (csv/npy), a scatter trace or a density heatmap
+fig.add_trace(points_trace())
+UPLOAD_TRACE = len(fig.data) - 1
+
+# undo/redo history of the shapes per session, unchanged shapes are shared between the steps
+histories = LRUCache(max_entries=100)
+
+
+def get_history(session_id):
+    """
+    function returns the undo/redo history of the shapes of a session
+    """
+    history = histories.get(session_id)
+    if history is None:
+        history = ShapeHistory()
+        histories.put(session_id, history, size=0)
+    return history
+
+
+def history_info(history):
+    return f'{len(history.current)} shapes, {history.undo_steps} steps to undo, {history.redo_steps} to redo'
+
+
+def render(shapes):
+    return render_patch(shapes, POINTS_TRACE, threshold=threshold, size=MARKER_SIZE, color=MARKER_COLOR)
+
+
 # Build App
 app = Dash(
     __name__,
@@ -38,54 +84,85 @@ app = Dash(
     ]
 )
 
-# app layout
-app.layout = dbc.Container(
-    [
-        dbc.Row(
-            dbc.Col(
-                dcc.Graph(
-                    id='graph',
-                    figure=fig,
-                    config={
-                        'scrollZoom': True,
-                        'displayModeBar': False,
-                    }
-                ),
-                width={'size': 5, 'offset': 0}
-            ), justify='around'
-        ),
-        dbc.Row(
-            [
+
+# app layout, a function so that every page load gets its own session id
+def serve_layout():
+    return dbc.Container(
+        [
+            dbc.Row(
                 dbc.Col(
-                    [
-                        html.A(
-                            html.Button(
-                                'Refresh Page',
-                                id='refresh_button'
+                    dcc.Graph(
+                        id='graph',
+                        figure=fig,
+                        config={
+                            'scrollZoom': True,
+                            'displayModeBar': True,
+                            'modeBarButtons': [['select2d', 'lasso2d', 'pan2d']],
+                            'displaylogo': False,
+                        }
+                    ),
+                    width={'size': 5, 'offset': 0}
+                ), justify='around'
+            ),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        [
+                            html.A(
+                                html.Button(
+                                    'Refresh Page',
+                                    id='refresh_button'
+                                ),
+                                href='/'
                             ),
-                            href='/'
-                        ),
-                        dcc.Markdown(
-                            '''
-                            # Functionality:
-                            - click anywhere on the image, shape is created at click position
-                            - use the "Refresh Page" button to reload the image
-                            '''
-                        ) 
-                    ], width={'size': 5, 'offset': 0}
-                ),
-            ], justify='around'
-        )
-    ], fluid=True
-)
+                            dcc.Markdown(
+                                '''
+                                # Functionality:
+                                - click anywhere on the image, shape is created at click position
+                                - use the "Refresh Page" button to reload the image
+                                - use the "Undo"/"Redo" buttons to step through the changes of the shapes
+                                - select points (box or lasso) and delete them with "Delete selection"
+                                - with many points, the points are drawn as one WebGL scatter trace
+                                - upload points from a csv/npy file, very many points are shown as density heatmap
+                                '''
+                            ) 
+                        ], width={'size': 5, 'offset': 0}
+                    ),
+                    dbc.Col(
+                        [
+                            html.Button('Undo', id='undo'),
+                            html.Button('Redo', id='redo'),
+                            html.Button('Delete selection', id='delete_selection'),
+                            html.Div(id='history'),
+                            dcc.Upload(
+                                id='upload_points',
+                                # x,y per row (csv) or array of shape (n, 2) (npy)
+                                accept='.csv,.npy',
+                                multiple=False,
+                                children=html.Button('Upload points (csv/npy)'),
+                            ),
+                            html.Div(id='upload_info'),
+                        ], width={'size': 5, 'offset': 0}
+                    ),
+                ], justify='around'
+            ),
+            dcc.Store(id='session', data=str(uuid.uuid4())),
+        ], fluid=True
+    )
 
 
+app.layout = serve_layout
+
+
+# append only: the figure is not sent to the server, the new shape is appended via Patch
+# and the list of shapes is kept in the history on the server
 @ app.callback(
     Output('graph', 'figure'),
-    State('graph', 'figure'),
-    Input('graph', 'clickData')
+    Output('history', 'children'),
+    Input('graph', 'clickData'),
+    State('session', 'data'),
 )
-def get_click(graph_figure, clickData):
+def get_click(clickData, session_id):
     if not clickData:
         raise PreventUpdate
     else:
@@ -96,13 +173,105 @@ def get_click(graph_figure, clickData):
         # create new shape
         new_shape = create_shape(x=x, y=y, size=5)
 
-        # get existing shapes
-        shapes = graph_figure['layout'].get('shapes', [])
-        shapes.extend(new_shape)
+        # add the new shape as a step of the history
+        history = get_history(session_id)
+        history.push(history.current.append(new_shape[0]))
+
+        # update figure layout, switch to the scatter trace when there are too many shapes
+        count = len(history.current)
+        if count == threshold + 1:
+            patched_figure = render(history.current.to_list())
+        elif count > threshold:
+            patched_figure = Patch()
+            patched_figure['data'][POINTS_TRACE]['x'].append(x)
+            patched_figure['data'][POINTS_TRACE]['y'].append(y)
+        else:
+            patched_figure = Patch()
+            patched_figure['layout']['shapes'].extend(new_shape)
+    return patched_figure, history_info(history)
+
+
+# record moved/resized shapes in the history
+@ app.callback(
+    Output('history', 'children', allow_duplicate=True),
+    Input('graph', 'relayoutData'),
+    State('session', 'data'),
+    prevent_initial_call=True
+)
+def track_edits(relayout_data, session_id):
+    history = get_history(session_id)
+    if not history.apply_relayout(relayout_data):
+        raise PreventUpdate
+    return history_info(history)
+
+
+# undo/redo, only the shapes of the figure are replaced
+@ app.callback(
+    Output('graph', 'figure', allow_duplicate=True),
+    Output('history', 'children', allow_duplicate=True),
+    Input('undo', 'n_clicks'),
+    Input('redo', 'n_clicks'),
+    State('session', 'data'),
+    prevent_initial_call=True
+)
+def undo_redo(undo_click, redo_click, session_id):
+    history = get_history(session_id)
+    if callback_context.triggered[0]['prop_id'] == 'undo.n_clicks':
+        version = history.undo()
+    else:
+        version = history.redo()
+    if version is None:
+        raise PreventUpdate
+
+    return render(version.to_list()), history_info(history)
+
+
+# delete the points inside a box or lasso selection
+@ app.callback(
+    Output('graph', 'figure', allow_duplicate=True),
+    Output('history', 'children', allow_duplicate=True),
+    Input('delete_selection', 'n_clicks'),
+    State('graph', 'selectedData'),
+    State('session', 'data'),
+    prevent_initial_call=True
+)
+def delete_selection(click, selected_data, session_id):
+    history = get_history(session_id)
+    shapes = history.current.to_list()
+    selected = selected_indices(*shape_centers(shapes), selected_data)
+    if selected is None or not len(selected):
+        raise PreventUpdate
+
+    keep = np.ones(len(shapes), dtype=bool)
+    keep[selected] = False
+    shapes = [shape for shape, kept in zip(shapes, keep.tolist()) if kept]
+    history.push(replace_shapes(history.current, shapes))
+    return render(shapes), history_info(history)
+
+
+# show uploaded points, the file is parsed with numpy in one pass
+@ app.callback(
+    Output('graph', 'figure', allow_duplicate=True),
+    Output('upload_info', 'children'),
+    Input('upload_points', 'contents'),
+    State('upload_points', 'filename'),
+    prevent_initial_call=True
+)
+def upload_points(contents, file_name):
+    if not contents:
+        raise PreventUpdate
+
+    _, base64_text = contents.split(',')
+    try:
+        xs, ys = load_points(b64decode(base64_text), file_name)
+    except ValueError as error:
+        return Patch(), f'could not read {file_name}: {error}'
 
-        # update figure layout
-        graph_figure['layout'].update(shapes=shapes)
-    return graph_figure
+    trace = uploaded_points_trace(xs, ys, img.shape[0], img.shape[1])
+    patched_figure = Patch()
+    patched_figure['data'][UPLOAD_TRACE] = trace
+    mode = 'density heatmap' if trace['type'] == 'heatmap' else 'points'
+    return patched_figure, f'{file_name}: {len(xs)} points, shown as {mode}'
 
 
 def create_shape(x, y, size=4, color='rgba(39,43,48,255)'):
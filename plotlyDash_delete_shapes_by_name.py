@@ -1,8 +1,12 @@
-from dash import Dash, dcc, html, Input, Output, State
+from dash import Dash, dcc, html, Input, Output, State, Patch, no_update
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
+from annotation_store import AnnotationStore
+from image_cache import LRUCache
 import plotly.graph_objects as go
 import numpy as np
+import uuid
+import re
 
 # prepare trace data
 data = go.Scatter(
@@ -30,7 +34,9 @@ fig.update_layout(
         'r': 0,
         't': 20,
         'b': 100,
-    }
+    },
+    # box/lasso selection for deleting all shapes inside the selection
+    dragmode='select',
 )
 
 # add some shapes
@@ -50,6 +56,45 @@ for i in range(1, 6):
         },
     )
 
+# the shapes of every session are kept on the server, the figure is not sent to the server anymore
+stores = LRUCache(max_entries=100)
+
+# shown instead of the names if the shapes of a session are not known on the server anymore
+SESSION_EXPIRED = 'The session has expired (server restart or too many sessions), please reload the page'
+
+
+def new_store(session_id):
+    """
+    function creates the annotation store of a new session with the shapes of the figure
+    """
+    store = AnnotationStore([shape.to_plotly_json() for shape in fig.layout.shapes])
+    stores.put(session_id, store, size=store.nbytes)
+    return store
+
+
+def get_store(session_id):
+    """
+    function returns the annotation store of a session, None if the session is unknown. The store
+    is never rebuilt from the initial figure, the shapes in the browser may differ from it and
+    the positions of a Patch would delete the wrong shapes
+    """
+    return stores.get(session_id)
+
+
+# number of names shown per page of the available shapes
+NAMES_PER_PAGE = 20
+
+
+def find_names(store, pattern, mode):
+    """
+    function finds the names matching the pattern, an invalid regular expression matches nothing
+    """
+    try:
+        return store.find_names(pattern or '', mode)
+    except re.error:
+        return []
+
+
 # Build App
 app = Dash(
     __name__,
@@ -62,77 +107,242 @@ app = Dash(
     ]
 )
 
-# app layout
-app.layout = dbc.Container(
-    [
-        dbc.Row(
-            dbc.Col(
-                dcc.Graph(
-                    id='graph',
-                    figure=fig,
-                    config={
-                        'scrollZoom': True,
-                        'displayModeBar': False,
-                    }
-                ),
-                width={'size': 5, 'offset': 0}
-            ), justify='around'
-        ),
-        dbc.Row(
-            [
-                dbc.Col(html.H5('Click button to delete shapes')),
-                dbc.Col(html.H5('Enter name of shape to delete')),
-                dbc.Col(html.H5('Available shapes'))
-            ]
-        ),
-        dbc.Row(
-            [
+
+# app layout, a function so that every page load gets its own session id and store
+def serve_layout():
+    session_id = str(uuid.uuid4())
+    new_store(session_id)
+    return dbc.Container(
+        [
+            dbc.Row(
                 dbc.Col(
-                    html.Button(
-                        'Delete',
-                        id='delete'
+                    dcc.Graph(
+                        id='graph',
+                        figure=fig,
+                        config={
+                            'scrollZoom': True,
+                            'displayModeBar': True,
+                            'modeBarButtons': [['select2d', 'lasso2d', 'pan2d']],
+                            'displaylogo': False,
+                        }
                     ),
-                ),
-                dbc.Col(
-                    dcc.Input(
-                        id='box',
-                        type='text',
-                        value='shape_x',
-                        className='input'
+                    width={'size': 5, 'offset': 0}
+                ), justify='around'
+            ),
+            dbc.Row(
+                [
+                    dbc.Col(html.H5('Click button to delete shapes')),
+                    dbc.Col(html.H5('Enter name (or pattern) of shapes to delete')),
+                    dbc.Col(html.H5('Available shapes'))
+                ]
+            ),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        html.Button(
+                            'Delete',
+                            id='delete'
+                        ),
                     ),
-                ),
-                dbc.Col(
-                    html.Div(
-                        id='available',
-                        children=', '.join([f'shape_{i}' for i in range(1, 6)])
-                    )
-                ),
-            ], justify='around'
-        )
-    ], fluid=True
+                    dbc.Col(
+                        [
+                            dcc.Input(
+                                id='box',
+                                type='text',
+                                value='shape_x',
+                                className='input'
+                            ),
+                            dcc.RadioItems(
+                                id='match_mode',
+                                options=[
+                                    {'label': 'exact', 'value': 'exact'},
+                                    {'label': 'prefix', 'value': 'prefix'},
+                                    {'label': 'glob (shape_*)', 'value': 'glob'},
+                                    {'label': 'regex', 'value': 'regex'},
+                                ],
+                                value='exact',
+                                inline=True,
+                                inputStyle={"margin-right": "5px"},
+                                labelStyle={"margin-right": "10px"}
+                            ),
+                        ]
+                    ),
+                    dbc.Col(
+                        [
+                            # the names are searched with the pattern of the match mode
+                            dcc.Input(
+                                id='search',
+                                type='text',
+                                placeholder='search names',
+                                debounce=True,
+                                className='input'
+                            ),
+                            html.Div(id='available'),
+                            dbc.Pagination(
+                                id='names_page',
+                                max_value=1,
+                                active_page=1,
+                                fully_expanded=False,
+                                size='sm'
+                            ),
+                        ]
+                    ),
+                ], justify='around'
+            ),
+            html.Br(),
+            dbc.Row(
+                [
+                    dbc.Col(
+                        html.Button(
+                            'Delete selection',
+                            id='delete_selection'
+                        ),
+                    ),
+                    dbc.Col(
+                        dcc.RadioItems(
+                            id='selection_mode',
+                            options=[
+                                {'label': 'intersecting', 'value': 'intersecting'},
+                                {'label': 'contained', 'value': 'contained'},
+                            ],
+                            value='intersecting',
+                            inline=True,
+                            inputStyle={"margin-right": "5px"},
+                            labelStyle={"margin-right": "10px"}
+                        ),
+                    ),
+                    dbc.Col(
+                        dcc.Markdown(
+                            'select an area (box or lasso), the shapes crossing it (intersecting) or lying '
+                            'completely inside it (contained) are deleted. Free drawn paths are tested '
+                            'with their bounding box'
+                        ),
+                    ),
+                ], justify='around'
+            ),
+            dcc.Store(id='session', data=session_id),
+            # changes whenever shapes are added, renamed or deleted, triggers the update of the names
+            dcc.Store(id='names_version', data=0),
+        ], fluid=True
+    )
+
+
+app.layout = serve_layout
+
+
+# keep the store in sync with shapes edited by the user
+@app.callback(
+    Output('names_version', 'data'),
+    Input('graph', 'relayoutData'),
+    State('session', 'data'),
+    State('names_version', 'data'),
+    prevent_initial_call=True
 )
+def sync_shapes(relayout_data, session_id, version):
+    store = get_store(session_id)
+    if store is None:
+        # the names show that the page has to be reloaded
+        return version + 1
+    if not store.apply_relayout(relayout_data):
+        raise PreventUpdate
+    return version + 1
 
 
+# show one page of the (matching) names only, instead of all names at once
 @app.callback(
-    Output('graph', 'figure'),
     Output('available', 'children'),
+    Output('names_page', 'max_value'),
+    Output('names_page', 'active_page'),
+    Input('names_version', 'data'),
+    Input('search', 'value'),
+    Input('match_mode', 'value'),
+    Input('names_page', 'active_page'),
+    State('session', 'data'),
+)
+def show_names(version, search, mode, page, session_id):
+    store = get_store(session_id)
+    if store is None:
+        return SESSION_EXPIRED, 1, 1
+    names = find_names(store, search, mode) if search else store.sorted_names()
+
+    pages = max(1, -(-len(names) // NAMES_PER_PAGE))
+    page = min(page or 1, pages)
+    start = (page - 1) * NAMES_PER_PAGE
+    return f'{", ".join(names[start:start + NAMES_PER_PAGE])} ({len(names)} names)', pages, page
+
+
+@app.callback(
+    Output('graph', 'figure'),
+    Output('names_version', 'data', allow_duplicate=True),
     Input('delete', 'n_clicks'),
-    State('graph', 'figure'),
     State('box', 'value'),
+    State('match_mode', 'value'),
+    State('session', 'data'),
+    State('names_version', 'data'),
+    prevent_initial_call=True
 )
-def get_click(click, current_figure, shape_to_delete):
+def get_click(click, shape_to_delete, mode, session_id, version):
     if not click:
         raise PreventUpdate
     else:
-        # get existing shapes
-        shapes = current_figure['layout'].get('shapes')
+        # find shapes via the sorted name index
+        store = get_store(session_id)
+        if store is None:
+            return no_update, version + 1
+        ids = store.ids_by_names(find_names(store, shape_to_delete, mode))
+        if not len(ids):
+            raise PreventUpdate
 
-        # delete shape, aka keep only the shapes which are not to be deleted
-        shapes[:] = [shape for shape in shapes if shape.get('name') != shape_to_delete]
+        # delete only these shapes from the figure
+        patched_figure = delete_patch(store, ids)
+    return patched_figure, version + 1
 
-        # update figure layout
-        current_figure['layout'].update(shapes=shapes)
-    return current_figure, ', '.join([shape.get('name') for shape in shapes])
+
+def delete_patch(store, ids):
+    """
+    function removes shapes from the store and creates a Patch which deletes them from the figure.
+    Only the positions of the removed shapes are sent, starting with the last one so that the
+    positions of the remaining shapes do not change
+    """
+    patched_figure = Patch()
+    for position in sorted(store.positions(ids).tolist(), reverse=True):
+        del patched_figure['layout']['shapes'][position]
+    store.remove(ids)
+    return patched_figure
+
+
+# delete all shapes inside a box or lasso selection, found via the spatial index
+@app.callback(
+    Output('graph', 'figure', allow_duplicate=True),
+    Output('names_version', 'data', allow_duplicate=True),
+    Input('delete_selection', 'n_clicks'),
+    State('graph', 'selectedData'),
+    State('selection_mode', 'value'),
+    State('session', 'data'),
+    State('names_version', 'data'),
+    prevent_initial_call=True
+)
+def delete_selection(click, selected_data, selection_mode, session_id, version):
+    if not selected_data:
+        raise PreventUpdate
+
+    store = get_store(session_id)
+    if store is None:
+        return no_update, version + 1
+    contained = selection_mode == 'contained'
+    if 'range' in selected_data:
+        # a box is a polygon with four vertices, so lines and circles are tested with their outline too
+        (x0, x1), (y0, y1) = selected_data['range']['x'], selected_data['range']['y']
+        xs, ys = [x0, x1, x1, x0], [y0, y0, y1, y1]
+    elif 'lassoPoints' in selected_data:
+        xs, ys = selected_data['lassoPoints']['x'], selected_data['lassoPoints']['y']
+    else:
+        raise PreventUpdate
+    ids = store.query_polygon(xs, ys, contained=contained)
+
+    if not len(ids):
+        raise PreventUpdate
+    return delete_patch(store, ids), version + 1
 
 
 if __name__ == '__main__':
@@ -1,20 +1,16 @@
 from dash import Dash, Input, Output, dcc, html
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
-import plotly.express as px
-from PIL import Image
-import urllib.request
+from image_assets import load_image
+from image_figures import image_figure
 import json
 
-# get an example image from url
-urllib.request.urlretrieve(
-    'https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg',
-    'bridge.jpg'
-)
+# get an example image, it is downloaded only once and cached locally,
+# locally stored images can be used this way too
+img = load_image('https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg')
 
-# open image and create plotly figure, locally stored images can be used this way too
-img = Image.open('bridge.jpg')
-fig = px.imshow(img=img)
+# create plotly figure
+fig = image_figure(img)
 
 # update figure layout, actually not necessary for the functionality
 fig.update_layout(
@@ -22,8 +18,8 @@ fig.update_layout(
         'template': 'plotly_dark',
         'plot_bgcolor': 'rgba(0, 0, 0, 0)',
         'paper_bgcolor': 'rgba(0, 0, 0, 0)',
-        'width': img.width * 0.75,
-        'height': img.height * 0.75,
+        'width': img.shape[1] * 0.75,
+        'height': img.shape[0] * 0.75,
         'xaxis': {'showgrid': False,
                   'showticklabels': False
                   },
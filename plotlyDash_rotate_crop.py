@@ -1,23 +1,59 @@
-from dash import Dash, dcc, html, Input, Output, State, callback_context
+from dash import Dash, DiskcacheManager, CeleryManager, dcc, html, Input, Output, State, callback_context
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+from image_cache import LRUCache, quantize
+from image_assets import open_windowed
+from image_figures import image_figure
+from image_processing import first_shape, line_angle, rect_bounds, rotate_banded
+from region_stats import RegionStats, describe
+from shape_utils import update_shapes
 from scipy.ndimage import rotate
-import plotly.express as px
-from PIL import Image
-import urllib.request
-import numpy as np
-import math
+import os
 
+# rotated images are cached, the angle is rounded to ANGLE_STEP degrees so that
+# nearly identical rotations reuse the cached result
+ANGLE_STEP = 0.1
+ROTATION_ORDER = 3
+rotation_cache = LRUCache(max_entries=16, max_bytes=256 * 2 ** 20)
 
-# get an example image from url
-urllib.request.urlretrieve(
-    'https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg',
-    'bridge.jpg'
-)
+# previews with more pixels are rotated in bands on a thread pool, but only with several cpu
+# cores, on a single core the bands are slower than scipy.ndimage.rotate
+PARALLEL_MIN_PIXELS = 4_000_000
+PARALLEL_ROTATION = (os.cpu_count() or 1) > 1
+
+# the figure shows every n-th pixel of images which are larger than this
+DISPLAY_MAX_SIZE = 4096
+
+# statistics on hover are computed for a window of (2 * HOVER_RADIUS + 1) pixels around the cursor
+HOVER_RADIUS = 5
+
+# the preview uses every PREVIEW_STEP-th pixel and bilinear interpolation
+PREVIEW_STEP = 4
+PREVIEW_ORDER = 1
+
+if 'REDIS_URL' in os.environ:
+    # Use Redis & Celery if REDIS_URL set as an env variable
+    from celery import Celery
+    celery_app = Celery(__name__, broker=os.environ['REDIS_URL'], backend=os.environ['REDIS_URL'])
+    background_callback_manager = CeleryManager(celery_app)
+
+else:
+    # Diskcache for non-production apps when developing locally
+    import diskcache
+    cache = diskcache.Cache("./cache")
+    background_callback_manager = DiskcacheManager(cache)
+
+# get an example image, it is downloaded only once and cached locally as memory mapped tiles,
+# locally stored images can be used this way too. The full raster is never loaded: crops read
+# only the tiles inside the rectangle, rotations only the source region of each output window
+img_windows = open_windowed('https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg')
 
-# open image and create plotly figure, locally stored images can be used this way too
-img = Image.open('bridge.jpg')
-img_arr = np.array(img)
-fig = px.imshow(img=img)
+# summed area tables for the statistics of drawn rectangles, built strip by strip once and memory mapped next to the tiles
+img_stats = RegionStats.from_windowed(img_windows)
+
+# create plotly figure, large images are shown with every display_step-th pixel
+display_step = max(1, -(-max(img_windows.height, img_windows.width) // DISPLAY_MAX_SIZE))
+fig = image_figure(img_windows.read(0, img_windows.height, 0, img_windows.width, display_step), step=display_step)
 
 # update figure layout
 fig.update_layout(
@@ -25,8 +61,8 @@ fig.update_layout(
     template='plotly_dark',
     plot_bgcolor='rgba(0, 0, 0, 0)',
     paper_bgcolor='rgba(0, 0, 0, 0)',
-    width=img.width * 0.45,
-    height=img.height * 0.45,
+    width=img_windows.width * 0.45,
+    height=img_windows.height * 0.45,
     margin={
         'l': 0,
         'r': 0,
@@ -73,10 +109,72 @@ config = {
     'displaylogo': False
 }
 
+
+def rotated_figure(angle, order=ROTATION_ORDER, step=1):
+    """
+    function rotates the image and creates a plotly figure, results are cached.
+    the Celery workers keep their cache between jobs, the Diskcache jobs start
+    from the cache of the app process
+
+    Args:
+        angle: rotation angle in degrees
+        order: order of the spline interpolation, 0: nearest, 1: bilinear, 3: cubic
+        step: use only every step-th pixel, i.e. for a preview
+    Returns:
+        plotly figure of the rotated image
+    """
+    key = ('bridge.jpg', quantize(angle, ANGLE_STEP), order, step)
+    cached = rotation_cache.get(key)
+    if cached is None:
+        if step == 1:
+            # window by window, only the source region of each window is read
+            rotated = img_windows.rotate(key[1], order=order)
+        else:
+            source = img_windows.read(0, img_windows.height, 0, img_windows.width, step)
+            if PARALLEL_ROTATION and source.shape[0] * source.shape[1] >= PARALLEL_MIN_PIXELS:
+                rotated = rotate_banded(source, key[1], order=order)
+            else:
+                rotated = rotate(source, key[1], order=order)
+        figure = image_figure(rotated, step=step)
+
+        # the figure contains the encoded image, count it in addition to the array
+        cached = (rotated, figure)
+        rotation_cache.put(key, cached, size=rotated.nbytes + len(figure.data[0].source or ''))
+    return cached[1]
+
+
+def update_figure_layout(figure):
+    """
+    function applies the layout of the lower image to a figure
+    """
+    figure.update_layout(
+        dragmode='zoom',
+        template='plotly_dark',
+        plot_bgcolor='rgba(0, 0, 0, 0)',
+        paper_bgcolor='rgba(0, 0, 0, 0)',
+        margin={
+            'l': 0,
+            'r': 0,
+            't': 20,
+            'b': 0,
+        },
+        xaxis={
+            'showgrid': False,
+            'showticklabels': False
+        },
+        yaxis={
+            'showgrid': False,
+            'showticklabels': False
+        }
+    )
+    return figure
+
+
 # app initialization
 app = Dash(__name__, external_stylesheets=[dbc.themes.SLATE],
            meta_tags=[{'name': 'viewport',
-                       'content': 'width=device-width, initial-scale=1.0'}]
+                       'content': 'width=device-width, initial-scale=1.0'}],
+           background_callback_manager=background_callback_manager
            )
 
 # app layout
@@ -92,7 +190,10 @@ app.layout = dbc.Container([
                 id='chgd_img',
                 figure=fig,
                 config={'displayModeBar': False}
-            )
+            ),
+            # drawn shapes of the upper image. The image itself stays on the server,
+            # so rotating/cropping only transfers the shapes instead of the whole figure
+            dcc.Store(id='shapes', data=[])
         ], width={'size': 5, 'offset': 0}
         ),
         dbc.Col([
@@ -131,6 +232,16 @@ app.layout = dbc.Container([
                 id='crop',
                 n_clicks=None
             ),
+            html.Br(),
+            dcc.Markdown('''
+                ## Statistics of drawn rectangles
+                '''),
+            html.Pre(id='region_stats'),
+            dcc.Markdown(f'''
+                ## Statistics around the cursor
+                - hover over the **upper image**, {2 * HOVER_RADIUS + 1}x{2 * HOVER_RADIUS + 1} pixels
+                '''),
+            html.Pre(id='hover_stats'),
         ], width={'size': 5, 'offset': 0}
         ),
         dbc.Col(
@@ -146,86 +257,93 @@ app.layout = dbc.Container([
 )
 
 
-# callback for annotations
+# callback for keeping track of the drawn shapes
+@app.callback(
+    Output('shapes', 'data'),
+    Input('org_img', 'relayoutData'),
+    State('shapes', 'data'),
+    prevent_initial_call=True,
+)
+def store_shapes(relayout_data, shapes):
+    # zooming and other layout changes do not concern the shapes
+    shapes = update_shapes(shapes, relayout_data)
+    if shapes is None:
+        raise PreventUpdate
+    return shapes
+
+
+# statistics of the drawn rectangles, O(1) per rectangle thanks to the summed area tables
+@app.callback(
+    Output('region_stats', 'children'),
+    Input('shapes', 'data'),
+    prevent_initial_call=True,
+)
+def show_region_stats(shapes):
+    rects = [shape for shape in shapes if shape.get('type', '') == 'rect']
+    return '\n\n'.join(describe(img_stats.shape_stats(shape)) for shape in rects)
+
+
+# statistics of a window around the hovered pixel, uses the same summed area tables
+@app.callback(
+    Output('hover_stats', 'children'),
+    Input('org_img', 'hoverData'),
+    prevent_initial_call=True,
+)
+def show_hover_stats(hover_data):
+    if not hover_data:
+        raise PreventUpdate
+    point = hover_data['points'][0]
+    return describe(img_stats.window(point['x'], point['y'], HOVER_RADIUS))
+
+
+# callback for annotations. Rotations are answered with a fast, downsampled preview,
+# the full quality rotation is computed by the background callback below
 @app.callback(
     Output('chgd_img', 'figure'),
-    State('org_img', 'figure'),
+    State('shapes', 'data'),
     State('alignment', 'value'),
     State('invert', 'value'),
     Input('rotate', 'n_clicks'),
     Input('crop', 'n_clicks'),
     prevent_initial_call=True,
 )
-def rotate_crop(org_img, alignment, invert, rotate_click, crop_click):
+def rotate_crop(annotations, alignment, invert, rotate_click, crop_click):
     # trigger which button has been clicked
     trigger_id = callback_context.triggered[0]['prop_id']
-    
-    # get figure layout
-    layout = org_img.get('layout', {})
-    
-    # get annotations
-    annotations = layout.get('shapes', {})
-    
-    # set default figure
-    figure = org_img
 
     if trigger_id == 'rotate.n_clicks':
-        for shape in annotations:
-            t = shape.get('type', '')
-            if t == 'line':
-                # get coordinates of points
-                p0 = np.array([shape.get(c) for c in ['x0', 'y0']])
-                p1 = np.array([shape.get(c) for c in ['x1', 'y1']])
-
-                # calculate delta
-                d = abs(p1 - p0)
-
-                # control alignment h/v
-                if alignment == 'horizontal':
-                    d = np.flip(d)
-                    angle = math.degrees(np.arctan2(*d))
-                else:
-                    angle = -math.degrees(np.arctan2(*d))
-
-                # necessary due to selection order of p0, p1
-                if invert:
-                    angle = -angle
-
-                # rotate image and create plotly figure
-                rotated = rotate(img, angle)
-                figure = px.imshow(rotated)
-                break
+        shape = first_shape(annotations, 'line')
+        if shape is None:
+            raise PreventUpdate
+        angle = line_angle(shape, alignment, invert)
+        figure = rotated_figure(angle, order=PREVIEW_ORDER, step=PREVIEW_STEP)
     else:
-        for shape in annotations:
-            t = shape.get('type', '')
-            if t == 'rect':
-                x = [int(shape.get(c)) for c in ['x0', 'x1']]
-                y = [int(shape.get(c)) for c in ['y0', 'y1']]
-                figure = px.imshow(img_arr[min(y):max(y), min(x):max(x),:])
-                break
-
-    # update figure layout
-    figure.update_layout(
-                    dragmode='zoom',
-                    template='plotly_dark',
-                    plot_bgcolor='rgba(0, 0, 0, 0)',
-                    paper_bgcolor='rgba(0, 0, 0, 0)',
-                    margin={
-                        'l': 0,
-                        'r': 0,
-                        't': 20,
-                        'b':0,
-                        },
-                    xaxis={
-                        'showgrid': False,
-                        'showticklabels': False
-                        },
-                    yaxis={
-                        'showgrid': False,
-                        'showticklabels': False
-                        }
-                )
-    return figure
+        shape = first_shape(annotations, 'rect')
+        if shape is None:
+            raise PreventUpdate
+        y_min, y_max, x_min, x_max = rect_bounds(shape)
+        figure = image_figure(img_windows.read(y_min, y_max, x_min, x_max))
+    return update_figure_layout(figure)
+
+
+# full quality rotation, replaces the preview as soon as it is finished.
+# a crop click cancels a running rotation, otherwise the crop would be overwritten
+@app.callback(
+    Output('chgd_img', 'figure', allow_duplicate=True),
+    State('shapes', 'data'),
+    State('alignment', 'value'),
+    State('invert', 'value'),
+    Input('rotate', 'n_clicks'),
+    background=True,
+    cancel=[Input('crop', 'n_clicks')],
+    prevent_initial_call=True,
+)
+def render_rotation(annotations, alignment, invert, rotate_click):
+    shape = first_shape(annotations, 'line')
+    if shape is None:
+        raise PreventUpdate
+    angle = line_angle(shape, alignment, invert)
+    return update_figure_layout(rotated_figure(angle))
 
 
 if __name__ == '__main__':
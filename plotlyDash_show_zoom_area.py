@@ -1,17 +1,60 @@
 # this is an answer to a question on the plotly forums
 # https://community.plotly.com/t/creating-an-overview-plot-of-another-one-using-to-image/71416
 
-from dash import Dash, dcc, Input, Output, State
+from dash import Dash, dcc, Input, Output, State, Patch
 import dash_bootstrap_components as dbc
+from dash.exceptions import PreventUpdate
+from autorange import axis_length, figure_ranges
+from image_cache import LRUCache
+from resampling import SortedSeries, resample
 import plotly.express as px
 import numpy as np
+import uuid
+
+WIDTH, HEIGHT = 800, 500
+
+# points sent to the browser depend on the width of the x axis in pixels, not on the data
+PIXELS = axis_length({'width': WIDTH, 'height': HEIGHT}, 'x')
+
+# the data stays on the server, sorted by x, only the resampled points are sent
+datasets = LRUCache(max_entries=4, max_bytes=2 * 2 ** 30)
 
 app = Dash(external_stylesheets=[dbc.themes.BOOTSTRAP])
 
 app.layout = dbc.Container(
     [
         dbc.Row(
-            dbc.Button(id='btn', children='new data')
+            [
+                dbc.Col(
+                    dbc.Button(id='btn', children='new data'),
+                    width='auto'
+                ),
+                dbc.Col(
+                    dcc.Dropdown(
+                        id='n_points',
+                        options=[
+                            {'label': '150 points', 'value': 150},
+                            {'label': '1M points', 'value': 10 ** 6},
+                            {'label': '10M points', 'value': 10 ** 7},
+                        ],
+                        value=150,
+                        clearable=False
+                    ),
+                    width=2
+                ),
+                dbc.Col(
+                    dcc.RadioItems(
+                        id='method',
+                        options=[
+                            {'label': 'min/max per pixel', 'value': 'minmax'},
+                            {'label': 'LTTB', 'value': 'lttb'},
+                        ],
+                        value='minmax',
+                        inline=True
+                    ),
+                    width='auto'
+                ),
+            ]
         ),
         dbc.Row(
             [
@@ -24,36 +67,118 @@ app.layout = dbc.Container(
             ]
         ),
         dcc.Store(id='initial_figure_range'),
+        # id of the dataset on the server, figure for the overview and current view of the main figure
+        dcc.Store(id='dataset'),
+        dcc.Store(id='overview_figure'),
+        dcc.Store(id='view'),
     ],
     fluid=True
 )
 
+def resampled_points(series, x_range=None, y_range=None, method='minmax'):
+    """
+    function returns the visible points of a dataset reduced to the pixels of the x axis
+
+    Returns:
+        x, y, color as lists
+    """
+    idx = resample(series, x_range, y_range, PIXELS, method)
+    return series.x[idx].tolist(), series.y[idx].tolist(), series.columns['color'][idx].tolist()
+
+
+def relayout_view(relayout_data, view):
+    """
+    function updates the visible ranges with the content of the relayoutData
+
+    Returns:
+        {'x': range or None, 'y': range or None}, None means autorange, or None if the
+        relayoutData does not concern the axes
+    """
+    view = dict(view or {'x': None, 'y': None})
+    changed = False
+    for axis in ('x', 'y'):
+        if f'{axis}axis.range[0]' in relayout_data:
+            view[axis] = [relayout_data[f'{axis}axis.range[0]'], relayout_data[f'{axis}axis.range[1]']]
+        elif f'{axis}axis.range' in relayout_data:
+            view[axis] = relayout_data[f'{axis}axis.range']
+        elif relayout_data.get(f'{axis}axis.autorange'):
+            view[axis] = None
+        else:
+            continue
+        changed = True
+    return view if changed else None
+
+
 # this callback gets triggered at startup. The Output('fig-main', 'relayoutData') is necessary
 # because the relayoutData is not reset automatically when creating a new figure
 @app.callback(
     Output('fig-main', 'figure'),
     Output('initial_figure_range', 'data'),
     Output('fig-main', 'relayoutData'),
+    Output('dataset', 'data'),
+    Output('overview_figure', 'data'),
+    Output('view', 'data'),
     Input('btn', 'n_clicks'),
+    State('n_points', 'value'),
+    State('method', 'value'),
 )
-def create_new_figure(_):
-    # create base figure
+def create_new_figure(_, n_points, method):
+    # the data is sorted by x once, every zoom then only searches the visible range
+    series = SortedSeries(
+        x=np.random.sample(n_points),
+        y=np.random.sample(n_points),
+        color=np.random.randint(0, 3, n_points).astype(np.int8)
+    )
+    dataset_id = str(uuid.uuid4())
+    datasets.put(dataset_id, series, size=series.nbytes)
+
+    # create base figure from the resampled points, which contain the extremes of x and y
+    x, y, color = resampled_points(series, method=method)
     fig = px.scatter(
-        x=np.random.sample(150),
-        y=np.random.sample(150),
-        color=np.random.randint(0, 3, 150)
-    ).update_layout(height=500, width=800)
+        x=x,
+        y=y,
+        color=color,
+        render_mode='webgl'
+    ).update_layout(height=HEIGHT, width=WIDTH, uirevision=dataset_id)
+
+    # compute the autoranges once with numpy instead of rendering the figure twice with
+    # full_figure_for_development(). The axis length ignores the margin pushed by the colorbar
+    # of the continuous color (automargin), so the ranges are set on the main figure: both
+    # figures use exactly the same ranges even if the axis in the browser is slightly shorter
+    ranges = figure_ranges(fig)
+    fig.update_layout(xaxis_range=ranges['x'], yaxis_range=ranges['y'])
+    # reset relayoutData
+    return fig, ranges, None, dataset_id, fig, None
+
+
+# zooming and panning send the new ranges, the server returns the visible points of the dataset.
+# uirevision keeps the zoom of the user when the data of the figure is replaced
+@app.callback(
+    Output('fig-main', 'figure', allow_duplicate=True),
+    Output('view', 'data', allow_duplicate=True),
+    Input('fig-main', 'relayoutData'),
+    State('view', 'data'),
+    State('dataset', 'data'),
+    State('method', 'value'),
+    prevent_initial_call=True
+)
+def resample_view(relayout_data, view, dataset_id, method):
+    series = datasets.get(dataset_id)
+    view = relayout_view(relayout_data or {}, view)
+    if series is None or view is None:
+        raise PreventUpdate
 
-    # extract ranges. It would be better not to use full_figure_for_development()
-    # and use a clientside callback instead
-    xrange = fig.full_figure_for_development().layout.xaxis.range
-    yrange = fig.full_figure_for_development().layout.yaxis.range
-    return fig, {'x': xrange, 'y': yrange}, None  # reset relayoutData
+    x, y, color = resampled_points(series, view['x'], view['y'], method)
+    patched_figure = Patch()
+    patched_figure['data'][0]['x'] = x
+    patched_figure['data'][0]['y'] = y
+    patched_figure['data'][0]['marker']['color'] = color
+    return patched_figure, view
 
 
 app.clientside_callback(
     """
-    function(re_layout, initial_range, fig) {
+    function(re_layout, initial_range, overview) {
         if (re_layout == null) {
             x = initial_range.x
             y = initial_range.y
@@ -68,10 +193,10 @@ app.clientside_callback(
             }
         }
 
-        // create new figure
-        newFig = JSON.parse(JSON.stringify(fig))
+        // create new figure from the resampled points of the complete dataset,
+        // the main figure only contains the points of the zoomed area
+        newFig = JSON.parse(JSON.stringify(overview))
 
-        // the State() of the figure actually shows the axis ranges after zooming
         // set the axis ranges to the initial values
         newFig.layout.xaxis.range = initial_range.x
         newFig.layout.yaxis.range = initial_range.y
@@ -105,7 +230,7 @@ app.clientside_callback(
     Output('fig-overview', 'figure'),
     Input('fig-main', 'relayoutData'),
     Input('initial_figure_range', 'data'),
-    State('fig-main', 'figure'),
+    State('overview_figure', 'data'),
     prevent_initial_call=True
 )
 
@@ -0,0 +1,142 @@
+from dash import Dash, dcc, html, Input, Output, Patch
+from image_assets import load_image
+from image_tiles import TilePyramid, register_tile_route
+from dash.exceptions import PreventUpdate
+import dash_bootstrap_components as dbc
+import plotly.graph_objects as go
+
+# get an example image, it is downloaded only once and cached locally,
+# locally stored images can be used this way too
+img = load_image('https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg')
+
+# build the tile pyramid, this happens only once per image, the tiles are stored in ./tiles
+pyramid = TilePyramid(img)
+
+# width of the plot in screen pixels, used to choose the level of the pyramid
+GRAPH_WIDTH = 800
+GRAPH_HEIGHT = int(GRAPH_WIDTH * img.shape[0] / img.shape[1])
+
+# the figure does not contain any pixels, the image consists of layout images which
+# reference the tiles. The browser downloads (and caches) only the visible tiles
+level, images = pyramid.layout_images((0, img.shape[1]), (0, img.shape[0]), GRAPH_WIDTH)
+fig = go.Figure()
+fig.update_layout(
+    template='plotly_dark',
+    plot_bgcolor='rgba(0, 0, 0, 0)',
+    paper_bgcolor='rgba(0, 0, 0, 0)',
+    width=GRAPH_WIDTH,
+    height=GRAPH_HEIGHT,
+    margin={
+        'l': 0,
+        'r': 0,
+        't': 0,
+        'b': 0,
+    },
+    xaxis={
+        'range': [0, img.shape[1]],
+        'showgrid': False,
+        'showticklabels': False,
+        'zeroline': False,
+    },
+    yaxis={
+        'range': [img.shape[0], 0],
+        'scaleanchor': 'x',
+        'showgrid': False,
+        'showticklabels': False,
+        'zeroline': False,
+    },
+    images=images,
+    # keep the zoom of the user when the tiles are exchanged
+    uirevision='tiles',
+)
+
+# app initialization
+app = Dash(__name__, external_stylesheets=[dbc.themes.SLATE],
+           meta_tags=[{'name': 'viewport',
+                       'content': 'width=device-width, initial-scale=1.0'}]
+           )
+
+# serve the tiles from the flask server of the app
+register_tile_route(app.server, [pyramid])
+
+# app layout
+app.layout = dbc.Container(
+    [
+        dbc.Row(
+            [
+                dbc.Col(
+                    dcc.Graph(
+                        id='graph',
+                        figure=fig,
+                        config={
+                            'scrollZoom': True,
+                            'displayModeBar': False,
+                        }
+                    ),
+                    width={'size': 8, 'offset': 0}
+                ),
+                dbc.Col(
+                    [
+                        dcc.Markdown(
+                            '''
+                            #### Functionality:
+                            - zoom into the image (scroll or drag)
+                            - the tiles of the matching resolution are loaded for the visible area
+                            - double click to reset the zoom
+                            '''
+                        ),
+                        html.Pre(id='level', children=f'level: {level}, tiles: {len(images)}')
+                    ],
+                    width={'size': 4, 'offset': 0}
+                ),
+            ], justify='around'
+        )
+    ], fluid=True
+)
+
+
+def visible_range(relayout_data, axis, default):
+    """
+    function extracts the visible range of an axis from the relayoutData
+
+    Args:
+        relayout_data: relayoutData of a dcc.Graph
+        axis: 'xaxis' or 'yaxis'
+        default: range to use after an autorange event
+    Returns:
+        [start, end] or None if the relayoutData does not concern the axis
+    """
+    if f'{axis}.range[0]' in relayout_data:
+        return [relayout_data[f'{axis}.range[0]'], relayout_data[f'{axis}.range[1]']]
+    if f'{axis}.range' in relayout_data:
+        return relayout_data[f'{axis}.range']
+    if relayout_data.get(f'{axis}.autorange'):
+        return default
+    return None
+
+
+# exchange the tiles after zooming, only the layout images are sent back
+@app.callback(
+    Output('graph', 'figure'),
+    Output('level', 'children'),
+    Input('graph', 'relayoutData'),
+    prevent_initial_call=True
+)
+def update_tiles(relayout_data):
+    if not relayout_data:
+        raise PreventUpdate
+
+    x_range = visible_range(relayout_data, 'xaxis', [0, img.shape[1]])
+    y_range = visible_range(relayout_data, 'yaxis', [img.shape[0], 0])
+    if x_range is None or y_range is None:
+        raise PreventUpdate
+
+    level, images = pyramid.layout_images(x_range, y_range, GRAPH_WIDTH)
+
+    patched_figure = Patch()
+    patched_figure['layout']['images'] = images
+    return patched_figure, f'level: {level}, tiles: {len(images)}'
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=8054)
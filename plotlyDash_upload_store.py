@@ -1,21 +1,39 @@
-from dash import Dash, dcc, html, Input, Output, State, callback_context
+from dash import Dash, dcc, html, Input, Output, State, Patch, callback_context, no_update
+from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 from base64 import b64decode
-import plotly.express as px
-import urllib.request
-from PIL import Image
-import numpy as np
+from annotation_io import dump_shapes_binary, load_annotations
+from annotation_repository import AnnotationRepository
+from image_assets import load_image
+from image_cache import LRUCache
+from image_figures import content_hash, image_figure, placeholder_figure, with_shapes
+from region_stats import RegionStats, describe
+from shape_history import ShapeHistory, replace_shapes
+from shape_masks import encode_mask, rasterize
+from shape_utils import shapes_patch, update_shapes
+import uuid
 import json
 
-# get an example image from url
-urllib.request.urlretrieve(
-    'https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg',
-    'bridge.jpg'
-)
+# get an example image, it is downloaded only once and cached locally,
+# locally stored images can be used this way too
+img_url = 'https://raw.githubusercontent.com/michaelbabyn/plot_data/master/bridge.jpg'
+img = load_image(img_url)
+
+# annotations are stored per session and image in a sqlite database (./annotations.sqlite)
+repository = AnnotationRepository()
+img_id = content_hash(img)
+
+# number of annotations shown per page of the dcc.Store viewer
+STORE_PAGE_SIZE = 20
+
+# undo/redo history of the drawn shapes per session, unchanged shapes are shared between the steps
+histories = LRUCache(max_entries=100)
+
+# summed area tables for the statistics of drawn rectangles
+img_stats = RegionStats(img)
 
-# open image and create plotly figure
-img = Image.open('bridge.jpg')
-fig = px.imshow(img=img)
+# create plotly figure
+fig = image_figure(img)
 
 # create layout for figure
 layout = {
@@ -23,8 +41,8 @@ layout = {
     'template': 'plotly_dark',
     'plot_bgcolor': 'rgba(0, 0, 0, 0)',
     'paper_bgcolor': 'rgba(0, 0, 0, 0)',
-    'width': img.width * 0.45,
-    'height': img.height * 0.45,
+    'width': img.shape[1] * 0.45,
+    'height': img.shape[0] * 0.45,
     'margin': {
         'l': 0,
         'r': 0,
@@ -75,7 +93,28 @@ config = {
 }
 
 
-# utility function
+# utility functions
+def get_history(session_id, shapes=None):
+    """
+    function returns the undo/redo history of the shapes of a session
+
+    Args:
+        session_id: id of the session
+        shapes: shapes of the browser, the first step of a new history (i.e. after a restart)
+    """
+    history = histories.get(session_id)
+    if history is None:
+        history = ShapeHistory(shapes)
+        histories.put(session_id, history, size=0)
+    return history
+
+
+def rect_stats(shapes):
+    # O(1) per rectangle thanks to the summed area tables
+    rects = [shape for shape in shapes if shape.get('type', '') == 'rect']
+    return '\n\n'.join(describe(img_stats.shape_stats(shape)) for shape in rects)
+
+
 def parse_file(content):
     """
     function parses a Base64 text
@@ -83,7 +122,7 @@ def parse_file(content):
     Args:
          content: base64 text
     Returns:
-        annotations: dictionary
+        annotations: list of shapes
     """
     # split text with ',', first par of string contains information concerning type
     _, base64_text = content.split(',')
@@ -91,15 +130,8 @@ def parse_file(content):
     # convert to byte string
     byte_string = b64decode(base64_text)
 
-    # convert to utf-8 string
-    utf_string = byte_string.decode('utf-8')
-
-    # converting "true" to uppercase so that it gets evaluated as True
-    utf_string = utf_string.replace('true', 'True')
-
-    # convert string dictionary into dictionary
-    annotations = eval(utf_string)
-    return annotations
+    # decode binary or json, raises ValueError for files which are not valid annotations
+    return load_annotations(byte_string)
 
 
 # app initialization
@@ -109,16 +141,27 @@ app = Dash(__name__, external_stylesheets=[dbc.themes.SLATE],
            )
 
 # app layout
-app.layout = dbc.Container(
+page = dbc.Container(
     [
         dbc.Row(
             [
                 dbc.Col(
-                    dcc.Graph(
-                        id='graph',
-                        figure=fig,
-                        config=config
-                    ),
+                    [
+                        dcc.Graph(
+                            id='graph',
+                            figure=fig,
+                            config=config
+                        ),
+                        html.Div(
+                            [
+                                dbc.Button('Undo', id='undo', n_clicks=None, style={'width': '50%'}),
+                                dbc.Button('Redo', id='redo', n_clicks=None, style={'width': '50%'}),
+                            ], className="d-flex flex-row"
+                        ),
+                        html.H5('Statistics of drawn rectangles'),
+                        html.Pre(id='region_stats'),
+                        dcc.Store(id='shapes', data=[]),
+                    ],
                     width={'size': 4, 'offset': 0}
                 ),
                 dbc.Col(
@@ -149,15 +192,15 @@ app.layout = dbc.Container(
                                 html.Div(
                                     [
                                         dbc.Button(
-                                            'Export to file',
+                                            'Export',
                                             id='export',
                                             n_clicks=None,
                                             style={'width': '50%'}
                                         ),
                                         dcc.Upload(
                                             id='upload-data',
-                                            # accept only text files
-                                            accept='.txt',
+                                            # accept only exported annotations, json (.txt) or binary (.ann)
+                                            accept='.txt,.ann',
                                             # Do not allow multiple files to be uploaded
                                             multiple=False,
                                             children=dbc.Button(
@@ -168,12 +211,59 @@ app.layout = dbc.Container(
                                         )
                                     ], className="d-flex flex-row"
                                 ),
+                                dcc.RadioItems(
+                                    id='export_format',
+                                    options=[
+                                        {'label': 'database', 'value': 'database'},
+                                        {'label': 'json (.txt)', 'value': 'json'},
+                                        {'label': 'binary (.ann)', 'value': 'binary'},
+                                    ],
+                                    value='database',
+                                    inline=True,
+                                    inputStyle={"margin-right": "5px"},
+                                    labelStyle={"margin-right": "10px"}
+                                ),
+                                dbc.Button(
+                                    'Load from database',
+                                    id='load_db',
+                                    n_clicks=None,
+                                    style={'width': '100%'}
+                                ),
                                 dbc.Button(
                                     'Copy annotations to other figure',
                                     id='ret_ann',
                                     n_clicks=None,
                                     style={'width': '100%'}
                                 ),
+                                # gray background of the copy, a png of the image size or a single stretched pixel
+                                dcc.RadioItems(
+                                    id='background_mode',
+                                    options=[
+                                        {'label': 'image', 'value': 'image'},
+                                        {'label': 'layout image', 'value': 'layout'},
+                                    ],
+                                    value='layout',
+                                    inline=True,
+                                    inputStyle={"margin-right": "5px"},
+                                    labelStyle={"margin-right": "10px"}
+                                ),
+                                dbc.Button(
+                                    'Download label mask',
+                                    id='download_mask',
+                                    n_clicks=None,
+                                    style={'width': '100%'}
+                                ),
+                                dcc.RadioItems(
+                                    id='mask_format',
+                                    options=[
+                                        {'label': 'png', 'value': 'png'},
+                                        {'label': 'numpy (.npy)', 'value': 'npy'},
+                                    ],
+                                    value='png',
+                                    inline=True,
+                                    inputStyle={"margin-right": "5px"},
+                                    labelStyle={"margin-right": "10px"}
+                                ),
                             ]
                         )
                     ], width={'size': 2, 'offset': 0}
@@ -186,6 +276,13 @@ app.layout = dbc.Container(
                 dbc.Col(
                     [
                         html.H4('dcc.Store content'),
+                        dbc.Pagination(
+                            id='store_page',
+                            max_value=1,
+                            active_page=1,
+                            fully_expanded=False,
+                            size='sm'
+                        ),
                         html.Pre(id='store_in')
                     ], width={'size': 5, 'offset': 1}
                 ),
@@ -194,12 +291,15 @@ app.layout = dbc.Container(
                         '''
                     #### Functionality:
                     - draw/delete annotation(s) on the image
+                    - "Undo"/"Redo": steps through the changes of the annotations
                     - "Save into dcc.Store": saves annotations in store
-                    - "Export to file": saves the annotations into a text file
+                    - "Export": saves the annotations of this session into the database or downloads them as a text file (json) or a compact binary file
+                    - "Load from database": loads the annotations of this image saved in this session, the session is kept by the browser across reloads
                     - "Delete dcc.Store": deletes all contents form dcc.Store
                     - "Copy annotations to other figure": copys the data in dcc.Store to an image
+                    - "Download label mask": downloads the annotations in dcc.Store as segmentation mask, shape i has the label i + 1
 
-                    The content of the dcc.Store element is always displayed
+                    The content of the dcc.Store element is always displayed, page by page
                     '''),
                     width={'size': '5'}
                 ),
@@ -210,10 +310,10 @@ app.layout = dbc.Container(
                             data={},
                             storage_type='memory'
                         ),
-                        html.Pre(
-                            id='dummy_out',
-                            style={'display': 'none'}
-                        )
+                        html.Pre(id='export_status'),
+                        html.Pre(id='upload_status'),
+                        dcc.Download(id='download'),
+                        dcc.Download(id='mask'),
                     ]
                 ),
             ], justify='around'
@@ -222,37 +322,129 @@ app.layout = dbc.Container(
 )
 
 
+# a function so that a new browser gets its own session id. The id is kept in the local storage
+# of the browser, dcc.Store prefers the stored id to the new one, so that the annotations saved
+# in the database can still be loaded after a reload of the page or a restart of the browser
+def serve_layout():
+    return html.Div([page, dcc.Store(id='session', data=str(uuid.uuid4()), storage_type='local')])
+
+
+app.layout = serve_layout
+
+
+# keep track of the drawn shapes and show the statistics of the rectangles,
+# every change of the shapes is a step of the undo history
+@ app.callback(
+    Output(component_id='shapes', component_property='data'),
+    Output(component_id='region_stats', component_property='children'),
+    Input(component_id='graph', component_property='relayoutData'),
+    State(component_id='shapes', component_property='data'),
+    State(component_id='session', component_property='data'),
+    prevent_initial_call=True
+)
+def show_region_stats(relayout_data, shapes, session_id):
+    # the shapes are updated from the copy of the browser, the history on the server is lost
+    # on a restart or missing on another worker, it only records the steps for undo/redo
+    updated = update_shapes(shapes, relayout_data)
+    if updated is None:
+        raise PreventUpdate
+
+    history = get_history(session_id, shapes)
+    history.push(replace_shapes(history.current, updated))
+    return updated, rect_stats(updated)
+
+
+# undo/redo, only the shapes of the figure are replaced
+@ app.callback(
+    Output(component_id='graph', component_property='figure'),
+    Output(component_id='shapes', component_property='data', allow_duplicate=True),
+    Output(component_id='region_stats', component_property='children', allow_duplicate=True),
+    Input(component_id='undo', component_property='n_clicks'),
+    Input(component_id='redo', component_property='n_clicks'),
+    State(component_id='session', component_property='data'),
+    prevent_initial_call=True
+)
+def undo_redo(undo_click, redo_click, session_id):
+    history = get_history(session_id)
+    if callback_context.triggered[0]['prop_id'] == 'undo.n_clicks':
+        version = history.undo()
+    else:
+        version = history.redo()
+    if version is None:
+        raise PreventUpdate
+
+    shapes = version.to_list()
+    patched_figure = Patch()
+    patched_figure['layout']['shapes'] = shapes
+    return patched_figure, shapes, rect_stats(shapes)
+
+
 # callback for button functionality
 # click on "delete" button: empty dcc.Store
 # click on "save" button: get annotations from figure, write into dcc.Store
 # click on upload: load annotations from text file
+# click on "load from database": load the annotations of this image only
+# only the changed annotations are sent to the dcc.Store
 @ app.callback(
     Output(component_id='store', component_property='data'),
-    Output(component_id='store_in', component_property='children'),
     Output(component_id='upload-data', component_property='contents'),
+    Output(component_id='upload_status', component_property='children'),
     Input(component_id='save_ann', component_property='n_clicks'),
     Input(component_id='delete', component_property='n_clicks'),
     Input(component_id='upload-data', component_property='contents'),
-    State(component_id='graph', component_property='figure'),
+    Input(component_id='load_db', component_property='n_clicks'),
     State(component_id='store', component_property='data'),
+    State(component_id='shapes', component_property='data'),
+    State(component_id='session', component_property='data'),
     prevent_initial_call=True
 )
-def store_in(save_click, delete_click, upload_content, figure, store_data):
+def store_in(save_click, delete_click, upload_content, load_click, store_data, shapes, session_id):
     # detect which button has been clicked
     trigger = callback_context.triggered[0]['prop_id']
 
     # actions depending on clicked button
     if trigger == "delete.n_clicks":
-        return {}, {}, 'reset_upload_contents'
+        return {}, 'reset_upload_contents', ''
 
     elif trigger == 'upload-data.contents':
-        annotations = parse_file(content=upload_content)
-        return annotations, json.dumps(annotations, indent=1), 'reset_upload_contents'
+        try:
+            annotations = parse_file(content=upload_content)
+        except ValueError as error:
+            # invalid files leave the dcc.Store unchanged
+            return no_update, 'reset_upload_contents', f'upload failed: {error}'
+
+    elif trigger == 'load_db.n_clicks':
+        annotations = repository.load_shapes(session_id, img_id)
 
     else:
-        layout = figure['layout']
-        annotations = layout.get('shapes', {})
-        return annotations, json.dumps(annotations, indent=1), 'reset_upload_contents'
+        # the shapes of the figure are kept up to date in the browser (see show_region_stats), the
+        # figure is not sent. The history on the server is only used for undo/redo, it is lost on a restart
+        annotations = shapes
+    return shapes_patch(store_data, annotations), 'reset_upload_contents', ''
+
+
+# show one page of the dcc.Store content, rendered in the browser so that
+# the annotations are not sent a second time
+app.clientside_callback(
+    """
+    function(data, page) {
+        var shapes = Array.isArray(data) ? data : [];
+        var pages = Math.max(1, Math.ceil(shapes.length / %d));
+        page = Math.min(page || 1, pages);
+        if (!Array.isArray(data)) {
+            return [JSON.stringify(data, null, 1), pages, page];
+        }
+        var start = (page - 1) * %d;
+        var text = JSON.stringify(shapes.slice(start, start + %d), null, 1);
+        return [`${shapes.length} annotations\n${text}`, pages, page];
+    }
+    """ % ((STORE_PAGE_SIZE,) * 3),
+    Output(component_id='store_in', component_property='children'),
+    Output(component_id='store_page', component_property='max_value'),
+    Output(component_id='store_page', component_property='active_page'),
+    Input(component_id='store', component_property='data'),
+    Input(component_id='store_page', component_property='active_page'),
+)
 
 
 # retrieve annotations from dcc.Store
@@ -260,25 +452,17 @@ def store_in(save_click, delete_click, upload_content, figure, store_data):
     Output(component_id='post', component_property='children'),
     Input(component_id='ret_ann', component_property='n_clicks'),
     State(component_id='store', component_property='data'),
+    State(component_id='background_mode', component_property='value'),
     prevent_initial_call=True
 )
-def store_out(click, data):
-    # create a gray dummy image
-    dummy_image = np.ones((img.height, img.width)) * 220
-    
-    # create plotly express object
-    figure = px.imshow(
-        dummy_image,
-        color_continuous_scale='gray',
+def store_out(click, data, background_mode):
+    # gray dummy image, the figure is built once per image size and only gets the shapes added
+    figure = placeholder_figure(
+        img.shape[0], img.shape[1], value=220, colorscale='gray', mode=background_mode, layout=layout
     )
 
-    # update figure layout
-    figure.update_layout(layout)
-    figure.update_coloraxes(showscale=False)
-
     # add annotations saved in dcc.Store
-    if data:
-        figure['layout'].update(shapes=data)
+    figure = with_shapes(figure, data)
 
     # create dcc.Graph object
     graph = dcc.Graph(
@@ -290,23 +474,45 @@ def store_out(click, data):
     return graph
 
 
-# export data from dcc.Store into text file
+# export data from dcc.Store into the database, files are downloaded by the browser
+# instead of being written into the working directory of the server
 @ app.callback(
-    Output(component_id='dummy_out', component_property='children'),
+    Output(component_id='export_status', component_property='children'),
+    Output(component_id='download', component_property='data'),
     Input(component_id='export', component_property='n_clicks'),
     State(component_id='store', component_property='data'),
+    State(component_id='export_format', component_property='value'),
+    State(component_id='session', component_property='data'),
     prevent_initial_call=True
 )
-def export(click, data):
-    # write annotations into text file
-    with open(f'exported_annotations.txt', 'wt') as f:
-        f.writelines(
-            json.dumps(
-                data,
-                indent=1
-            )
-        )
-    return
+def export(click, data, export_format, session_id):
+    # one transaction per image, safe with several users and workers
+    if export_format == 'database':
+        count = repository.save_shapes(session_id, img_id, data, source=img_url)
+        return f'saved {count} annotations', None
+
+    # binary format, much smaller and faster for many shapes
+    if export_format == 'binary':
+        return '', dcc.send_bytes(dump_shapes_binary(data), 'exported_annotations.ann')
+
+    # annotations as text file
+    return '', dcc.send_string(json.dumps(data, indent=1), 'exported_annotations.txt')
+
+
+
+# rasterize the annotations of dcc.Store into a label mask with the size of the image
+@ app.callback(
+    Output(component_id='mask', component_property='data'),
+    Input(component_id='download_mask', component_property='n_clicks'),
+    State(component_id='store', component_property='data'),
+    State(component_id='mask_format', component_property='value'),
+    prevent_initial_call=True
+)
+def download_mask(click, data, mask_format):
+    if not data:
+        raise PreventUpdate
+    mask = rasterize(data, img.shape[0], img.shape[1])
+    return dcc.send_bytes(encode_mask(mask, mask_format), f'annotation_mask.{mask_format}')
 
 
 if __name__ == '__main__':
@@ -0,0 +1,193 @@
+from annotation_store import points_in_polygon
+from dash import Patch
+import numpy as np
+import io
+
+# more point annotations than this are drawn as one WebGL scatter trace instead of svg shapes
+POINT_TRACE_THRESHOLD = 500
+
+
+def shape_centers(shapes):
+    """
+    function computes the centers of the bounding boxes of shapes (i.e. the clicked points)
+
+    Returns:
+        xs, ys: arrays of the coordinates
+    """
+    coords = np.array(
+        [(shape.get('x0'), shape.get('y0'), shape.get('x1'), shape.get('y1')) for shape in shapes],
+        dtype=np.float64
+    ).reshape(-1, 4)
+    return (coords[:, 0] + coords[:, 2]) / 2, (coords[:, 1] + coords[:, 3]) / 2
+
+
+def points_trace(xs=(), ys=(), size=10, color='rgba(39,43,48,255)'):
+    """
+    function creates the WebGL scatter trace showing point annotations. x and y are sent
+    as plain lists, so that single points can be appended with a Patch
+
+    Returns:
+        trace as dictionary
+    """
+    return {
+        'type': 'scattergl',
+        'name': 'points',
+        'mode': 'markers',
+        'x': np.asarray(xs, dtype=np.float64).tolist(),
+        'y': np.asarray(ys, dtype=np.float64).tolist(),
+        'marker': {'size': size, 'color': color},
+        'hoverinfo': 'skip',
+        'showlegend': False,
+    }
+
+
+def render_patch(shapes, trace_idx, threshold=POINT_TRACE_THRESHOLD, size=10, color='rgba(39,43,48,255)'):
+    """
+    function creates a Patch which shows the point annotations either as layout shapes or,
+    above threshold, as a single WebGL scatter trace
+
+    Args:
+        shapes: list of circle shapes
+        trace_idx: index of the scatter trace in figure['data']
+        threshold: maximum number of annotations drawn as shapes
+        size: marker size in screen pixels
+        color: marker color
+    Returns:
+        Patch of the figure
+    """
+    patched_figure = Patch()
+    patched_figure['layout']['selections'] = []
+    if len(shapes) > threshold:
+        patched_figure['layout']['shapes'] = []
+        patched_figure['data'][trace_idx] = points_trace(*shape_centers(shapes), size=size, color=color)
+    else:
+        patched_figure['layout']['shapes'] = shapes
+        patched_figure['data'][trace_idx] = points_trace(size=size, color=color)
+    return patched_figure
+
+
+def selected_indices(xs, ys, selected_data, chunk_size=65536):
+    """
+    function finds the points inside a box or lasso selection
+
+    Args:
+        xs, ys: coordinates of the points
+        selected_data: selectedData of a dcc.Graph
+        chunk_size: number of points tested against a lasso at once
+    Returns:
+        array of indices, None if the selectedData contains no box or lasso
+    """
+    if not selected_data:
+        return None
+    if 'range' in selected_data:
+        (x0, x1), (y0, y1) = selected_data['range']['x'], selected_data['range']['y']
+        inside = (xs >= min(x0, x1)) & (xs <= max(x0, x1)) & (ys >= min(y0, y1)) & (ys <= max(y0, y1))
+    elif 'lassoPoints' in selected_data:
+        lasso = selected_data['lassoPoints']
+        lx, ly = np.asarray(lasso['x'], dtype=float), np.asarray(lasso['y'], dtype=float)
+
+        # chunks of points limit the memory of the (points x lasso edges) arrays
+        inside = np.zeros(len(xs), dtype=bool)
+        for start in range(0, len(xs), chunk_size):
+            inside[start:start + chunk_size] = points_in_polygon(
+                xs[start:start + chunk_size], ys[start:start + chunk_size], lx, ly
+            )
+    else:
+        return None
+    return np.flatnonzero(inside)
+
+
+# more uploaded points than this are shown as density heatmap instead of single markers
+MAX_SCATTER_POINTS = 50_000
+
+# maximum number of bins per axis of the density heatmap
+MAX_DENSITY_BINS = 512
+
+
+def is_header(line):
+    """
+    function checks if the first line of a csv file is a header, i.e. one of the x, y fields is
+    not a number. nan, inf and exponents (1e5) are numbers, float() parses them like np.loadtxt
+    """
+    for field in line.split(',')[:2]:
+        try:
+            float(field)
+        except ValueError:
+            return True
+    return False
+
+
+def load_points(data, file_name):
+    """
+    function reads point coordinates from a csv (x,y per row, optional header) or npy file
+    (array of shape (n, 2)) in one pass
+
+    Args:
+        data: content of the file as bytes
+        file_name: name of the file, the extension selects the format
+    Returns:
+        xs, ys: float64 arrays
+    """
+    if file_name.lower().endswith('.npy'):
+        points = np.load(io.BytesIO(data), allow_pickle=False)
+    elif file_name.lower().endswith('.csv'):
+        text = data.decode('utf-8')
+        has_header = is_header(text.split('\n', 1)[0])
+        points = np.loadtxt(io.StringIO(text), delimiter=',', skiprows=int(has_header), usecols=(0, 1), ndmin=2)
+    else:
+        raise ValueError(f'points have to be a .csv or .npy file, got {file_name}')
+
+    points = np.asarray(points, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] < 2:
+        raise ValueError(f'expected an array of shape (n, 2), got {points.shape}')
+    return points[:, 0], points[:, 1]
+
+
+def density_trace(xs, ys, height, width, max_bins=MAX_DENSITY_BINS, colorscale='Hot'):
+    """
+    function bins points into a heatmap of the point density. A bin covers one or more
+    pixels of the image, empty bins are transparent
+
+    Args:
+        xs, ys: coordinates of the points (image pixels)
+        height, width: size of the image
+        max_bins: maximum number of bins per axis
+        colorscale: colorscale of the heatmap
+    Returns:
+        trace as dictionary
+    """
+    bin_size = max(1, -(-max(height, width) // max_bins))
+    ny, nx = -(-height // bin_size), -(-width // bin_size)
+
+    # bin index of every point, np.bincount is much faster than np.histogram2d
+    col = np.floor((xs + 0.5) / bin_size)
+    row = np.floor((ys + 0.5) / bin_size)
+    inside = (col >= 0) & (col < nx) & (row >= 0) & (row < ny)
+    flat = row[inside].astype(np.int64) * nx + col[inside].astype(np.int64)
+    counts = np.bincount(flat, minlength=ny * nx).reshape(ny, nx).astype(np.float64)
+    counts[counts == 0] = np.nan
+    return {
+        'type': 'heatmap',
+        'name': 'density',
+        'z': counts,
+        'x0': (bin_size - 1) / 2,
+        'dx': bin_size,
+        'y0': (bin_size - 1) / 2,
+        'dy': bin_size,
+        'colorscale': colorscale,
+        'opacity': 0.7,
+        'showscale': False,
+        'hovertemplate': 'x: %{x}<br>y: %{y}<br>points: %{z}<extra></extra>',
+    }
+
+
+def uploaded_points_trace(xs, ys, height, width, max_points=MAX_SCATTER_POINTS, size=4, color='#E2F714'):
+    """
+    function shows uploaded points as WebGL scatter trace or, if there are too many
+    points to draw them one by one, as density heatmap
+    """
+    if len(xs) > max_points:
+        return density_trace(xs, ys, height, width)
+    trace = points_trace(xs, ys, size=size, color=color)
+    trace['name'] = 'uploaded'
+    return trace
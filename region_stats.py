@@ -0,0 +1,154 @@
+from image_processing import rect_bounds
+from image_assets import _write_atomic
+import numpy as np
+import tempfile
+import os
+
+
+def summed_area_table(arr):
+    """
+    function computes the summed area table of an array, padded with a row and a column of zeros.
+    table[y, x] contains the sum of arr[:y, :x]
+
+    Args:
+        arr: array of shape (height, width) or (height, width, channels)
+    Returns:
+        int64 or float64 array of shape (height + 1, width + 1, ...)
+    """
+    dtype = np.float64 if np.issubdtype(arr.dtype, np.floating) else np.int64
+    table = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1) + arr.shape[2:], dtype=dtype)
+    np.cumsum(arr, axis=0, dtype=dtype, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+class RegionStats:
+    """
+    sum, mean and variance of arbitrary rectangular regions of an image in O(1)
+    per region, using summed area tables of the pixels and the squared pixels
+    """
+
+    def __init__(self, img):
+        arr = np.asarray(img)
+        self.height, self.width = arr.shape[:2]
+        self.sums = summed_area_table(arr)
+        self.squares = summed_area_table(arr.astype(np.int64 if arr.dtype.kind in 'ub' else np.float64) ** 2)
+
+    @classmethod
+    def from_windowed(cls, img, strip_rows=1024, path=None):
+        """
+        function builds the summed area tables from a WindowedImage strip by strip. The tables
+        are memory mapped like the tiles of the image: only one strip of the image and of the
+        tables is in memory at once, regions read only the four corners they need
+
+        Args:
+            img: WindowedImage (or any object with height, width, shape, dtype and read())
+            strip_rows: number of image rows read at once
+            path: .npy file of the tables, built once and reused afterwards.
+                By default next to the tiles of the image, in an anonymous temporary file
+                if the image has no path
+        """
+        stats = cls.__new__(cls)
+        stats.height, stats.width = img.height, img.width
+        dtype = np.float64 if np.issubdtype(img.dtype, np.floating) else np.int64
+        shape = (2, img.height + 1, img.width + 1) + tuple(img.shape[2:])
+        if path is None and getattr(img, 'path', None):
+            path = img.path + '.sat.npy'
+
+        def write(tables):
+            # sums and squares in one file, so both are always complete
+            tables[:, 0] = 0
+            tables[:, :, 0] = 0
+            for y0 in range(0, img.height, strip_rows):
+                strip = img.read(y0, y0 + strip_rows, 0, img.width).astype(dtype)
+                y1 = y0 + strip.shape[0]
+
+                # prefix sums along the rows of the strip, then along the columns continuing the previous strip
+                for table, values in ((tables[0], strip), (tables[1], strip ** 2)):
+                    np.cumsum(values, axis=1, out=values)
+                    np.cumsum(values, axis=0, out=table[y0 + 1:y1 + 1, 1:])
+                    table[y0 + 1:y1 + 1, 1:] += table[y0, 1:]
+            tables.flush()
+
+        if path is None:
+            tables = np.memmap(tempfile.TemporaryFile(), dtype=dtype, mode='w+', shape=shape)
+            write(tables)
+        else:
+            if not os.path.exists(path):
+                def write_file(f):
+                    tables = np.lib.format.open_memmap(f.name, mode='w+', dtype=dtype, shape=shape)
+                    write(tables)
+                    del tables
+
+                _write_atomic(path, write_file)
+            tables = np.load(path, mmap_mode='r')
+        stats.sums, stats.squares = tables[0], tables[1]
+        return stats
+
+    @staticmethod
+    def _region_sum(table, y0, y1, x0, x1):
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def region(self, y0, y1, x0, x1):
+        """
+        function computes the statistics of the region [y0:y1, x0:x1], clipped at the image borders
+
+        Returns:
+            dictionary with count, sum, mean, var. sum, mean and var contain one value per channel,
+            None if the region is empty
+        """
+        y0, y1 = sorted((min(max(y0, 0), self.height), min(max(y1, 0), self.height)))
+        x0, x1 = sorted((min(max(x0, 0), self.width), min(max(x1, 0), self.width)))
+        count = (y1 - y0) * (x1 - x0)
+        if not count:
+            return None
+
+        total = self._region_sum(self.sums, y0, y1, x0, x1)
+        mean = total / count
+        var = self._region_sum(self.squares, y0, y1, x0, x1) / count - mean ** 2
+        return {
+            'count': count,
+            'sum': total,
+            'mean': mean,
+            # rounding errors might result in tiny negative values
+            'var': np.maximum(var, 0),
+        }
+
+    def window(self, x, y, radius):
+        """
+        function computes the statistics of the square window of (2 * radius + 1) pixels
+        around the pixel (x, y), i.e. around the mouse cursor
+        """
+        x, y = int(round(x)), int(round(y))
+        return self.region(y - radius, y + radius + 1, x - radius, x + radius + 1)
+
+    def shape_stats(self, shape):
+        """
+        function computes the statistics of the region covered by a plotly shape of type 'rect'
+        """
+        y_min, y_max, x_min, x_max = rect_bounds(shape)
+        return self.region(y_min, y_max, x_min, x_max)
+
+
+# names of the channels by number of channels
+CHANNEL_NAMES = {1: ['gray'], 2: ['gray', 'alpha'], 3: ['R', 'G', 'B'], 4: ['R', 'G', 'B', 'A']}
+
+
+def describe(stats, channels=None):
+    """
+    function formats region statistics as text, one line per channel
+
+    Args:
+        stats: result of RegionStats.region()
+        channels: names of the channels, by default gray, RGB or RGBA depending on the number of channels
+    """
+    if stats is None:
+        return 'empty region'
+    sums = np.atleast_1d(stats['sum'])
+    if channels is None:
+        channels = CHANNEL_NAMES.get(len(sums), [str(i) for i in range(len(sums))])
+    lines = [f'pixels: {stats["count"]}']
+    for name, total, mean, var in zip(channels, sums,
+                                      np.atleast_1d(stats['mean']), np.atleast_1d(stats['var'])):
+        lines.append(f'{name}: mean {mean:.1f}, std {np.sqrt(var):.1f}, sum {total}')
+    return '\n'.join(lines)
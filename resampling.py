@@ -0,0 +1,145 @@
+import numpy as np
+
+# number of points per pixel of the x axis which are sent to the browser
+POINTS_PER_PIXEL = 2
+
+# minmax preselects this many points per output point for LTTB
+LTTB_PRESELECT = 4
+
+
+class SortedSeries:
+    """
+    data sorted by x once, so that the points of an x range are found with a binary search
+    (np.searchsorted) instead of a comparison of all points
+    """
+
+    def __init__(self, x, y, **columns):
+        x = np.asarray(x, dtype=np.float64)
+        order = np.argsort(x, kind='stable')
+        self.x = x[order]
+        self.y = np.asarray(y, dtype=np.float64)[order]
+
+        # further columns (i.e. marker colors) in the same order as x and y
+        self.columns = {name: np.asarray(values)[order] for name, values in columns.items()}
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def nbytes(self):
+        return self.x.nbytes + self.y.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    def visible(self, x_range=None, y_range=None):
+        """
+        function finds the points inside the ranges of the axes
+
+        Args:
+            x_range: [start, end] or None for all points
+            y_range: [start, end] or None for all points
+        Returns:
+            slice (only an x range) or indices into the sorted data, sorted by x
+        """
+        start, stop = 0, len(self.x)
+        if x_range is not None:
+            start = np.searchsorted(self.x, min(x_range), side='left')
+            stop = np.searchsorted(self.x, max(x_range), side='right')
+        if y_range is None:
+            return slice(start, stop)
+
+        # y is not sorted, only the points of the x range are compared
+        ys = self.y[start:stop]
+        return start + np.flatnonzero((ys >= min(y_range)) & (ys <= max(y_range)))
+
+
+def minmax_bins(x, y, n_bins):
+    """
+    function keeps the points with the smallest and the largest y of every bin of equal
+    width along x, plus the first and the last point. Shapes and outliers stay visible, since
+    every pixel column shows the extremes of its points
+
+    Args:
+        x: sorted x values
+        y: y values
+        n_bins: number of bins, i.e. pixels of the x axis
+    Returns:
+        sorted indices of the kept points
+    """
+    if len(x) <= 2 * n_bins + 2:
+        return np.arange(len(x))
+
+    # the bins are contiguous slices of the sorted data
+    edges = np.linspace(x[0], x[-1], n_bins + 1)
+    starts = np.unique(np.searchsorted(x, edges[:-1], side='left'))
+    lengths = np.diff(np.append(starts, len(x)))
+
+    # reduceat computes the extremes per bin, the first position of every extreme in its bin
+    # is found among the positions where y equals the extreme of its bin
+    keep = [np.array([0, len(x) - 1])]
+    for reduce in (np.minimum, np.maximum):
+        extremes = reduce.reduceat(y, starts)
+        positions = np.flatnonzero(y == np.repeat(extremes, lengths))
+        keep.append(positions[np.searchsorted(positions, starts)])
+    return np.unique(np.concatenate(keep))
+
+
+def lttb(x, y, n_out):
+    """
+    function downsamples a series with largest triangle three buckets: the first and the last
+    point are kept, in between every bucket keeps the point spanning the largest triangle with
+    the previously kept point and the mean of the next bucket
+
+    Args:
+        x: sorted x values
+        y: y values
+        n_out: number of points to keep
+    Returns:
+        sorted indices of the kept points
+    """
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, stop = bounds[i], bounds[i + 1]
+        next_stop = bounds[i + 2] if i + 2 < len(bounds) else n
+        next_x = x[stop:next_stop].mean() if next_stop > stop else x[-1]
+        next_y = y[stop:next_stop].mean() if next_stop > stop else y[-1]
+
+        # twice the area of the triangles, the constant factor does not change the argmax
+        px, py = x[previous], y[previous]
+        area = np.abs((px - next_x) * (y[start:stop] - py) - (px - x[start:stop]) * (next_y - py))
+        previous = start + int(np.argmax(area))
+        keep[i + 1] = previous
+    return keep
+
+
+def resample(series, x_range=None, y_range=None, pixels=700, method='minmax'):
+    """
+    function selects the visible points of a series and reduces them to a number of points
+    which depends on the width of the axis in pixels, not on the number of points
+
+    Args:
+        series: SortedSeries
+        x_range, y_range: visible ranges of the axes, None for all points
+        pixels: length of the x axis in pixels
+        method: 'minmax' (extremes per pixel) or 'lttb' (minmax preselection, then LTTB)
+    Returns:
+        indices into the sorted data of the series
+    """
+    idx = series.visible(x_range, y_range)
+    x, y = series.x[idx], series.y[idx]
+    n_out = int(pixels) * POINTS_PER_PIXEL
+    if method == 'minmax':
+        kept = minmax_bins(x, y, n_out // 2)
+    elif method == 'lttb':
+        preselected = minmax_bins(x, y, n_out * LTTB_PRESELECT // 2)
+        kept = preselected[lttb(x[preselected], y[preselected], n_out)]
+    else:
+        raise ValueError(f'unknown resampling method: {method}')
+
+    # slices of the sorted data are views, no copy of the visible points is needed
+    return idx.start + kept if isinstance(idx, slice) else idx[kept]
@@ -0,0 +1,200 @@
+from shape_utils import SHAPE_KEY, set_shape_property
+from bisect import bisect_right
+from collections import deque
+from array import array
+
+# maximum number of shapes per chunk of a ChunkedVector
+CHUNK_SIZE = 64
+
+# number of steps which can be undone
+MAX_STEPS = 1000
+
+
+class ChunkedVector:
+    """
+    immutable list of shapes which is split into chunks (tuples). Changing the vector returns
+    a new vector which shares all unchanged chunks with the old one, an edit only copies the
+    affected chunk and the list of chunk references. This way every version of an undo
+    history costs memory proportional to the size of the edit, not to the number of shapes.
+    """
+
+    __slots__ = ('chunks', 'offsets', 'chunk_size')
+
+    def __init__(self, items=(), chunk_size=CHUNK_SIZE, chunks=None):
+        self.chunk_size = chunk_size
+        if chunks is None:
+            items = tuple(items)
+            chunks = tuple(items[i:i + chunk_size] for i in range(0, len(items), chunk_size))
+        self.chunks = chunks
+
+        # start index of every chunk, the last entry is the length of the vector.
+        # an array of int64 needs much less memory per version than a tuple of ints
+        offsets = array('q', [0])
+        for chunk in chunks:
+            offsets.append(offsets[-1] + len(chunk))
+        self.offsets = offsets
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield from chunk
+
+    def _locate(self, idx):
+        chunk_idx = bisect_right(self.offsets, idx) - 1
+        return chunk_idx, idx - self.offsets[chunk_idx]
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError('ChunkedVector index out of range')
+        chunk_idx, pos = self._locate(idx)
+        return self.chunks[chunk_idx][pos]
+
+    def to_list(self):
+        return [item for chunk in self.chunks for item in chunk]
+
+    def splice(self, start, stop, items=()):
+        """
+        function replaces the items start:stop, only the chunks touched by the range are copied
+
+        Args:
+            start: first index to replace
+            stop: index after the last item to replace, start == stop inserts items
+            items: new items
+        Returns:
+            new ChunkedVector
+        """
+        length = len(self)
+        start, stop = max(0, min(start, length)), max(0, min(stop, length))
+        stop = max(start, stop)
+        if not self.chunks:
+            return ChunkedVector(items, self.chunk_size)
+
+        # chunks containing the first and the last replaced item, appending extends the last chunk
+        first, a = self._locate(start) if start < length else (len(self.chunks) - 1, len(self.chunks[-1]))
+        last, b = self._locate(stop - 1) if stop > start else (first, a - 1)
+        merged = self.chunks[first][:a] + tuple(items) + self.chunks[last][b + 1:]
+
+        # small remainders are merged with the next chunk, so that the chunks do not fragment
+        size = self.chunk_size
+        if len(merged) < size // 2 and last + 1 < len(self.chunks):
+            last += 1
+            merged += self.chunks[last]
+
+        # the merged items are split into chunks of (nearly) equal size, no chunk if nothing is left
+        count = -(-len(merged) // size)
+        pieces = tuple(merged[len(merged) * i // count:len(merged) * (i + 1) // count] for i in range(count))
+        return ChunkedVector(chunk_size=size, chunks=self.chunks[:first] + pieces + self.chunks[last + 1:])
+
+    def set(self, idx, item):
+        return self.splice(idx, idx + 1, (item,))
+
+    def append(self, item):
+        return self.splice(len(self), len(self), (item,))
+
+    def delete(self, idx):
+        return self.splice(idx, idx + 1)
+
+
+def replace_shapes(version, shapes):
+    """
+    function creates the version for a new list of shapes (i.e. after drawing or erasing a shape).
+    Only the part between the unchanged beginning and the unchanged end is replaced
+    """
+    length = min(len(version), len(shapes))
+    start = 0
+    for old, new in zip(version, shapes):
+        if old != new:
+            break
+        start += 1
+
+    end = 0
+    while end < length - start and version[len(version) - end - 1] == shapes[len(shapes) - end - 1]:
+        end += 1
+    return version.splice(start, len(version) - end, shapes[start:len(shapes) - end])
+
+
+class ShapeHistory:
+    """
+    undo/redo history of the shapes of a figure, every step is a version of a ChunkedVector
+    """
+
+    def __init__(self, shapes=None, max_steps=MAX_STEPS):
+        self.current = ChunkedVector(shapes or [])
+        self._undo = deque(maxlen=max_steps)
+        self._redo = []
+
+    @property
+    def undo_steps(self):
+        return len(self._undo)
+
+    @property
+    def redo_steps(self):
+        return len(self._redo)
+
+    def push(self, version):
+        """
+        function makes version the current state, the redo steps are dropped
+        """
+        if version is self.current:
+            return
+        self._undo.append(self.current)
+        self.current = version
+        self._redo.clear()
+
+    def undo(self):
+        """
+        function goes back one step
+
+        Returns:
+            current version or None if there is nothing to undo
+        """
+        if not self._undo:
+            return None
+        self._redo.append(self.current)
+        self.current = self._undo.pop()
+        return self.current
+
+    def redo(self):
+        if not self._redo:
+            return None
+        self._undo.append(self.current)
+        self.current = self._redo.pop()
+        return self.current
+
+    def apply_relayout(self, relayout_data):
+        """
+        function records the shape related content of the relayoutData as a new step
+
+        Returns:
+            True if the relayoutData concerned shapes
+        """
+        if not relayout_data:
+            return False
+
+        # drawing or erasing a shape sends the complete list of shapes
+        if 'shapes' in relayout_data:
+            self.push(replace_shapes(self.current, relayout_data['shapes']))
+            return True
+
+        # editing a shape sends only the changed properties, the edited shapes are copied
+        edited = {}
+        for key, value in relayout_data.items():
+            match = SHAPE_KEY.match(key)
+            if not match or int(match.group(1)) >= len(self.current):
+                continue
+            idx = int(match.group(1))
+            if idx not in edited:
+                edited[idx] = dict(self.current[idx])
+            set_shape_property(edited[idx], match.group(2), value)
+        if not edited:
+            return False
+
+        version = self.current
+        for idx, shape in edited.items():
+            version = version.set(idx, shape)
+        self.push(version)
+        return True
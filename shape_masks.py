@@ -0,0 +1,131 @@
+from annotation_store import COORDINATES, PATH_NUMBERS, points_in_polygon
+from PIL import Image
+import numpy as np
+import math
+import io
+
+
+def mask_dtype(count):
+    """
+    function returns the smallest dtype for count labels (plus the background 0)
+    """
+    if count < 2 ** 8:
+        return np.uint8
+    if count < 2 ** 16:
+        return np.uint16
+    raise ValueError(f'too many shapes for a uint16 label mask: {count}')
+
+
+def _window(x_min, y_min, x_max, y_max, height, width, margin=0.0):
+    # pixel rows/cols whose centers can lie inside the bounding box, clipped to the image
+    c0, c1 = max(math.ceil(x_min - margin), 0), min(math.floor(x_max + margin), width - 1)
+    r0, r1 = max(math.ceil(y_min - margin), 0), min(math.floor(y_max + margin), height - 1)
+    if c0 > c1 or r0 > r1:
+        return None
+    return r0, r1 + 1, c0, c1 + 1
+
+
+def _segments_mask(xs, ys, rows, cols, half_width):
+    # pixels closer to one of the segments than half the line width
+    py, px = rows[:, None], cols[None, :]
+    inside = np.zeros((len(rows), len(cols)), dtype=bool)
+    for x0, y0, x1, y1 in zip(xs[:-1], ys[:-1], xs[1:], ys[1:]):
+        dx, dy = x1 - x0, y1 - y0
+        length = dx * dx + dy * dy
+        t = np.clip(((px - x0) * dx + (py - y0) * dy) / length, 0, 1) if length else 0.0
+        inside |= (px - x0 - t * dx) ** 2 + (py - y0 - t * dy) ** 2 <= half_width ** 2
+    return inside
+
+
+def shape_pixels(shape, height, width, line_width=1.0):
+    """
+    function computes the pixels covered by a shape. Pixel (row, col) is covered if its center
+    lies inside the shape, like in the coordinates of a plotly image trace. Rectangles, circles
+    and closed paths are filled, lines and open paths are drawn with line_width pixels
+
+    Args:
+        shape: plotly shape (rect, circle, line, path)
+        height, width: size of the image
+        line_width: width of lines in pixels
+    Returns:
+        (row slice, col slice, boolean mask of the window) or None if the shape is outside the image
+    """
+    kind = shape.get('type', 'rect')
+    if kind == 'path':
+        numbers = [float(n) for n in PATH_NUMBERS.findall(shape.get('path', ''))]
+        xs, ys = np.array(numbers[0::2]), np.array(numbers[1::2])
+        n = min(len(xs), len(ys))
+        xs, ys = xs[:n], ys[:n]
+        closed = shape.get('path', '').rstrip().upper().endswith('Z')
+    else:
+        x0, y0, x1, y1 = (shape.get(c) for c in COORDINATES)
+        if None in (x0, y0, x1, y1):
+            return None
+        xs, ys = np.array([x0, x1], dtype=float), np.array([y0, y1], dtype=float)
+    if not len(xs):
+        return None
+
+    margin = line_width / 2 if kind == 'line' or (kind == 'path' and not closed) else 0.0
+    window = _window(xs.min(), ys.min(), xs.max(), ys.max(), height, width, margin)
+    if window is None:
+        return None
+    r0, r1, c0, c1 = window
+    rows, cols = np.arange(r0, r1, dtype=float), np.arange(c0, c1, dtype=float)
+
+    if kind == 'rect':
+        inside = np.ones((r1 - r0, c1 - c0), dtype=bool)
+    elif kind == 'circle':
+        # ellipse inscribed into the bounding box
+        cx, cy = xs.mean(), ys.mean()
+        rx, ry = abs(xs[1] - xs[0]) / 2, abs(ys[1] - ys[0]) / 2
+        if not rx or not ry:
+            return None
+        inside = ((cols[None, :] - cx) / rx) ** 2 + ((rows[:, None] - cy) / ry) ** 2 <= 1
+    elif kind == 'path' and closed:
+        gy, gx = np.meshgrid(rows, cols, indexing='ij')
+        inside = points_in_polygon(gx.ravel(), gy.ravel(), xs, ys).reshape(gx.shape)
+    else:
+        inside = _segments_mask(xs, ys, rows, cols, line_width / 2)
+    return slice(r0, r1), slice(c0, c1), inside
+
+
+def rasterize(shapes, height, width, line_width=1.0, dtype=None):
+    """
+    function draws shapes into a label mask, shape i gets the label i + 1, the background is 0.
+    Later shapes are drawn above earlier ones, as in the figure. Every shape only touches the
+    pixels of its bounding box, the pixels are computed with numpy
+
+    Args:
+        shapes: list of plotly shapes
+        height, width: size of the mask
+        line_width: width of lines in pixels
+        dtype: dtype of the mask, by default uint8 or uint16 depending on the number of shapes
+    Returns:
+        label mask, array of shape (height, width)
+    """
+    shapes = shapes or []
+    mask = np.zeros((height, width), dtype=dtype or mask_dtype(len(shapes)))
+    for label, shape in enumerate(shapes, 1):
+        pixels = shape_pixels(shape, height, width, line_width)
+        if pixels is None:
+            continue
+        rows, cols, inside = pixels
+        mask[rows, cols][inside] = label
+    return mask
+
+
+def encode_mask(mask, file_format='png'):
+    """
+    function encodes a label mask as png (8 or 16 bit grayscale) or as numpy .npy file
+
+    Returns:
+        bytes
+    """
+    buffer = io.BytesIO()
+    if file_format == 'npy':
+        np.save(buffer, mask, allow_pickle=False)
+    elif file_format == 'png':
+        Image.fromarray(mask).save(buffer, format='PNG')
+    else:
+        raise ValueError(f'unknown mask format: {file_format}')
+    return buffer.getvalue()
@@ -0,0 +1,95 @@
+from dash import Patch
+import re
+
+# keys of the relayoutData for an edited shape look like 'shapes[2].x0' or 'shapes[0].line.color'
+SHAPE_KEY = re.compile(r'^shapes\[(\d+)\]\.(.+)$')
+
+
+def update_shapes(shapes, relayout_data):
+    """
+    function applies the shape related content of the relayoutData to a list of shapes.
+    this allows to keep track of the drawn shapes without using the figure as State()
+
+    Args:
+        shapes: list of shapes, i.e. the current content of the shape store
+        relayout_data: relayoutData of a dcc.Graph
+    Returns:
+        shapes: updated list of shapes, None if the relayoutData does not concern shapes
+    """
+    if not relayout_data:
+        return None
+
+    # drawing or erasing a shape sends the complete list of shapes
+    if 'shapes' in relayout_data:
+        return relayout_data['shapes']
+
+    # editing a shape sends only the changed properties
+    edits = [(SHAPE_KEY.match(key), value) for key, value in relayout_data.items()]
+    edits = [(match, value) for match, value in edits if match]
+    if not edits:
+        return None
+
+    shapes = [dict(shape) for shape in shapes or []]
+    for match, value in edits:
+        idx, prop = int(match.group(1)), match.group(2)
+        if idx >= len(shapes):
+            continue
+        set_shape_property(shapes[idx], prop, value)
+    return shapes
+
+
+def set_shape_property(shape, prop, value):
+    """
+    function sets a (nested) property of a shape, nested dictionaries are copied
+    so that they are not shared with other versions of the shape
+
+    Args:
+        shape: shape dictionary, changed in place
+        prop: property such as x0 or line.color
+        value: new value
+    """
+    # walk down nested properties such as line.color
+    target = shape
+    *parents, key = prop.split('.')
+    for parent in parents:
+        target[parent] = dict(target.get(parent, {}))
+        target = target[parent]
+    target[key] = value
+
+
+def shapes_patch(old, new):
+    """
+    function creates a dash Patch which turns the list of shapes old into new. Only the range
+    between the unchanged beginning and the unchanged end is sent to the browser
+
+    Args:
+        old: current list of shapes (i.e. the data of a dcc.Store), may be {} or None
+        new: new list of shapes
+    Returns:
+        Patch, or the new list if old is not a list
+    """
+    new = new or []
+    if not isinstance(old, list):
+        return new
+
+    # unchanged shapes at the beginning and at the end
+    length = min(len(old), len(new))
+    start = 0
+    while start < length and old[start] == new[start]:
+        start += 1
+    end = 0
+    while end < length - start and old[len(old) - end - 1] == new[len(new) - end - 1]:
+        end += 1
+    old_count, new_count = len(old) - end - start, len(new) - end - start
+
+    patch = Patch()
+    for idx in range(start, start + min(old_count, new_count)):
+        patch[idx] = new[idx]
+    if new_count > old_count and end == 0:
+        patch.extend(new[start + old_count:])
+    else:
+        for idx in range(start + old_count, start + new_count):
+            patch.insert(idx, new[idx])
+    for idx in range(start + old_count - 1, start + new_count - 1, -1):
+        del patch[idx]
+    return patch
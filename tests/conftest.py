@@ -0,0 +1,58 @@
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from PIL import Image
+import contextvars
+import importlib
+import io
+import urllib.request
+import numpy as np
+import pytest
+import sys
+import os
+
+# the helper modules live in the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def example_image(height=240, width=320):
+    """
+    function creates a jpeg which replaces the example images of the apps (bridge.jpg)
+    """
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    img = np.stack([x * 255 // width, y * 255 // height, rng.integers(0, 255, (height, width))], axis=-1)
+    buffer = io.BytesIO()
+    Image.fromarray(img.astype(np.uint8)).save(buffer, format='JPEG')
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope='session')
+def load_app(tmp_path_factory):
+    """
+    fixture imports an example app without network access, downloads return a generated jpeg
+    and all files of the app are written into a temporary directory
+    """
+    directory = tmp_path_factory.mktemp('app')
+    data = example_image()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(directory)
+        monkeypatch.setenv('ASSET_DIR', str(directory / 'asset_cache'))
+        monkeypatch.setenv('ANNOTATION_DB', str(directory / 'annotations.sqlite'))
+        monkeypatch.setattr(urllib.request, 'urlopen', lambda *args, **kwargs: io.BytesIO(data))
+        import image_assets
+        monkeypatch.setattr(image_assets, 'ASSET_DIR', str(directory / 'asset_cache'))
+        yield importlib.import_module
+
+
+@pytest.fixture
+def call():
+    """
+    fixture returns a function which calls a dash callback outside of a request,
+    callback_context.triggered contains prop_id
+    """
+    def call_callback(fn, prop_id, *args):
+        def run():
+            context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id, 'value': 1}]))
+            return fn(*args)
+        return contextvars.copy_context().run(run)
+    return call_callback
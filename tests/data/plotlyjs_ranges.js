@@ -0,0 +1,87 @@
+// computes the autoranges of the figures in autorange_plotlyjs.json with plotly.js and writes
+// them back into the file. plotly.js runs in node without a browser: the DOM is replaced by
+// stubs, the ranges are computed before anything is drawn
+//
+// usage (from the root of the repository):
+//     node tests/data/plotlyjs_ranges.js path/to/plotly.min.js tests/data/autorange_plotlyjs.json
+//
+// plotly.min.js is part of the plotly python package (plotly/package_data/plotly.min.js)
+const fs = require('fs');
+
+// properties which end loops over the DOM tree
+const NULL_PROPERTIES = [
+    'parentNode', 'parentElement', 'nextSibling', 'previousSibling', 'firstChild', 'lastChild',
+    'host', 'offsetParent', 'ownerSVGElement'
+];
+
+// every property and call of a stub returns another stub
+function stub(name, isUndefined) {
+    const target = function () {};
+    return new Proxy(target, {
+        get(t, key) {
+            if (key === Symbol.toPrimitive) return () => '';
+            if (key === Symbol.iterator || key === 'then') return undefined;
+            if (key === 'length') return 0;
+            if (key in t) return t[key];
+            if (isUndefined && isUndefined(key)) return undefined;
+            if (NULL_PROPERTIES.includes(key)) return null;
+            return stub(name + '.' + String(key));
+        },
+        set(t, key, value) {
+            t[key] = value;
+            return true;
+        },
+        apply: () => stub(name + '()'),
+        construct: () => stub('new ' + name),
+    });
+}
+
+function loadPlotly(path) {
+    global.window = new Proxy(global, {get: (t, key) => (key in t ? t[key] : stub('window.' + String(key)))});
+    global.document = stub('document');
+    global.self = global;
+    global.requestAnimationFrame = (fn) => setTimeout(fn, 0);
+    global.cancelAnimationFrame = (id) => clearTimeout(id);
+    global.getComputedStyle = () => ({getPropertyValue: () => ''});
+    Object.defineProperty(global, 'navigator', {value: {userAgent: 'node', platform: 'linux'}, configurable: true});
+    for (const name of ['Element', 'HTMLElement', 'SVGElement', 'Node', 'Event', 'MouseEvent', 'Image']) {
+        global[name] = class {};
+    }
+
+    // undefined browser globals are replaced by stubs until the bundle loads
+    const source = fs.readFileSync(path, 'utf8');
+    for (;;) {
+        try {
+            const module = {exports: {}};
+            new Function('module', 'exports', 'require', source)(module, module.exports, require);
+            return module.exports;
+        } catch (error) {
+            const match = /(\w+) is not defined/.exec(error.message);
+            if (!match) throw error;
+            global[match[1]] = stub(match[1]);
+        }
+    }
+}
+
+const [plotlyPath, casesPath] = process.argv.slice(2);
+const Plotly = loadPlotly(plotlyPath);
+process.on('unhandledRejection', () => {});
+const cases = JSON.parse(fs.readFileSync(casesPath, 'utf8'));
+
+for (const [name, entry] of Object.entries(cases.figures)) {
+    // the graph div is a stub, internal properties (_fullLayout, ...) start undefined
+    const gd = stub('gd', (key) => typeof key !== 'string' || key.startsWith('_') ||
+        ['data', 'layout', 'calcdata', 'empty'].includes(key));
+    const {log, error} = console;
+    console.log = console.error = () => {};
+    try {
+        Plotly.newPlot(gd, structuredClone(entry.figure.data), structuredClone(entry.figure.layout || {}));
+    } catch (e) {
+        // drawing fails on the stubs, the ranges are already computed
+    }
+    Object.assign(console, {log, error});
+    entry.range = {x: gd._fullLayout.xaxis.range, y: gd._fullLayout.yaxis.range};
+}
+cases.plotlyjs_version = Plotly.version;
+fs.writeFileSync(casesPath, JSON.stringify(cases, null, 1) + '\n');
+console.log(`${Object.keys(cases.figures).length} ranges computed with plotly.js ${Plotly.version}`);
@@ -0,0 +1,44 @@
+from annotation_io import dump_shapes_binary, is_binary, load_annotations, load_shapes
+from base64 import b64encode
+import json
+import pytest
+
+RECT = {'type': 'rect', 'x0': 1.5, 'y0': 2, 'x1': 30, 'y1': 40, 'line': {'color': '#E2F714', 'width': 2}}
+PATH = {'type': 'path', 'path': 'M1,2L3,4Z', 'name': 'true, false', 'line': {'color': 'red', 'width': 1}}
+
+
+def test_json_roundtrip_and_empty_store():
+    shapes = [RECT, PATH, dict(RECT, x0=None)]
+    assert load_annotations(json.dumps(shapes).encode()) == shapes
+    # exported empty dcc.Store
+    assert load_shapes('{}') == {}
+
+
+def test_binary_roundtrip():
+    shapes = [RECT, PATH, dict(RECT, name='a')]
+    data = dump_shapes_binary(shapes)
+    assert is_binary(data)
+    assert load_annotations(data) == shapes
+
+
+@pytest.mark.parametrize('value', ['10', '2024-01-01', True, [1], {'a': 1}])
+def test_non_numeric_coordinates_are_rejected(value):
+    shapes = [RECT, dict(RECT, y1=value)]
+    with pytest.raises(ValueError, match='invalid shape 1: coordinate y1'):
+        load_shapes(json.dumps(shapes))
+    with pytest.raises(ValueError, match='coordinate y1'):
+        dump_shapes_binary(shapes)
+
+
+@pytest.mark.parametrize('text', ['[1, 2]', '[{"type": "ellipse"}]', '"rect"', '[{"type": "rect"}', b'\xff\xfe'])
+def test_invalid_files_raise_value_error(text):
+    with pytest.raises(ValueError):
+        load_annotations(text)
+
+
+def test_upload_shows_validation_error(load_app, call):
+    app = load_app('plotlyDash_upload_store')
+    content = 'data:text/plain;base64,' + b64encode(json.dumps([dict(RECT, x0='2024-01-01')]).encode()).decode()
+    store, _, status = call(app.store_in, 'upload-data.contents', None, None, content, None, [], [], 'session')
+    assert store is app.no_update
+    assert status.startswith('upload failed: invalid shape 0')
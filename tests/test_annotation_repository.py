@@ -0,0 +1,97 @@
+from annotation_repository import AnnotationRepository, shape_bounds
+from concurrent.futures import ThreadPoolExecutor
+import multiprocessing
+import pytest
+import sys
+
+RECT = {'type': 'rect', 'x0': 30, 'y0': 50, 'x1': 10, 'y1': 20}
+PATH = {'type': 'path', 'path': 'M5,6L40,8L20,60Z'}
+
+
+@pytest.fixture
+def repository(tmp_path):
+    return AnnotationRepository(str(tmp_path / 'db' / 'annotations.sqlite'), batch_size=7)
+
+
+def test_shape_bounds():
+    assert shape_bounds(RECT) == (10, 20, 30, 50)
+    assert shape_bounds(PATH) == (5, 6, 40, 60)
+    assert shape_bounds({'type': 'rect'}) == (None, None, None, None)
+
+
+def test_save_replaces_and_keeps_order(repository):
+    shapes = [dict(RECT, x0=i) for i in range(20)]
+    assert repository.save_shapes('a', 'img', shapes, source='bridge.jpg') == 20
+    assert repository.load_shapes('a', 'img') == shapes
+
+    repository.save_shapes('a', 'img', [PATH])
+    assert repository.load_shapes('a', 'img') == [PATH]
+    assert repository.images('a') == [('img', 'bridge.jpg', 1)]
+
+    # other sessions and images are separate
+    assert repository.load_shapes('b', 'img') == []
+    assert repository.load_shapes('a', 'other') == []
+
+
+def test_query_and_delete(repository):
+    repository.save_shapes('a', 'img', [RECT, PATH])
+    repository.save_shapes('a', 'other', [RECT])
+    assert repository.query('a', 'img', 35, 0, 45, 10) == [PATH]
+    assert repository.query('a', 'img', 0, 0, 100, 100) == [RECT, PATH]
+
+    repository.delete('a', 'img')
+    assert repository.load_shapes('a', 'img') == []
+    assert repository.load_shapes('a', 'other') == [RECT]
+    repository.delete('a')
+    assert repository.images('a') == []
+    assert repository.load_shapes('a', 'other') == []
+
+
+def test_sessions_survive_a_new_repository(repository):
+    # i.e. a restart of the app, the session id is kept by the browser
+    repository.save_shapes('a', 'img', [RECT])
+    assert AnnotationRepository(repository.path).load_shapes('a', 'img') == [RECT]
+
+
+def test_concurrent_writers(repository):
+    def save(i):
+        return repository.save_shapes(f'session_{i}', 'img', [dict(RECT, x0=i)] * 50)
+
+    with ThreadPoolExecutor(8) as pool:
+        assert list(pool.map(save, range(16))) == [50] * 16
+    assert all(repository.load_shapes(f'session_{i}', 'img')[0]['x0'] == i for i in range(16))
+
+
+def test_connections_are_opened_lazily(repository):
+    # creating the repository (i.e. at import) keeps no connection open
+    assert getattr(repository._local, 'connection', None) is None
+    repository.save_shapes('a', 'img', [RECT])
+    assert repository._connection() is repository._local.connection
+
+
+def save_in_worker(repository, inherited_id, result):
+    connection = repository._connection()
+    repository.save_shapes('worker', 'img', [PATH])
+    result.put(id(connection) != inherited_id)
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='fork is not available')
+def test_forked_worker_opens_its_own_connection(repository):
+    # the parent uses the repository before the fork, like a preloading server
+    repository.save_shapes('a', 'img', [RECT])
+    context = multiprocessing.get_context('fork')
+    result = context.Queue()
+    worker = context.Process(target=save_in_worker, args=(repository, id(repository._connection()), result))
+    worker.start()
+    worker.join(30)
+    assert worker.exitcode == 0
+    assert result.get(timeout=5)
+    assert repository.load_shapes('worker', 'img') == [PATH]
+    assert repository.load_shapes('a', 'img') == [RECT]
+
+
+def test_session_id_is_kept_by_the_browser(load_app):
+    app = load_app('plotlyDash_upload_store')
+    session = app.serve_layout().children[-1]
+    assert session.id == 'session'
+    assert session.storage_type == 'local'
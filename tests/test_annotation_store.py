@@ -0,0 +1,251 @@
+from annotation_store import AnnotationStore, MAX_NAME_UPDATES, points_in_polygon
+from shape_utils import update_shapes
+import numpy as np
+import pytest
+
+RECT = {'type': 'rect', 'x0': 1, 'y0': 2, 'x1': 30, 'y1': 40, 'line': {'color': '#E2F714', 'width': 2}}
+
+
+def random_shapes(rng, count, extent=1000):
+    shapes = []
+    for i in range(count):
+        x0, y0 = rng.uniform(-extent / 2, extent, 2).tolist()
+        # a few shapes span many grid cells and end up in the overflow set
+        size = 2000 if i % 50 == 0 else 60
+        x1, y1 = (x0 + rng.uniform(-size, size), y0 + rng.uniform(-size, size))
+        kind = ['rect', 'circle', 'line'][i % 3]
+        shapes.append({'type': kind, 'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1, 'name': f'shape_{i % 40}',
+                       'line': {'color': ['red', 'blue'][i % 2]}})
+    return shapes
+
+
+def brute_bounds(shapes):
+    return np.array([[min(s['x0'], s['x1']), min(s['y0'], s['y1']), max(s['x0'], s['x1']), max(s['y0'], s['y1'])]
+                     for s in shapes])
+
+
+def brute_query(shapes, x0, y0, x1, y1, contained=False):
+    b = brute_bounds(shapes)
+    if contained:
+        mask = (b[:, 0] >= x0) & (b[:, 2] <= x1) & (b[:, 1] >= y0) & (b[:, 3] <= y1)
+    else:
+        mask = (b[:, 0] <= x1) & (b[:, 2] >= x0) & (b[:, 1] <= y1) & (b[:, 3] >= y0)
+    return np.flatnonzero(mask)
+
+
+def brute_hit(shapes, x, y):
+    hits = []
+    for i, (shape, (x_min, y_min, x_max, y_max)) in enumerate(zip(shapes, brute_bounds(shapes))):
+        if not (x_min <= x <= x_max and y_min <= y <= y_max):
+            continue
+        if shape['type'] == 'circle':
+            rx, ry = max((x_max - x_min) / 2, 1e-12), max((y_max - y_min) / 2, 1e-12)
+            if ((x - (x_min + x_max) / 2) / rx) ** 2 + ((y - (y_min + y_max) / 2) / ry) ** 2 > 1:
+                continue
+        hits.append(i)
+    return hits
+
+
+@pytest.fixture
+def shapes():
+    return random_shapes(np.random.default_rng(0), 500)
+
+
+def test_shapes_round_trip(shapes):
+    path = {'type': 'path', 'path': 'M10,20L30.5,40Z', 'fillcolor': 'red'}
+    store = AnnotationStore(shapes + [path])
+    assert store.to_shapes() == shapes + [path]
+    # identical styles are stored once
+    assert len(store.styles) == 3
+    assert store.bounds[len(shapes)].tolist() == [10, 20, 30.5, 40]
+
+
+def test_query_and_hit_test_match_brute_force(shapes):
+    store = AnnotationStore(shapes, cell_size=50)
+    # the shapes spanning many cells are not in the grid
+    assert len(store._large) > 0
+    assert not any(store._large & ids for ids in store._grid.values())
+
+    rng = np.random.default_rng(1)
+    for _ in range(200):
+        x0, y0 = rng.uniform(-600, 1100, 2)
+        x1, y1 = x0 + rng.uniform(0, 300), y0 + rng.uniform(0, 300)
+        for contained in (False, True):
+            expected = brute_query(shapes, x0, y0, x1, y1, contained)
+            np.testing.assert_array_equal(store.query(x0, y0, x1, y1, contained), expected)
+            # the corners may be given in any order
+            np.testing.assert_array_equal(store.query(x1, y1, x0, y0, contained), expected)
+        x, y = rng.uniform(-600, 1100, 2)
+        assert store.hit_test(x, y).tolist() == brute_hit(shapes, x, y)
+
+    # queries covering more cells than MAX_CELLS_PER_QUERY scan the columns
+    np.testing.assert_array_equal(store.query(-5000, -5000, 5000, 5000), np.arange(len(shapes)))
+
+
+def test_hit_test_uses_the_ellipse_of_circles():
+    store = AnnotationStore([dict(RECT, type='circle', x0=0, y0=0, x1=10, y1=10), dict(RECT, x0=0, y0=0, x1=10, y1=10)])
+    assert store.hit_test(5, 5).tolist() == [0, 1]
+    assert store.hit_test(0.5, 0.5).tolist() == [1]
+
+
+def test_remove_matches_brute_force(shapes):
+    store = AnnotationStore(shapes)
+    rng = np.random.default_rng(2)
+    removed = rng.choice(len(shapes), 200, replace=False)
+    store.remove(removed)
+    # removing twice does nothing
+    store.remove(removed[:10])
+    kept = np.setdiff1d(np.arange(len(shapes)), removed)
+    remaining = [shapes[i] for i in kept]
+
+    assert len(store) == len(kept)
+    np.testing.assert_array_equal(store.ids(), kept)
+    assert store.to_shapes() == remaining
+    np.testing.assert_array_equal(store.positions(kept[[0, 5, -1]]), [0, 5, len(kept) - 1])
+    for _ in range(100):
+        x0, y0 = rng.uniform(-600, 1100, 2)
+        x1, y1 = x0 + rng.uniform(0, 300), y0 + rng.uniform(0, 300)
+        np.testing.assert_array_equal(store.query(x0, y0, x1, y1), kept[brute_query(remaining, x0, y0, x1, y1)])
+        x, y = rng.uniform(-600, 1100, 2)
+        assert store.hit_test(x, y).tolist() == kept[brute_hit(remaining, x, y)].tolist()
+
+    # names only refer to the remaining shapes
+    for name in store.sorted_names():
+        np.testing.assert_array_equal(
+            store.ids_by_name(name), [i for i in kept if shapes[i]['name'] == name])
+    assert store.sorted_names() == sorted({shape['name'] for shape in remaining})
+
+
+@pytest.mark.parametrize('changes', [3, MAX_NAME_UPDATES + 10])
+def test_sorted_names_follow_the_changes(changes):
+    names = [f'shape_{i}' for i in range(200)]
+    store = AnnotationStore([dict(RECT, name=name) for name in names])
+    assert store.sorted_names() == sorted(names)
+    # few changes update the sorted names by bisection, many rebuild them
+    for i in range(changes):
+        store.set_property(i, 'name', f'renamed_{i}')
+        names[i] = f'renamed_{i}'
+    store.remove([150])
+    del names[150]
+    store.add(dict(RECT, name='shape_0'))
+    names.append('shape_0')
+    assert store.sorted_names() == sorted(names)
+    assert store.find_names('shape_0') == ['shape_0']
+    assert store.ids_by_name('shape_0').tolist() == [200]
+
+
+def test_find_names_modes():
+    names = ['a', 'ab', 'abc', 'b', 'b*', 'shape_1', 'shape_10', 'shape_2', 'shape_x1']
+    store = AnnotationStore([dict(RECT, name=name) for name in names])
+    assert store.find_names('shape_1', 'exact') == ['shape_1']
+    assert store.find_names('shape_3', 'exact') == []
+    assert store.find_names('ab', 'prefix') == ['ab', 'abc']
+    assert store.find_names('', 'prefix') == names
+    assert store.find_names('shape_1*', 'glob') == ['shape_1', 'shape_10']
+    assert store.find_names('shape_?', 'glob') == ['shape_1', 'shape_2']
+    assert store.find_names('*1', 'glob') == ['shape_1', 'shape_x1']
+    assert store.find_names('shape_[2x]*', 'glob') == ['shape_2', 'shape_x1']
+    assert store.find_names('^a.$', 'regex') == ['ab']
+    with pytest.raises(ValueError):
+        store.find_names('a', 'fuzzy')
+
+
+def test_set_property_moves_the_shape_in_the_grid():
+    store = AnnotationStore([dict(RECT), dict(RECT, x0=500, x1=520)], cell_size=50)
+    store.set_property(0, 'x0', 900)
+    store.set_property(0, 'x1', 950)
+    assert store.query(0, 0, 40, 40).tolist() == []
+    assert store.query(890, 0, 960, 40).tolist() == [0]
+    assert store.get(0)['x0'] == 900
+
+    # a shape growing over many cells moves to the overflow set and back
+    store.set_property(1, 'x1', 10_000)
+    assert 1 in store._large
+    assert store.hit_test(9000, 20).tolist() == [1]
+    store.set_property(1, 'x1', 520)
+    assert 1 not in store._large
+    assert store.hit_test(9000, 20).tolist() == []
+
+    store.set_property(1, 'line.color', 'red')
+    store.set_property(1, 'line.dash', 'dot')
+    assert store.get(1)['line'] == {'color': 'red', 'width': 2, 'dash': 'dot'}
+    # the style of the other shape is not changed
+    assert store.get(0)['line'] == RECT['line']
+
+
+def test_update_style_changes_only_the_given_shapes(shapes):
+    store = AnnotationStore(shapes)
+    ids = np.arange(0, len(shapes), 3)
+    store.update_style(ids, opacity=0.5, fillcolor='red')
+    for i, shape in enumerate(store.to_shapes()):
+        expected = dict(shapes[i], opacity=0.5, fillcolor='red') if i % 3 == 0 else shapes[i]
+        assert shape == expected
+    # two colors, with and without the new properties
+    assert len({repr(store.styles[i]) for i in store.style_ids[:len(shapes)]}) == 4
+
+
+def test_apply_relayout_follows_update_shapes(shapes):
+    store = AnnotationStore(shapes[:20])
+    current = shapes[:20]
+    store.remove([3])
+    del current[3]
+    for relayout in ({'shapes[0].x0': 5, 'shapes[0].line.color': 'green'},
+                     {'shapes[3].x1': 777, 'shapes[3].name': 'moved'},
+                     {'shapes': current[:5] + [RECT]}):
+        assert store.apply_relayout(relayout)
+        current = update_shapes(current, relayout)
+        assert store.to_shapes() == current
+    assert store.sorted_names() == sorted({shape.get('name') for shape in current} - {None})
+    assert not store.apply_relayout({'xaxis.range[0]': 1})
+    assert not store.apply_relayout(None)
+
+
+def test_points_in_polygon():
+    xs, ys = np.array([0, 10, 10, 5, 0], dtype=float), np.array([0, 0, 10, 5, 10], dtype=float)
+    inside = points_in_polygon(np.array([1, 5, 9, 5, 20]), np.array([1, 8, 8, 2, 5]), xs, ys)
+    assert inside.tolist() == [True, False, True, True, False]
+
+
+# U shaped lasso, the notch is x 10..20, y 10..30
+U_XS, U_YS = [0, 30, 30, 20, 20, 10, 10, 0], [0, 0, 30, 30, 10, 10, 30, 30]
+
+
+@pytest.mark.parametrize('shape, intersecting, contained', [
+    (dict(RECT, x0=2, y0=2, x1=28, y1=8), True, True),
+    # all corners lie inside the lasso, but the rectangle crosses the notch
+    (dict(RECT, x0=2, y0=2, x1=28, y1=25), True, False),
+    (dict(RECT, x0=12, y0=12, x1=18, y1=28), False, False),
+    (dict(RECT, type='line', x0=5, y0=5, x1=25, y1=5), True, True),
+    (dict(RECT, type='line', x0=5, y0=25, x1=25, y1=25), True, False),
+    (dict(RECT, type='line', x0=12, y0=20, x1=18, y1=25), False, False),
+    # the line crosses the arm without an end point inside
+    (dict(RECT, type='line', x0=-5, y0=20, x1=15, y1=20), True, False),
+    (dict(RECT, type='circle', x0=3, y0=3, x1=7, y1=7), True, True),
+    (dict(RECT, type='circle', x0=11, y0=12, x1=19, y1=28), False, False),
+    (dict(RECT, type='circle', x0=8, y0=12, x1=22, y1=28), True, False),
+    # the lasso lies inside the circle
+    (dict(RECT, type='circle', x0=-100, y0=-100, x1=130, y1=130), True, False),
+])
+def test_query_polygon_tests_the_outline(shape, intersecting, contained):
+    store = AnnotationStore([dict(RECT, x0=100, x1=120), shape])
+    assert store.query_polygon(U_XS, U_YS).tolist() == ([1] if intersecting else [])
+    assert store.query_polygon(U_XS, U_YS, contained=True).tolist() == ([1] if contained else [])
+
+
+def test_query_polygon_of_many_shapes_matches_single_queries(shapes):
+    store = AnnotationStore(shapes)
+    xs, ys = np.array(U_XS) * 20 - 100, np.array(U_YS) * 20 - 100
+    for contained in (False, True):
+        expected = [i for i, shape in enumerate(shapes)
+                    if len(AnnotationStore([shape]).query_polygon(xs, ys, contained))]
+        assert store.query_polygon(xs, ys, contained).tolist() == expected
+    assert 0 < len(store.query_polygon(xs, ys, True)) < len(store.query_polygon(xs, ys)) < len(shapes)
+
+
+def test_query_polygon_does_not_select_by_the_bounding_box():
+    # the corner (1, 1) of the bounding boxes lies inside the triangle, the shapes do not reach it
+    store = AnnotationStore([dict(RECT, type='circle', x0=1, y0=1, x1=9, y1=9),
+                             dict(RECT, type='line', x0=1, y0=10, x1=10, y1=1)])
+    assert store.query_polygon([0, 4, 0], [0, 0, 4]).tolist() == []
+    assert store.query_polygon([0, 8, 0], [0, 0, 8]).tolist() == [0]
+    assert store.query_polygon([0, 12, 0], [0, 0, 12]).tolist() == [0, 1]
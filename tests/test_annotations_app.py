@@ -0,0 +1,38 @@
+import plotly.io as pio
+import pytest
+
+
+@pytest.fixture(scope='module')
+def app(load_app):
+    return load_app('plotlyDash_annotations')
+
+
+def response_size(patch):
+    return len(pio.json.to_json_plotly(patch.to_plotly_json()))
+
+
+def click(app, call, session_id, x, y):
+    return call(app.get_click, 'graph.clickData', {'points': [{'x': x, 'y': y}]}, session_id)
+
+
+def test_click_payload_does_not_grow_with_the_shapes(app, call):
+    sizes = []
+    for i in range(app.threshold):
+        patch, info = click(app, call, 'clicks', i % 160, i % 90)
+        sizes.append(response_size(patch))
+    assert info.startswith(f'{app.threshold} shapes')
+    assert max(sizes) - min(sizes) <= 8
+    assert max(sizes) < 600
+
+    # above the threshold the points trace is extended instead of the shapes
+    click(app, call, 'clicks', 1, 1)
+    patch, _ = click(app, call, 'clicks', 2, 2)
+    assert response_size(patch) < 300
+    assert len(app.get_history('clicks').current) == app.threshold + 2
+
+
+def test_click_is_a_step_of_the_history(app, call):
+    click(app, call, 'undo', 10, 20)
+    click(app, call, 'undo', 30, 40)
+    figure, info = call(app.undo_redo, 'undo.n_clicks', 1, None, 'undo')
+    assert info == '1 shapes, 1 steps to undo, 1 to redo'
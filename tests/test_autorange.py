@@ -0,0 +1,55 @@
+from autorange import axis_length, figure_ranges, trace_extremes
+import plotly.graph_objects as go
+import numpy as np
+import pytest
+import json
+import os
+
+# figures with the ranges computed by plotly.js, see data/plotlyjs_ranges.js
+with open(os.path.join(os.path.dirname(__file__), 'data', 'autorange_plotlyjs.json')) as f:
+    PLOTLYJS = json.load(f)['figures']
+
+
+@pytest.mark.parametrize('name', sorted(PLOTLYJS))
+def test_ranges_match_plotlyjs(name):
+    ranges = figure_ranges(PLOTLYJS[name]['figure'])
+    for axis in ('x', 'y'):
+        np.testing.assert_allclose(ranges[axis], PLOTLYJS[name]['range'][axis], rtol=1e-9, atol=1e-12)
+
+
+def test_go_figure_with_numpy_arrays():
+    # go.Figure encodes numpy arrays as typed arrays (bdata)
+    fig = go.Figure(go.Scatter(x=np.array([1, 2, 3, 4]), y=np.array([10, 15, 13, 17]), mode='markers'))
+    expected = PLOTLYJS['markers']['range']
+    ranges = figure_ranges(fig)
+    np.testing.assert_allclose(ranges['x'], expected['x'])
+    np.testing.assert_allclose(ranges['y'], expected['y'])
+
+
+def test_fixed_range_and_axis_length():
+    fig = {'data': [{'type': 'scatter', 'x': [0, 1], 'y': [0, 1]}], 'layout': {'xaxis': {'autorange': False, 'range': [3, 4]}}}
+    assert figure_ranges(fig)['x'] == [3, 4]
+    assert axis_length({}, 'x') == 540
+    assert axis_length({'height': 500, 'margin': {'t': 20, 'b': 0}, 'yaxis': {'domain': [0, 0.5]}}, 'y') == 240
+    with pytest.raises(ValueError):
+        trace_extremes({'type': 'pie', 'values': [1, 2]}, 'x')
+    # image traces are not supported, their reversed y axis is not guessed
+    with pytest.raises(ValueError):
+        figure_ranges({'data': [{'type': 'image', 'z': [[[0, 0, 0]]]}], 'layout': {}})
+
+
+def live_full_figure(fig):
+    try:
+        return fig.full_figure_for_development(warn=False)
+    except Exception as error:
+        # kaleido needs Chrome
+        pytest.skip(f'plotly.js is not available through kaleido: {error}')
+
+
+@pytest.mark.parametrize('name', ['markers', 'bars', 'error_y_data', 'log_both_markers', 'empty_figure'])
+def test_ranges_match_kaleido(name):
+    fig = go.Figure(PLOTLYJS[name]['figure'])
+    full_layout = live_full_figure(fig).layout
+    ranges = figure_ranges(fig)
+    np.testing.assert_allclose(ranges['x'], full_layout.xaxis.range, rtol=1e-9)
+    np.testing.assert_allclose(ranges['y'], full_layout.yaxis.range, rtol=1e-9)
@@ -0,0 +1,50 @@
+from batch_rotate_crop import output_names, process_image, run
+from scipy.ndimage import rotate
+from PIL import Image
+import numpy as np
+import pytest
+import json
+
+LINE = {'type': 'line', 'x0': 0, 'y0': 0, 'x1': 40, 'y1': 10}
+
+
+@pytest.fixture
+def images(tmp_path):
+    pixels = np.random.default_rng(0).integers(0, 255, (60, 80, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(tmp_path / 'a.png')
+    Image.fromarray(pixels[::-1]).save(tmp_path / 'a.bmp')
+    return tmp_path, pixels
+
+
+def test_output_names_are_unique():
+    names = output_names(['a.jpg', 'a.png', 'sub/a.jpg', 'a_jpg'])
+    assert names == {'a.jpg': 'a_jpg', 'a.png': 'a_png', 'sub/a.jpg': 'sub_a_jpg', 'a_jpg': 'a_jpg_2'}
+
+
+def test_crop_is_clipped_at_the_image_borders(images, tmp_path):
+    directory, pixels = images
+    rect = {'type': 'rect', 'x0': -20.5, 'y0': 50, 'x1': 30, 'y1': -10}
+    written = process_image(str(directory / 'a.png'), [rect], str(tmp_path))
+    np.testing.assert_array_equal(np.asarray(Image.open(written[0])), pixels[:50, :30])
+
+    outside = {'type': 'rect', 'x0': 100, 'y0': 10, 'x1': 120, 'y1': 20}
+    with pytest.raises(ValueError):
+        process_image(str(directory / 'a.png'), [outside], str(tmp_path))
+
+
+def test_run_counts_failures_and_keeps_names_apart(images, tmp_path):
+    directory, pixels = images
+    manifest = {
+        'a.png': [LINE],
+        'a.bmp': {'shapes': [LINE], 'alignment': 'vertical'},
+        'missing.png': [LINE],
+    }
+    manifest_path = tmp_path / 'manifest.json'
+    manifest_path.write_text(json.dumps(manifest))
+    output_dir = tmp_path / 'out'
+
+    assert run(str(directory), str(manifest_path), str(output_dir), workers=2, order=1) == (2, 1)
+    assert sorted(path.name for path in output_dir.iterdir()) == ['a_bmp_rotated.png', 'a_png_rotated.png']
+    np.testing.assert_array_equal(
+        np.asarray(Image.open(output_dir / 'a_png_rotated.png')), rotate(pixels, 14.036243467926479, order=1)
+    )
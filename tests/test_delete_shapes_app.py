@@ -0,0 +1,136 @@
+import pytest
+
+
+@pytest.fixture(scope='module')
+def app(load_app):
+    return load_app('plotlyDash_delete_shapes_by_name')
+
+
+def deleted_positions(patch):
+    return [operation['location'][-1] for operation in patch.to_plotly_json()['operations']
+            if operation['operation'] == 'Delete']
+
+
+def test_every_page_load_creates_its_store(app):
+    layout = app.serve_layout()
+    session = [child for child in layout.children if getattr(child, 'id', None) == 'session'][0]
+    assert len(app.get_store(session.data)) == 5
+
+
+def test_delete_by_name_patches_the_positions(app, call):
+    app.new_store('delete')
+    patch, version = call(app.get_click, 'delete.n_clicks', 1, 'shape_[24]', 'regex', 'delete', 0)
+    assert deleted_positions(patch) == [3, 1]
+    assert version == 1
+    assert app.get_store('delete').sorted_names() == ['shape_1', 'shape_3', 'shape_5']
+
+
+def test_unknown_session_is_not_rebuilt(app, call):
+    # i.e. after a restart of the server, the browser still shows the edited figure
+    figure, version = call(app.get_click, 'delete.n_clicks', 1, 'shape_1', 'exact', 'expired', 3)
+    assert figure is app.no_update
+    assert version == 4
+    selection = {'range': {'x': [0, 11], 'y': [0, 11]}}
+    figure, _ = call(app.delete_selection, 'delete_selection.n_clicks', 1, selection, 'intersecting', 'expired', 3)
+    assert figure is app.no_update
+    assert app.get_store('expired') is None
+
+    names, pages, page = call(app.show_names, 'names_version.data', 4, None, 'exact', 1, 'expired')
+    assert names == app.SESSION_EXPIRED
+
+
+@pytest.fixture
+def selection_session(app):
+    from annotation_store import AnnotationStore
+    store = AnnotationStore([
+        {'type': 'rect', 'x0': 1, 'y0': 1, 'x1': 4, 'y1': 4, 'name': 'inside'},
+        {'type': 'rect', 'x0': 8, 'y0': 8, 'x1': 14, 'y1': 14, 'name': 'crossing'},
+        {'type': 'line', 'x0': -5, 'y0': 5, 'x1': 5, 'y1': -5, 'name': 'line'},
+        {'type': 'circle', 'x0': 9, 'y0': 9, 'x1': 19, 'y1': 19, 'name': 'circle'},
+        {'type': 'rect', 'x0': 30, 'y0': 30, 'x1': 40, 'y1': 40, 'name': 'outside'},
+    ])
+    app.stores.put('selection', store, size=store.nbytes)
+    return store
+
+
+@pytest.mark.parametrize('mode, positions, remaining', [
+    # the box corner (10, 10) lies in the bounding box of the circle, not in the circle
+    ('intersecting', [2, 1, 0], ['circle', 'outside']),
+    ('contained', [0], ['circle', 'crossing', 'line', 'outside']),
+])
+def test_delete_box_selection(app, call, selection_session, mode, positions, remaining):
+    selection = {'range': {'x': [0, 10], 'y': [10, 0]}}
+    patch, version = call(app.delete_selection, 'delete_selection.n_clicks', 1, selection, mode, 'selection', 0)
+    assert deleted_positions(patch) == positions
+    assert version == 1
+    assert selection_session.sorted_names() == remaining
+
+
+@pytest.mark.parametrize('mode, positions, remaining', [
+    ('intersecting', [3, 2, 1, 0], ['outside']),
+    ('contained', [0], ['circle', 'crossing', 'line', 'outside']),
+])
+def test_delete_lasso_selection(app, call, selection_session, mode, positions, remaining):
+    # L shaped lasso around the first rectangle, it touches the line at (0, 0) and reaches into the second
+    # rectangle and the circle
+    selection = {'lassoPoints': {'x': [0, 20, 20, 12, 12, 0], 'y': [0, 0, 20, 20, 5, 5]}}
+    patch, _ = call(app.delete_selection, 'delete_selection.n_clicks', 1, selection, mode, 'selection', 0)
+    assert deleted_positions(patch) == positions
+    assert selection_session.sorted_names() == remaining
+
+
+def test_empty_selection_changes_nothing(app, call, selection_session):
+    selection = {'range': {'x': [50, 60], 'y': [50, 60]}}
+    with pytest.raises(app.PreventUpdate):
+        call(app.delete_selection, 'delete_selection.n_clicks', 1, selection, 'intersecting', 'selection', 0)
+    assert len(selection_session) == 5
+
+
+@pytest.fixture
+def named_session(app):
+    from annotation_store import AnnotationStore
+    store = AnnotationStore([{'type': 'rect', 'x0': i, 'y0': 0, 'x1': i + 1, 'y1': 1, 'name': f'shape_{i:02d}'}
+                             for i in range(45)])
+    app.stores.put('named', store, size=store.nbytes)
+    return store
+
+
+def test_names_are_paged(app, call, named_session):
+    text, pages, page = call(app.show_names, 'names_version.data', 0, None, 'exact', 1, 'named')
+    assert (pages, page) == (3, 1)
+    assert text == ', '.join(f'shape_{i:02d}' for i in range(app.NAMES_PER_PAGE)) + ' (45 names)'
+    text, _, page = call(app.show_names, 'names_page.active_page', 0, None, 'exact', 3, 'named')
+    assert text == ', '.join(f'shape_{i:02d}' for i in range(40, 45)) + ' (45 names)'
+    assert page == 3
+
+
+@pytest.mark.parametrize('search, mode, expected', [
+    ('shape_1', 'prefix', [f'shape_{i}' for i in range(10, 20)]),
+    ('shape_?5', 'glob', ['shape_05', 'shape_15', 'shape_25', 'shape_35']),
+    ('shape_4*', 'glob', [f'shape_{i}' for i in range(40, 45)]),
+    ('shape_07', 'exact', ['shape_07']),
+    ('[0-3]3$', 'regex', ['shape_03', 'shape_13', 'shape_23', 'shape_33']),
+    # an invalid regular expression matches nothing
+    ('shape_(', 'regex', []),
+])
+def test_search_names(app, call, named_session, search, mode, expected):
+    text, pages, page = call(app.show_names, 'search.value', 0, search, mode, 1, 'named')
+    assert text == f'{", ".join(expected)} ({len(expected)} names)'
+    assert (pages, page) == (1, 1)
+
+
+def test_page_is_clamped_to_the_matching_names(app, call, named_session):
+    # the third page of all names, then a search with fewer names
+    text, pages, page = call(app.show_names, 'search.value', 0, 'shape_', 'prefix', 3, 'named')
+    assert (pages, page) == (3, 3)
+    text, pages, page = call(app.show_names, 'search.value', 0, 'shape_2', 'prefix', 3, 'named')
+    assert (pages, page) == (1, 1)
+    assert text.endswith('(10 names)')
+    # no match still shows one (empty) page
+    text, pages, page = call(app.show_names, 'search.value', 0, 'xyz', 'prefix', None, 'named')
+    assert (text, pages, page) == (' (0 names)', 1, 1)
+
+    # deleting shapes shrinks the number of pages
+    app.delete_patch(named_session, named_session.ids_by_names(named_session.find_names('shape_', 'prefix')[5:]))
+    _, pages, page = call(app.show_names, 'names_version.data', 1, None, 'exact', 3, 'named')
+    assert (pages, page) == (1, 1)
@@ -0,0 +1,116 @@
+from region_stats import RegionStats
+from scipy import ndimage
+from PIL import Image
+import image_assets
+import numpy as np
+import tracemalloc
+import os
+import pytest
+
+MB = 2 ** 20
+
+
+@pytest.fixture
+def tiff(tmp_path, monkeypatch):
+    """
+    fixture writes an uncompressed 3072x2048 RGB tiff (18 MB) and returns its path and pixels
+    """
+    monkeypatch.setattr(image_assets, 'ASSET_DIR', str(tmp_path / 'asset_cache'))
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, (2048, 3072, 3), dtype=np.uint8)
+    path = str(tmp_path / 'large.tif')
+    Image.fromarray(pixels).save(path)
+    return path, pixels
+
+
+def peak_memory(fn, *args, **kwargs):
+    """
+    function returns the result of fn and the peak of the memory allocated meanwhile (numpy included)
+    """
+    tracemalloc.start()
+    try:
+        result = fn(*args, **kwargs)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, peak
+
+
+def test_building_the_tiles_does_not_load_the_raster(tiff):
+    path, pixels = tiff
+    img, peak = peak_memory(image_assets.open_windowed, path)
+    assert peak < pixels.nbytes / 8
+    assert img.shape == pixels.shape
+
+
+def test_crop_reads_only_the_window(tiff):
+    path, pixels = tiff
+    img = image_assets.open_windowed(path)
+    window, peak = peak_memory(img.read, 1000, 1300, 2000, 2400)
+    np.testing.assert_array_equal(window, pixels[1000:1300, 2000:2400])
+    assert peak < 2 * window.nbytes + MB
+
+    # rectangles partly outside of the image are clipped, every step-th pixel for previews
+    np.testing.assert_array_equal(img.read(-50, 100, 3000, 4000), pixels[:100, 3000:])
+    np.testing.assert_array_equal(img.read(3, 2048, 5, 3072, step=7), pixels[3::7, 5::7])
+
+
+def test_rotated_window_reads_only_its_source_region(tiff):
+    path, pixels = tiff
+    img = image_assets.open_windowed(path)
+    window, peak = peak_memory(img.read_rotated, 30, (1000, 1256, 1500, 1756), order=1)
+    assert window.shape == (256, 256, 3)
+    assert peak < 8 * MB < pixels.nbytes / 2
+
+
+def test_rotation_window_by_window(tiff):
+    path, pixels = tiff
+    img = image_assets.open_windowed(path)
+    rotated, peak = peak_memory(img.rotate, 30, order=1, window=256, workers=1)
+
+    # the rotated image itself plus a few windows, scipy would copy the whole source
+    assert peak < rotated.nbytes + 8 * MB
+    np.testing.assert_array_equal(rotated, ndimage.rotate(pixels, 30, order=1))
+
+
+@pytest.mark.parametrize('order', [0, 3])
+def test_rotation_matches_scipy(tiff, order):
+    path, pixels = tiff
+    img = image_assets.open_windowed(path)
+    part = pixels[:300, :400]
+    small = image_assets.WindowedImage(img.tiles, 300, 400)
+    for angle in (-45, 17, 90):
+        expected = ndimage.rotate(part, angle, order=order)
+        result = small.rotate(angle, order=order, window=128)
+        if order == 0:
+            np.testing.assert_array_equal(result, expected)
+        else:
+            # the spline filter only sees the source region of each window
+            assert np.abs(result.astype(int) - expected).max() <= 1
+
+
+def test_region_stats_from_windows_match_the_array(tiff):
+    path, pixels = tiff
+    img = image_assets.open_windowed(path)
+    small = image_assets.WindowedImage(img.tiles, 300, 400)
+    stats = RegionStats.from_windowed(small, strip_rows=77)
+    expected = RegionStats(pixels[:300, :400])
+    np.testing.assert_array_equal(stats.sums, expected.sums)
+    np.testing.assert_array_equal(stats.squares, expected.squares)
+
+
+def test_region_stats_tables_are_memory_mapped_next_to_the_tiles(tiff):
+    path, pixels = tiff
+    img = image_assets.open_windowed(path)
+    stats = RegionStats.from_windowed(img, strip_rows=100)
+    assert isinstance(stats.sums, np.memmap) and isinstance(stats.squares, np.memmap)
+    assert os.path.exists(img.path + '.sat.npy')
+    expected = RegionStats(pixels)
+    np.testing.assert_array_equal(stats.sums, expected.sums)
+    np.testing.assert_array_equal(stats.squares, expected.squares)
+
+    # the second time the tables are only opened
+    mtime = os.path.getmtime(img.path + '.sat.npy')
+    reopened = RegionStats.from_windowed(img)
+    assert os.path.getmtime(img.path + '.sat.npy') == mtime
+    assert reopened.region(10, 50, 20, 70)['sum'].tolist() == expected.region(10, 50, 20, 70)['sum'].tolist()
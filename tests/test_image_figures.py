@@ -0,0 +1,48 @@
+from image_figures import encode_image, encoding_cache, image_figure, to_uint8
+from base64 import b64decode
+from PIL import Image
+import numpy as np
+import pytest
+import io
+
+
+def decode(uri):
+    return np.asarray(Image.open(io.BytesIO(b64decode(uri.split(',', 1)[1]))))
+
+
+def test_to_uint8_scales_and_clips():
+    np.testing.assert_array_equal(to_uint8(np.array([0.0, 0.5, 1.0])), [0, 128, 255])
+    np.testing.assert_array_equal(to_uint8(np.array([-3.0, 100.4, 300.0, np.nan])), [0, 100, 255, 0])
+    np.testing.assert_array_equal(to_uint8(np.array([True, False])), [255, 0])
+    np.testing.assert_array_equal(to_uint8(np.array([-1, 7, 1000], dtype=np.int32)), [0, 7, 255])
+    with pytest.raises(ValueError):
+        to_uint8(np.array(['a']))
+
+
+def test_float_image_in_unit_range_is_not_black():
+    img = np.full((4, 5), 0.5)
+    pixels = decode(encode_image(img).uri)
+    assert pixels.shape == (4, 5)
+    assert (pixels == 128).all()
+
+
+@pytest.mark.parametrize('codec', ['png', 'jpeg', 'webp'])
+def test_codecs_and_cache(codec):
+    encoding_cache.clear()
+    img = np.random.default_rng(0).integers(0, 255, (32, 48, 3), dtype=np.uint8)
+    first = encode_image(img, codec=codec)
+    second = encode_image(img.copy(), codec=codec)
+    assert first.uri.startswith(f'data:image/{codec};base64,')
+    assert not first.cached and second.cached
+    assert first.size == len(first.uri)
+    assert decode(first.uri).shape == (32, 48, 3)
+
+    # png is lossless
+    if codec == 'png':
+        np.testing.assert_array_equal(decode(first.uri), img)
+
+
+def test_image_figure_uses_an_encoded_source():
+    figure = image_figure(np.zeros((3, 4), dtype=np.uint8))
+    assert figure.data[0].type == 'image'
+    assert figure.data[0].source.startswith('data:image/png;base64,')
@@ -0,0 +1,31 @@
+from image_processing import line_angle, rect_bounds, rotation_geometry, rotate_banded
+from scipy import ndimage
+import numpy as np
+import pytest
+
+ANGLES = [-45, 45, 90, -90, 135, 180, 12.3, -74.2, 138.6]
+
+
+@pytest.mark.parametrize('shape', [(250, 251), (97, 300, 3)])
+@pytest.mark.parametrize('order', [0, 1, 3])
+def test_rotate_banded_matches_scipy_exactly(shape, order):
+    img = np.random.default_rng(1).integers(0, 255, shape).astype(np.uint8)
+    for angle in ANGLES:
+        expected = ndimage.rotate(img, angle, order=order)
+        result = rotate_banded(img, angle, order=order, workers=3, band_rows=37)
+        assert result.shape == expected.shape
+        np.testing.assert_array_equal(result, expected, err_msg=f'angle {angle}')
+
+
+def test_rotation_geometry_shape_like_scipy():
+    img = np.zeros((123, 77))
+    for angle in ANGLES:
+        assert rotation_geometry(img.shape, angle)[2] == ndimage.rotate(img, angle).shape
+
+
+def test_line_angle_and_rect_bounds():
+    line = {'x0': 0, 'y0': 0, 'x1': 10, 'y1': 10}
+    assert line_angle(line, 'horizontal') == pytest.approx(45)
+    assert line_angle(line, 'vertical') == pytest.approx(-45)
+    assert line_angle(line, 'horizontal', invert=True) == pytest.approx(-45)
+    assert rect_bounds({'x0': 30.7, 'y0': 70.5, 'x1': 10.2, 'y1': 20.9}) == (20, 70, 10, 30)
@@ -0,0 +1,69 @@
+from image_tiles import TILE_MAX_AGE, TilePyramid, register_tile_route
+from flask import Flask
+from PIL import Image
+import numpy as np
+import pytest
+import io
+
+
+@pytest.fixture(scope='module')
+def pyramid(tmp_path_factory):
+    img = np.random.default_rng(0).integers(0, 255, (300, 1000, 3), dtype=np.uint8)
+    return TilePyramid(img, cache_dir=str(tmp_path_factory.mktemp('tiles')), tile_size=128)
+
+
+def test_levels_and_tiles(pyramid):
+    # 1000 px -> 500 -> 250 -> 125 fits into one tile
+    assert pyramid.levels == 4
+    assert Image.open(pyramid.tile_path(0, 2, 7)).size == (1000 - 7 * 128, 300 - 2 * 128)
+    assert Image.open(pyramid.tile_path(3, 0, 0)).size == (125, 37)
+
+    # a second pyramid of the same content is not built again
+    again = TilePyramid(np.zeros((1, 1, 3), dtype=np.uint8), cache_dir=pyramid.directory)
+    assert again.levels == 1
+
+
+@pytest.mark.parametrize('x_range, plot_width, level', [
+    ([0, 500], 1000, 0), ([0, 1000], 1000, 0), ([0, 1000], 500, 1), ([1000, 0], 250, 2),
+    ([0, 1000], 999, 0), ([0, 1000], 10, 3),
+])
+def test_level_for(pyramid, x_range, plot_width, level):
+    assert pyramid.level_for(x_range, plot_width) == level
+
+
+def test_layout_images_cover_the_visible_tiles(pyramid):
+    level, images = pyramid.layout_images([100, 300], [270, 10], 400)
+    assert level == 0
+    assert [(image['x'], image['y']) for image in images] == [(0, 0), (128, 0), (256, 0), (0, 128), (128, 128),
+                                                              (256, 128), (0, 256), (128, 256), (256, 256)]
+    assert images[-1]['sizey'] == 300 - 256
+    assert images[0]['source'] == f'/tiles/{pyramid.image_id}/0/0/0.png'
+
+    # the complete image at a coarse level, the last tile is clipped at the image border
+    level, images = pyramid.layout_images([-50, 1100], [-10, 400], 300)
+    assert level == 1
+    assert len(images) == 2 * 4
+    assert images[-1]['sizex'] == 1000 - 3 * 256
+
+    # outside of the image
+    assert pyramid.layout_images([2000, 2500], [0, 100], 500)[1] == []
+
+
+def test_tile_route_caching(pyramid):
+    server = Flask(__name__)
+    register_tile_route(server, [pyramid])
+    client = server.test_client()
+
+    response = client.get(f'/tiles/{pyramid.image_id}/1/0/1.png')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/png'
+    assert f'max-age={TILE_MAX_AGE}' in response.headers['Cache-Control']
+    assert Image.open(io.BytesIO(response.data)).size == (128, 128)
+    etag = response.headers['ETag']
+
+    revalidated = client.get(f'/tiles/{pyramid.image_id}/1/0/1.png', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+    assert client.get(f'/tiles/{pyramid.image_id}/9/0/0.png').status_code == 404
+    assert client.get('/tiles/unknown/0/0/0.png').status_code == 404
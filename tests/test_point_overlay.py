@@ -0,0 +1,88 @@
+from point_overlay import density_trace, is_header, load_points, render_patch, selected_indices, shape_centers
+from point_overlay import uploaded_points_trace
+import numpy as np
+import pytest
+import io
+
+
+def circles(n):
+    return [{'type': 'circle', 'x0': i - 2.5, 'y0': i % 7 - 2.5, 'x1': i + 2.5, 'y1': i % 7 + 2.5} for i in range(n)]
+
+
+def assigned(patch):
+    return {tuple(op['location']): op['params']['value'] for op in patch.to_plotly_json()['operations']}
+
+
+def test_shape_centers():
+    xs, ys = shape_centers(circles(3))
+    np.testing.assert_array_equal(xs, [0, 1, 2])
+    np.testing.assert_array_equal(ys, [0, 1, 2])
+    assert shape_centers([])[0].shape == (0,)
+
+
+def test_render_patch_switches_to_the_scatter_trace():
+    below = assigned(render_patch(circles(5), 2, threshold=5))
+    assert len(below[('layout', 'shapes')]) == 5
+    assert below[('data', 2)]['x'] == []
+
+    above = assigned(render_patch(circles(6), 2, threshold=5))
+    assert above[('layout', 'shapes')] == []
+    assert above[('data', 2)]['type'] == 'scattergl'
+    assert above[('data', 2)]['x'] == [0, 1, 2, 3, 4, 5]
+    assert above[('layout', 'selections')] == []
+
+
+def test_selected_indices_box_and_lasso():
+    xs, ys = np.array([0.0, 5.0, 10.0, 5.0]), np.array([0.0, 5.0, 0.0, 20.0])
+    box = {'range': {'x': [12, 4], 'y': [-1, 6]}}
+    np.testing.assert_array_equal(selected_indices(xs, ys, box), [1, 2])
+
+    lasso = {'lassoPoints': {'x': [-1, 11, 5], 'y': [-1, -1, 10]}}
+    np.testing.assert_array_equal(selected_indices(xs, ys, lasso, chunk_size=1), [0, 1, 2])
+    assert selected_indices(xs, ys, None) is None
+    assert selected_indices(xs, ys, {'points': []}) is None
+
+
+@pytest.mark.parametrize('line, header', [
+    ('x,y', True), ('"x","y"', True), ('lon,lat,label', True),
+    ('nan,1', False), ('inf,-Infinity', False), ('1e5,2E-3\r', False), ('1,2,label', False),
+])
+def test_is_header(line, header):
+    assert is_header(line) == header
+
+
+def test_load_points_csv_keeps_rows_with_nan_and_inf():
+    xs, ys = load_points(b'nan,1\n2,inf\n3,4\n', 'points.csv')
+    np.testing.assert_array_equal(xs, [np.nan, 2, 3])
+    np.testing.assert_array_equal(ys, [1, np.inf, 4])
+
+    xs, ys = load_points(b'x,y,label\r\n1.5,2,a\r\n3,4e1,b\r\n', 'POINTS.CSV')
+    np.testing.assert_array_equal(xs, [1.5, 3])
+    np.testing.assert_array_equal(ys, [2, 40])
+
+
+def test_load_points_npy_and_errors():
+    buffer = io.BytesIO()
+    np.save(buffer, np.arange(6.0).reshape(3, 2))
+    xs, ys = load_points(buffer.getvalue(), 'points.npy')
+    np.testing.assert_array_equal(xs, [0, 2, 4])
+
+    buffer = io.BytesIO()
+    np.save(buffer, np.arange(6.0))
+    with pytest.raises(ValueError):
+        load_points(buffer.getvalue(), 'points.npy')
+    with pytest.raises(ValueError):
+        load_points(b'1,2', 'points.txt')
+    with pytest.raises(ValueError):
+        load_points(b'1,2\n3,abc\n', 'points.csv')
+
+
+def test_density_fallback():
+    xs, ys = np.array([0.0, 0.4, 9.0, 100.0]), np.array([0.0, 0.2, 9.0, 1.0])
+    trace = density_trace(xs, ys, 10, 10, max_bins=5)
+    assert trace['z'].shape == (5, 5)
+    assert trace['z'][0, 0] == 2 and trace['z'][4, 4] == 1
+    assert np.nansum(trace['z']) == 3
+
+    assert uploaded_points_trace(xs, ys, 10, 10, max_points=3)['type'] == 'heatmap'
+    assert uploaded_points_trace(xs, ys, 10, 10, max_points=4)['type'] == 'scattergl'
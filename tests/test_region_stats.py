@@ -0,0 +1,47 @@
+from region_stats import RegionStats, describe, summed_area_table
+import numpy as np
+import pytest
+
+
+def test_summed_area_table():
+    arr = np.arange(12).reshape(3, 4)
+    table = summed_area_table(arr)
+    assert table.shape == (4, 5)
+    assert table[3, 4] == arr.sum()
+    assert table[2, 3] == arr[:2, :3].sum()
+
+
+@pytest.mark.parametrize('shape', [(60, 80), (60, 80, 3)])
+def test_regions_match_numpy(shape):
+    rng = np.random.default_rng(0)
+    img = rng.integers(0, 255, shape, dtype=np.uint8)
+    stats = RegionStats(img)
+    for _ in range(50):
+        y0, y1 = sorted(rng.integers(0, 61, 2))
+        x0, x1 = sorted(rng.integers(0, 81, 2))
+        result = stats.region(y0, y1, x0, x1)
+        region = img[y0:y1, x0:x1].reshape(-1, *shape[2:]).astype(np.float64)
+        if not region.size:
+            assert result is None
+            continue
+        assert result['count'] == (y1 - y0) * (x1 - x0)
+        np.testing.assert_allclose(result['sum'], region.sum(axis=0))
+        np.testing.assert_allclose(result['mean'], region.mean(axis=0))
+        np.testing.assert_allclose(result['var'], region.var(axis=0), atol=1e-6)
+
+
+def test_window_and_shape_are_clipped():
+    stats = RegionStats(np.ones((10, 20)))
+    assert stats.window(5, 5, 2)['count'] == 25
+    assert stats.window(0, 0, 2)['count'] == 9
+    assert stats.window(19.4, 9.4, 1)['count'] == 4
+    assert stats.shape_stats({'x0': -5, 'y0': -5, 'x1': 4, 'y1': 3})['count'] == 12
+    assert stats.region(12, 15, 0, 5) is None
+
+
+def test_describe_names_the_channels():
+    gray = describe(RegionStats(np.ones((4, 4))).region(0, 2, 0, 2))
+    assert gray.splitlines() == ['pixels: 4', 'gray: mean 1.0, std 0.0, sum 4.0']
+    rgb = describe(RegionStats(np.ones((4, 4, 3), dtype=np.uint8)).region(0, 2, 0, 2))
+    assert [line.split(':')[0] for line in rgb.splitlines()] == ['pixels', 'R', 'G', 'B']
+    assert describe(None) == 'empty region'
@@ -0,0 +1,77 @@
+from resampling import SortedSeries, lttb, minmax_bins, resample, POINTS_PER_PIXEL
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope='module')
+def series():
+    rng = np.random.default_rng(0)
+    x = rng.uniform(0, 100, 200_000)
+    return SortedSeries(x, np.sin(x) + rng.normal(0, 0.1, len(x)), color=rng.integers(0, 3, len(x)))
+
+
+def test_sorted_series_and_visible_points(series):
+    assert np.all(np.diff(series.x) >= 0)
+    assert len(series) == 200_000
+    assert series.nbytes == 200_000 * 16 + series.columns['color'].nbytes
+
+    idx = series.visible([60, 40])
+    assert isinstance(idx, slice)
+    np.testing.assert_array_equal(series.x[idx], series.x[(series.x >= 40) & (series.x <= 60)])
+
+    idx = series.visible([40, 60], [0.5, 0])
+    inside = (series.x >= 40) & (series.x <= 60) & (series.y >= 0) & (series.y <= 0.5)
+    np.testing.assert_array_equal(idx, np.flatnonzero(inside))
+
+
+def test_minmax_keeps_the_extremes_of_every_bin():
+    rng = np.random.default_rng(1)
+    x, y = np.sort(rng.uniform(0, 1, 10_000)), rng.normal(size=10_000)
+    kept = minmax_bins(x, y, 50)
+    assert kept[0] == 0 and kept[-1] == len(x) - 1
+    assert len(kept) <= 2 * 50 + 2
+
+    bins = np.minimum((x - x[0]) / (x[-1] - x[0]) * 50, 49).astype(int)
+    for b in range(50):
+        members = np.flatnonzero(bins == b)
+        assert members[np.argmin(y[members])] in kept
+        assert members[np.argmax(y[members])] in kept
+
+    # short series are kept completely
+    np.testing.assert_array_equal(minmax_bins(x[:50], y[:50], 50), np.arange(50))
+
+
+def test_lttb_keeps_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[[123, 567]] = [10, -10]
+    kept = lttb(x, y, 50)
+    assert len(kept) == 50
+    assert kept[0] == 0 and kept[-1] == 999
+    assert np.all(np.diff(kept) > 0)
+    assert {123, 567} <= set(kept.tolist())
+    np.testing.assert_array_equal(lttb(x[:10], y[:10], 50), np.arange(10))
+
+
+@pytest.mark.parametrize('method', ['minmax', 'lttb'])
+def test_resample_depends_on_pixels_not_points(series, method):
+    idx = resample(series, pixels=300, method=method)
+    assert len(idx) <= 300 * POINTS_PER_PIXEL + 2
+    if method == 'minmax':
+        assert series.y[idx].max() == series.y.max()
+
+    # zoomed in, the visible points are reduced again
+    zoomed = resample(series, [10, 11], [-2, 2], pixels=300, method=method)
+    assert np.all((series.x[zoomed] >= 10) & (series.x[zoomed] <= 11))
+    assert 0 < len(zoomed) <= 300 * POINTS_PER_PIXEL + 2
+    with pytest.raises(ValueError):
+        resample(series, method='every_nth')
+
+
+def test_zoom_app_view(load_app):
+    app = load_app('plotlyDash_show_zoom_area')
+    view = app.relayout_view({'xaxis.range[0]': 1, 'xaxis.range[1]': 2}, None)
+    assert view == {'x': [1, 2], 'y': None}
+    assert app.relayout_view({'yaxis.range': [3, 4]}, view) == {'x': [1, 2], 'y': [3, 4]}
+    assert app.relayout_view({'xaxis.autorange': True}, view) == {'x': None, 'y': None}
+    assert app.relayout_view({'dragmode': 'pan'}, view) is None
@@ -0,0 +1,56 @@
+from dash.exceptions import PreventUpdate
+from base64 import b64decode
+from PIL import Image
+import pytest
+import io
+
+LINE = {'type': 'line', 'x0': 20, 'y0': 40, 'x1': 300, 'y1': 90}
+RECT = {'type': 'rect', 'x0': 30.7, 'y0': 20.2, 'x1': 130.9, 'y1': 70.5}
+
+
+@pytest.fixture(scope='module')
+def app(load_app):
+    return load_app('plotlyDash_rotate_crop')
+
+
+def image_size(figure):
+    # size of the image of a go.Image trace with a png source
+    source = figure.data[0].source
+    return Image.open(io.BytesIO(b64decode(source.split(',', 1)[1]))).size
+
+
+def test_rotation_answers_with_preview_then_full_quality(app, call):
+    preview = call(app.rotate_crop, 'rotate.n_clicks', [LINE], 'horizontal', None, 1, None)
+    full = call(app.render_rotation, 'rotate.n_clicks', [LINE], 'horizontal', None, 1)
+
+    preview_width, preview_height = image_size(preview)
+    full_width, full_height = image_size(full)
+    assert abs(preview_width * app.PREVIEW_STEP - full_width) <= app.PREVIEW_STEP
+    assert abs(preview_height * app.PREVIEW_STEP - full_height) <= app.PREVIEW_STEP
+
+    # the preview is much smaller than the full quality image
+    assert len(preview.data[0].source) * 4 < len(full.data[0].source)
+
+
+def test_rotation_without_line_does_not_update(app, call):
+    with pytest.raises(PreventUpdate):
+        call(app.rotate_crop, 'rotate.n_clicks', [RECT], 'horizontal', None, 1, None)
+    with pytest.raises(PreventUpdate):
+        call(app.render_rotation, 'rotate.n_clicks', [], 'horizontal', None, 1)
+
+
+def test_crop_returns_the_rectangle(app, call):
+    figure = call(app.rotate_crop, 'crop.n_clicks', [LINE, RECT], 'horizontal', None, None, 1)
+    assert image_size(figure) == (100, 50)
+
+
+def test_statistics_of_rectangles_and_hover(app, call):
+    text = call(app.show_region_stats, 'shapes.data', [LINE, RECT])
+    assert text.startswith('pixels: 5000\nR: mean')
+
+    text = call(app.show_hover_stats, 'org_img.hoverData', {'points': [{'x': 100, 'y': 50}]})
+    assert text.startswith(f'pixels: {(2 * app.HOVER_RADIUS + 1) ** 2}\nR: mean')
+
+    # windows at the border are clipped
+    text = call(app.show_hover_stats, 'org_img.hoverData', {'points': [{'x': 0, 'y': 0}]})
+    assert text.startswith(f'pixels: {(app.HOVER_RADIUS + 1) ** 2}\n')
@@ -0,0 +1,70 @@
+from shape_history import ChunkedVector, ShapeHistory, replace_shapes
+import numpy as np
+import tracemalloc
+
+RECT = {'type': 'rect', 'x0': 1, 'y0': 2, 'x1': 30, 'y1': 40, 'line': {'color': '#E2F714', 'width': 2}}
+
+
+def test_chunked_vector_behaves_like_a_list():
+    rng = np.random.default_rng(0)
+    items = list(range(300))
+    vector = ChunkedVector(items, chunk_size=8)
+    for _ in range(500):
+        start = int(rng.integers(0, len(items) + 1))
+        stop = start + int(rng.integers(0, 5))
+        new = [int(v) for v in rng.integers(1000, 2000, rng.integers(0, 6))]
+        old_items, old_list = vector, list(items)
+        vector = vector.splice(start, stop, new)
+        items[start:stop] = new
+
+        assert vector.to_list() == items
+        assert len(vector) == len(items)
+        # earlier versions are not changed
+        assert old_items.to_list() == old_list
+        assert all(len(chunk) <= 2 * 8 for chunk in vector.chunks)
+    assert [vector[i] for i in range(-3, 0)] == items[-3:]
+
+    # removing all items leaves no empty chunk
+    assert vector.splice(0, len(vector)).chunks == ()
+
+
+def test_edit_shares_unchanged_chunks():
+    vector = ChunkedVector([dict(RECT, x0=i) for i in range(1000)])
+    edited = vector.set(500, dict(RECT, x0=-1))
+    shared = sum(a is b for a, b in zip(vector.chunks, edited.chunks))
+    assert shared == len(vector.chunks) - 1
+    assert replace_shapes(vector, vector.to_list()).chunks == vector.chunks
+
+
+def test_undo_redo_and_relayout():
+    history = ShapeHistory()
+    assert history.undo() is None
+    assert history.apply_relayout({'shapes': [RECT]})
+    assert history.apply_relayout({'shapes[0].x0': 5, 'shapes[0].line.color': 'red'})
+    assert not history.apply_relayout({'xaxis.range[0]': 3})
+    assert not history.apply_relayout({'shapes[3].x0': 5})
+    assert history.current[0]['x0'] == 5 and history.current[0]['line']['color'] == 'red'
+
+    assert history.undo().to_list() == [RECT]
+    assert history.undo().to_list() == []
+    assert history.redo().to_list() == [RECT]
+    assert history.redo_steps == 1
+
+    # a new step drops the redo steps
+    history.apply_relayout({'shapes': []})
+    assert history.redo() is None
+    assert history.undo_steps == 2
+
+
+def test_history_memory_grows_with_edits_not_shapes():
+    shapes = [dict(RECT, x0=i) for i in range(10_000)]
+    history = ShapeHistory(shapes, max_steps=200)
+    tracemalloc.start()
+    for i in range(200):
+        history.apply_relayout({f'shapes[{i * 37 % 10_000}].x0': -i})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # copying the list of shapes per step would take 200 * 80 kB
+    assert peak < 2 * 2 ** 20
+    assert history.undo_steps == 200
@@ -0,0 +1,52 @@
+from shape_masks import encode_mask, mask_dtype, rasterize
+from PIL import Image
+import numpy as np
+import pytest
+import io
+
+
+def test_rect_covers_pixel_centers_and_is_clipped():
+    mask = rasterize([{'type': 'rect', 'x0': 1.5, 'y0': 0.5, 'x1': 4.5, 'y1': 2}], 5, 8)
+    expected = np.zeros((5, 8), dtype=np.uint8)
+    expected[1:3, 2:5] = 1
+    np.testing.assert_array_equal(mask, expected)
+
+    mask = rasterize([{'type': 'rect', 'x0': -10, 'y0': -10, 'x1': 2, 'y1': 100}], 5, 8)
+    assert mask.sum() == 5 * 3
+    assert not rasterize([{'type': 'rect', 'x0': 20, 'y0': 0, 'x1': 30, 'y1': 4}], 5, 8).any()
+
+
+def test_circle_path_and_line():
+    circle = rasterize([{'type': 'circle', 'x0': 10, 'y0': 10, 'x1': 50, 'y1': 50}], 60, 60)
+    assert abs(circle.sum() - np.pi * 20 ** 2) < 0.02 * np.pi * 20 ** 2
+
+    triangle = rasterize([{'type': 'path', 'path': 'M0,0L40,0L0,40Z'}], 60, 60)
+    assert abs(triangle.sum() - 40 * 40 / 2) < 60
+
+    line = rasterize([{'type': 'line', 'x0': 5, 'y0': 10, 'x1': 45, 'y1': 10}], 20, 60, line_width=3)
+    # 41 x 3 pixels plus the round caps at both ends
+    assert line.sum() == 41 * 3 + 2 * 3
+    np.testing.assert_array_equal(np.flatnonzero(line.any(axis=1)), [9, 10, 11])
+
+
+def test_later_shapes_are_drawn_above():
+    shapes = [{'type': 'rect', 'x0': 0, 'y0': 0, 'x1': 9, 'y1': 9}, {'type': 'rect', 'x0': 5, 'y0': 5, 'x1': 9, 'y1': 9}]
+    mask = rasterize(shapes, 10, 10)
+    assert mask[0, 0] == 1 and mask[7, 7] == 2
+
+
+def test_dtype_and_encoding():
+    assert mask_dtype(255) == np.uint8
+    assert mask_dtype(256) == np.uint16
+    with pytest.raises(ValueError):
+        mask_dtype(2 ** 16)
+
+    shapes = [{'type': 'rect', 'x0': i % 50, 'y0': i // 50, 'x1': i % 50, 'y1': i // 50} for i in range(300)]
+    mask = rasterize(shapes, 10, 50)
+    assert mask.dtype == np.uint16 and mask.max() == 300
+
+    png = np.asarray(Image.open(io.BytesIO(encode_mask(mask, 'png'))))
+    np.testing.assert_array_equal(png, mask)
+    np.testing.assert_array_equal(np.load(io.BytesIO(encode_mask(mask, 'npy'))), mask)
+    with pytest.raises(ValueError):
+        encode_mask(mask, 'gif')
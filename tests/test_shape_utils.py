@@ -0,0 +1,74 @@
+from shape_utils import shapes_patch, update_shapes
+import plotly.express as px
+import plotly.io as pio
+import numpy as np
+import json
+
+LINE = {'type': 'line', 'x0': 10, 'y0': 20, 'x1': 300, 'y1': 40, 'line': {'color': '#E2F714', 'width': 2}}
+RECT = {'type': 'rect', 'x0': 50, 'y0': 60, 'x1': 250, 'y1': 160, 'line': {'color': '#E2F714', 'width': 2}}
+
+
+def callback_payload(state_value):
+    # body of the request which dash sends for the rotate/crop callback
+    return pio.json.to_json_plotly({
+        'output': 'chgd_img.figure',
+        'inputs': [{'id': 'rotate', 'property': 'n_clicks', 'value': 1}],
+        'state': [{'id': 'state', 'property': 'value', 'value': state_value}],
+    }).encode()
+
+
+def test_shape_store_payload_is_much_smaller_than_figure_state():
+    img = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    fig = px.imshow(img)
+    fig.update_layout(shapes=[LINE, RECT])
+
+    figure_payload = callback_payload(fig.to_plotly_json())
+    shapes_payload = callback_payload([LINE, RECT])
+
+    # the image is not sent anymore, only the shapes
+    assert len(shapes_payload) < 1024
+    assert len(figure_payload) > 500 * len(shapes_payload)
+
+
+def test_update_shapes_ignores_zoom_and_applies_edits():
+    assert update_shapes([LINE], {'xaxis.range[0]': 0, 'xaxis.range[1]': 10}) is None
+    assert update_shapes([], {'shapes': [LINE, RECT]}) == [LINE, RECT]
+
+    shapes = update_shapes([LINE, RECT], {'shapes[1].x0': 70, 'shapes[0].line.color': 'red'})
+    assert shapes[1]['x0'] == 70
+    assert shapes[0]['line']['color'] == 'red'
+
+    # the previous version is not changed
+    assert RECT['x0'] == 50 and LINE['line']['color'] == '#E2F714'
+
+
+def apply_patch(data, patch):
+    # applies the operations of a dash Patch to a list like the dash renderer does
+    data = json.loads(json.dumps(data))
+    for operation in patch.to_plotly_json()['operations']:
+        location, params = operation['location'], operation['params']
+        name = operation['operation']
+        if name == 'Assign':
+            data[location[0]] = params['value']
+        elif name == 'Extend':
+            data.extend(params['value'])
+        elif name == 'Insert':
+            data.insert(params['index'], params['value'])
+        elif name == 'Delete':
+            del data[location[0]]
+        else:
+            raise AssertionError(name)
+    return data
+
+
+def test_shapes_patch_turns_old_into_new():
+    shapes = [dict(RECT, x0=i) for i in range(6)]
+    cases = [
+        shapes + [LINE],
+        shapes[:2] + shapes[3:],
+        shapes[:3] + [LINE] + shapes[3:],
+        [LINE] + shapes[1:],
+        [],
+    ]
+    for new in cases:
+        assert apply_patch(shapes, shapes_patch(shapes, new)) == new
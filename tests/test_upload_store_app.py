@@ -0,0 +1,53 @@
+import pytest
+
+RECT = {'type': 'rect', 'x0': 10, 'y0': 20, 'x1': 60, 'y1': 90}
+
+
+@pytest.fixture(scope='module')
+def app(load_app):
+    return load_app('plotlyDash_upload_store')
+
+
+def test_save_uses_the_shapes_of_the_browser(app, call):
+    # the server history of the session is empty, i.e. after a restart or on another worker
+    assert app.get_history('restarted').current.to_list() == []
+    store, _, status = call(app.store_in, 'save_ann.n_clicks', 1, None, None, None, {}, [RECT], 'restarted')
+    assert store == [RECT]
+    assert status == ''
+
+
+def test_save_patches_only_the_changes(app, call):
+    moved = dict(RECT, x0=0)
+    patch, _, _ = call(app.store_in, 'save_ann.n_clicks', 1, None, None, None, [RECT], [moved, RECT], 'a')
+    operations = patch.to_plotly_json()['operations']
+    assert [operation['operation'] for operation in operations] == ['Insert']
+
+
+def test_undo_redo_uses_the_history(app, call):
+    call(app.show_region_stats, 'graph.relayoutData', {'shapes': [RECT]}, [], 'undo')
+    figure, shapes, _ = call(app.undo_redo, 'undo.n_clicks', 1, None, 'undo')
+    assert shapes == []
+    figure, shapes, _ = call(app.undo_redo, 'redo.n_clicks', 1, 1, 'undo')
+    assert shapes == [RECT]
+
+
+def test_edit_without_server_history(app, call):
+    # the browser shows RECT, the server lost the history of the session (restart, eviction, other worker)
+    shapes, stats = call(app.show_region_stats, 'graph.relayoutData', {'shapes[0].x0': 30}, [RECT], 'lost')
+    assert shapes == [dict(RECT, x0=30)]
+    assert stats == app.rect_stats([dict(RECT, x0=30)])
+    # the history starts with the shapes of the browser, undo does not remove the other shapes
+    figure, shapes, _ = call(app.undo_redo, 'undo.n_clicks', 1, None, 'lost')
+    assert shapes == [RECT]
+
+    # relayoutData without shapes (i.e. zoom) changes nothing
+    with pytest.raises(app.PreventUpdate):
+        call(app.show_region_stats, 'graph.relayoutData', {'xaxis.range[0]': 1}, [RECT], 'lost')
+
+
+def test_save_after_an_edit_without_server_history(app, call):
+    # i.e. a restart of the server between drawing and editing the shape
+    shapes, _ = call(app.show_region_stats, 'graph.relayoutData', {'shapes[0].y1': 95}, [RECT], 'restarted_edit')
+    store, _, status = call(app.store_in, 'save_ann.n_clicks', 1, None, None, None, {}, shapes, 'restarted_edit')
+    assert store == [dict(RECT, y1=95)]
+    assert status == ''